@@ -1,8 +1,9 @@
-from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.core.paginator import EmptyPage, PageNotAnInteger
 from django.shortcuts import render
 from wagtail.contrib.search_promotions.models import Query
 from wagtail.models import Page
 
+from wagtail_extended_search.paginator import SearchPaginator
 from wagtail_extended_search.query_builder import CustomQueryBuilder
 
 
@@ -22,7 +23,7 @@ def search(request):
 
     # Pagination
     page = request.GET.get("page", 1)
-    paginator = Paginator(search_results, 10)
+    paginator = SearchPaginator(search_results, 10)
     try:
         search_results = paginator.page(page)
     except PageNotAnInteger:
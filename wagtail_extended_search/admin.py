@@ -15,7 +15,7 @@ class SettingAdminForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields["key"].choices = [
-            (k, k) for k in settings.wagtail_extended_search_settings.all_keys
+            (k, k) for k in settings.wagtail_extended_search_settings.all_keys()
         ]
 
 
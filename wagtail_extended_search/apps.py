@@ -8,20 +8,24 @@ class WagtailExtendedSearchConfig(AppConfig):
     def ready(self):
         import wagtail_extended_search.signals  # noqa
         from wagtail_extended_search import query_builder, settings
-        from wagtail_extended_search.index import get_indexed_models
+        from wagtail_extended_search.index import (
+            build_model_hierarchy,
+            get_indexed_models,
+        )
 
+        build_model_hierarchy()
         settings.settings_singleton.initialise_field_dict()
         settings.settings_singleton.initialise_env_dict()
         # FIXME: `APP_ENV` is not a general Django/Wagtail setting, this needs rethinking!
         # if django_settings.APP_ENV not in ["test", "build"]:
         #     settings.settings_singleton.initialise_db_dict()
-        settings.wagtail_extended_search_settings = (
-            settings.settings_singleton.to_dict()
-        )
-        query_builder.wagtail_extended_search_settings = (
-            settings.wagtail_extended_search_settings
-        )
+        settings.export_settings()
+        settings.settings_generation.sync()
 
         for model_class in get_indexed_models():
             if hasattr(model_class, "indexed_fields") and model_class.indexed_fields:
                 query_builder.CustomQueryBuilder.build_search_query(model_class, True)
+                if getattr(django_settings, "SEARCH_ENABLE_QUERY_TEMPLATES", False):
+                    query_builder.CustomQueryBuilder.build_query_templates(
+                        model_class, True
+                    )
@@ -1,5 +1,8 @@
 from wagtail.search.backends.elasticsearch7 import Elasticsearch7SearchBackend
 
+from wagtail_extended_search.layers.base.backends.backend import (
+    ExtendedSearchResults,
+)
 from wagtail_extended_search.layers.boost.backends.backend import (
     BoostSearchQueryCompiler,
 )
@@ -16,6 +19,9 @@ from wagtail_extended_search.layers.nested.backends.backend import (
 from wagtail_extended_search.layers.only_fields.backends.backend import (
     OnlyFieldSearchQueryCompiler,
 )
+from wagtail_extended_search.layers.template.backends.backend import (
+    TemplateSearchQueryCompiler,
+)
 
 
 class CustomSearchMapping(
@@ -24,6 +30,7 @@ class CustomSearchMapping(
 
 
 class CustomSearchQueryCompiler(
+    TemplateSearchQueryCompiler,
     FunctionScoreSearchQueryCompiler,
     BoostSearchQueryCompiler,
     FilteredSearchQueryCompiler,
@@ -36,6 +43,7 @@ class CustomSearchQueryCompiler(
 class CustomSearchBackend(Elasticsearch7SearchBackend):
     query_compiler_class = CustomSearchQueryCompiler
     mapping_class = CustomSearchMapping
+    results_class = ExtendedSearchResults
 
 
 SearchBackend = CustomSearchBackend
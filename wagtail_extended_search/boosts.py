@@ -0,0 +1,106 @@
+import logging
+from typing import Any, Optional
+
+from wagtail_extended_search import settings as search_settings
+from wagtail_extended_search.types import AnalysisType, SearchQueryType
+
+logger = logging.getLogger(__name__)
+
+QUERY_TYPE_BOOST_KEYS = {
+    SearchQueryType.PHRASE: "phrase",
+    SearchQueryType.QUERY_AND: "query_and",
+    SearchQueryType.QUERY_OR: "query_or",
+    SearchQueryType.FUZZY: "fuzzy",
+}
+ANALYSIS_TYPE_BOOST_KEYS = {
+    AnalysisType.EXPLICIT: "explicit",
+    AnalysisType.TOKENIZED: "tokenized",
+    AnalysisType.KEYWORD: "explicit",
+}
+FIELD_BOOST_KEY_PREFIX = "boost_parts__fields__"
+
+
+def _to_boost(key: str, value: Any, default: float) -> float:
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        logger.warning("Ignoring %s, %r isn't a valid boost", key, value)
+        return default
+
+
+class BoostTable:
+    """
+    All the boosts from a settings snapshot, resolved to floats up front so
+    the query builder doesn't have to look them up and parse them for every
+    field, analyzer and query type it builds a query for.
+
+    Lookups still record the settings they came from as dependencies of
+    whatever's being built.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+        self.query_type_boosts: dict[SearchQueryType, tuple[str, float]] = {}
+        for query_type, boost_key in QUERY_TYPE_BOOST_KEYS.items():
+            key = f"boost_parts__query_types__{boost_key}"
+            # unset (or zero) query type and analyzer boosts have no effect
+            boost = _to_boost(key, snapshot.get(key), 1.0) or 1.0
+            self.query_type_boosts[query_type] = (key, boost)
+
+        self.analysis_type_boosts: dict[AnalysisType, tuple[str, float]] = {}
+        for analysis_type, boost_key in ANALYSIS_TYPE_BOOST_KEYS.items():
+            key = f"boost_parts__analyzers__{boost_key}"
+            boost = _to_boost(key, snapshot.get(key), 1.0) or 1.0
+            self.analysis_type_boosts[analysis_type] = (key, boost)
+
+        self.field_boosts: dict[str, float] = {
+            field_key: _to_boost(
+                f"{FIELD_BOOST_KEY_PREFIX}{field_key}", field_boost, 1.0
+            )
+            for field_key, field_boost in snapshot.get(
+                "boost_parts__fields", {}
+            ).items()
+        }
+
+    def get_query_type_boost(self, query_type: SearchQueryType) -> float:
+        try:
+            key, boost = self.query_type_boosts[query_type]
+        except (KeyError, TypeError):
+            raise ValueError(f"{query_type} must be a valid SearchQueryType")
+        search_settings.record_settings_dependencies_used(key)
+        return boost
+
+    def get_analysis_type_boost(self, analysis_type: AnalysisType) -> float:
+        if analysis_type == AnalysisType.FILTER:
+            raise ValueError("FILTER is not a valid AnalysisType for a query")
+        try:
+            key, boost = self.analysis_type_boosts[analysis_type]
+        except (KeyError, TypeError):
+            raise ValueError(f"{analysis_type} must be a valid AnalysisType")
+        search_settings.record_settings_dependencies_used(key)
+        return boost
+
+    def get_field_boost(self, field_key: str) -> float:
+        search_settings.record_settings_dependencies_used(
+            f"{FIELD_BOOST_KEY_PREFIX}{field_key}"
+        )
+        return self.field_boosts.get(field_key, 1.0)
+
+
+_boost_table: Optional[BoostTable] = None
+
+
+def get_boost_table() -> BoostTable:
+    """
+    Returns the boost table for the current settings, building it the first
+    time it's needed after they change
+    """
+    global _boost_table
+    snapshot = search_settings.wagtail_extended_search_settings
+    boost_table = _boost_table
+    if boost_table is None or boost_table.snapshot is not snapshot:
+        boost_table = _boost_table = BoostTable(snapshot)
+    return boost_table
@@ -0,0 +1,239 @@
+import logging
+import pickle
+import threading
+import time
+import weakref
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from wagtail_extended_search import settings as search_settings
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = "wagtail_extended_search"
+DEFAULT_LOCAL_CACHE_SIZE = 256
+# how long a build lock in the shared cache lives, in case its holder dies
+BUILD_LOCK_TIMEOUT = 30
+# how long to wait on another process' build before building anyway
+BUILD_WAIT_TIMEOUT = 5
+BUILD_WAIT_INTERVAL = 0.05
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    # flat keys of the settings read while building the value
+    dependencies: frozenset[str]
+
+
+class QueryCache:
+    """
+    Two tier cache for anything built from the search settings (queries and
+    query templates): an in-process LRU in front of the shared django cache.
+
+    Keys are namespaced by app label and model name. Local keys carry the
+    settings version, so entries built from old settings are never served.
+    Shared keys only carry a version of the settings the entry was built
+    from, recorded while building it, so changing a setting only rebuilds the
+    entries that depend on it.
+
+    Only one thread per process, and where the shared cache supports `add`,
+    one process, builds a missing entry.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_LOCAL_CACHE_SIZE):
+        self.max_size = max_size
+        self._local: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        # a key's lock lives as long as a thread is building or waiting on it
+        self._build_locks: weakref.WeakValueDictionary[str, threading.Lock] = (
+            weakref.WeakValueDictionary()
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return settings.SEARCH_ENABLE_QUERY_CACHE
+
+    def get_key(self, kind: str, model_class, version: str, *parts) -> str:
+        return ":".join(
+            [
+                CACHE_KEY_PREFIX,
+                kind,
+                f"{model_class._meta.label_lower}",
+                version,
+                *[str(part) for part in parts],
+            ]
+        )
+
+    def check_settings(self):
+        """
+        Picks up settings another process has changed; called once for each
+        search before anything's built, so a build never sees two versions of
+        the settings
+        """
+        if search_settings.settings_generation.check():
+            # entries built from the old settings can't be reached any more
+            self.clear_local()
+
+    def get_or_build(
+        self,
+        build: Callable[[], Any],
+        kind: str,
+        model_class,
+        *parts,
+        ignore_cache: bool = False,
+    ) -> Any:
+        """
+        Returns the entry for the kind of thing built for model_class (and any
+        other parts that go into it), building and storing it if it's missing
+        or ignore_cache is set
+        """
+        if not self.enabled:
+            return build()
+
+        key = self.get_key(
+            kind,
+            model_class,
+            search_settings.wagtail_extended_search_settings.version,
+            *parts,
+        )
+        found = False
+        if not ignore_cache:
+            found, entry = self.get_local(key)
+
+        if not found:
+            with self._lock:
+                build_lock = self._build_locks.setdefault(key, threading.Lock())
+            with build_lock:
+                if not ignore_cache:
+                    # another thread may have got here first
+                    found, entry = self.get_local(key)
+                    if not found:
+                        found, entry = self.get_shared(kind, model_class, *parts)
+                if not found:
+                    entry = self._build_shared(
+                        key, build, ignore_cache, kind, model_class, *parts
+                    )
+                self.set_local(key, entry)
+
+        # anything being built from this depends on the same settings
+        search_settings.record_settings_dependencies_used(*entry.dependencies)
+        return entry.value
+
+    def build(self, build: Callable[[], Any]) -> CacheEntry:
+        with search_settings.record_settings_dependencies() as dependencies:
+            value = build()
+        return CacheEntry(value, frozenset(dependencies))
+
+    def _build_shared(
+        self,
+        key: str,
+        build: Callable[[], Any],
+        ignore_cache: bool,
+        kind: str,
+        model_class,
+        *parts,
+    ) -> CacheEntry:
+        lock_key = f"{key}:lock"
+        if ignore_cache or cache.add(lock_key, 1, BUILD_LOCK_TIMEOUT):
+            try:
+                entry = self.build(build)
+                self.set_shared(entry, kind, model_class, *parts)
+            finally:
+                if not ignore_cache:
+                    cache.delete(lock_key)
+            return entry
+
+        # another process is building it, wait for its result
+        deadline = time.monotonic() + BUILD_WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(BUILD_WAIT_INTERVAL)
+            found, entry = self.get_shared(kind, model_class, *parts)
+            if found:
+                return entry
+
+        logger.warning("Timed out waiting for %s to be built, building it", key)
+        entry = self.build(build)
+        self.set_shared(entry, kind, model_class, *parts)
+        return entry
+
+    def get_local(self, key: str) -> tuple[bool, CacheEntry]:
+        with self._lock:
+            if key not in self._local:
+                return False, None
+            self._local.move_to_end(key)
+            return True, self._local[key]
+
+    def set_local(self, key: str, entry: CacheEntry):
+        with self._lock:
+            self._local[key] = entry
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_size:
+                self._local.popitem(last=False)
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def get_dependencies_key(self, kind: str, model_class, *parts) -> str:
+        return self.get_key(
+            f"{kind}_dependencies",
+            model_class,
+            search_settings.wagtail_extended_search_settings.fields_version,
+            *parts,
+        )
+
+    def get_shared(self, kind: str, model_class, *parts) -> tuple[bool, CacheEntry]:
+        found, dependencies = self.get_shared_value(
+            self.get_dependencies_key(kind, model_class, *parts)
+        )
+        if not found:
+            return False, None
+
+        version = search_settings.get_settings_dependencies_version(dependencies)
+        found, value = self.get_shared_value(
+            self.get_key(kind, model_class, version, *parts)
+        )
+        if not found:
+            return False, None
+        return True, CacheEntry(value, frozenset(dependencies))
+
+    def set_shared(self, entry: CacheEntry, kind: str, model_class, *parts):
+        version = search_settings.get_settings_dependencies_version(entry.dependencies)
+        self.set_shared_value(
+            self.get_key(kind, model_class, version, *parts), entry.value
+        )
+        self.set_shared_value(
+            self.get_dependencies_key(kind, model_class, *parts),
+            sorted(entry.dependencies),
+        )
+
+    def get_shared_value(self, key: str) -> tuple[bool, Any]:
+        serialized_value = cache.get(key)
+        if serialized_value is None:
+            return False, None
+        try:
+            return True, self.deserialize(serialized_value)
+        except Exception:
+            # written by an incompatible version of the code, rebuild it
+            logger.warning("Couldn't deserialize %s, ignoring it", key)
+            return False, None
+
+    def set_shared_value(self, key: str, value: Any):
+        cache.set(key, self.serialize(value))
+
+    @staticmethod
+    def serialize(value: Any) -> bytes:
+        return zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    @staticmethod
+    def deserialize(serialized_value: bytes) -> Any:
+        return pickle.loads(zlib.decompress(serialized_value))
+
+
+query_cache = QueryCache(
+    getattr(settings, "SEARCH_QUERY_CACHE_LOCAL_SIZE", DEFAULT_LOCAL_CACHE_SIZE)
+)
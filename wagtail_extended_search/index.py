@@ -46,20 +46,10 @@ class Indexed(index.Indexed):
     @classmethod
     def get_indexed_fields(cls, as_dict: bool = False):
         processed_index_fields = {}
-        class_mro = list(inspect.getmro(cls))
-        class_mro.reverse()
-        for model_class in class_mro:
-            if not class_is_indexed(model_class):
-                continue
-            if not issubclass(model_class, Indexed):
-                continue
-            if not model_class.has_unique_index_fields():
-                continue
-
+        for model_class in get_model_hierarchy().get_indexed_ancestors(cls):
             model_field_names = []
 
             for f in model_class.indexed_fields:
-                f.configuration_model = model_class
                 if isinstance(f, BaseField):
                     if f.model_field_name not in model_field_names:
                         if f.model_field_name not in processed_index_fields:
@@ -114,6 +104,10 @@ class Indexed(index.Indexed):
 
     @classmethod
     def has_unique_index_fields(cls):
+        return get_model_hierarchy().has_unique_index_fields(cls)
+
+    @classmethod
+    def _has_unique_index_fields(cls):
         # @TODO [DWPF-1066] this doesn't account for a diverging MRO
         parent_model = cls.indexed_get_parent()
         parent_indexed_fields = getattr(parent_model, "indexed_fields", [])
@@ -129,12 +123,7 @@ class Indexed(index.Indexed):
 
     @classmethod
     def get_root_index_model(cls):
-        class_mro = list(inspect.getmro(cls))
-        class_mro.reverse()
-        for model in class_mro:
-            if model != Indexed and issubclass(model, Indexed):
-                return model
-        return cls
+        return get_model_hierarchy().get_root_index_model(cls)
 
 
 def get_indexed_models() -> list[Type[Indexed]]:
@@ -161,6 +150,106 @@ def class_is_indexed(cls):
     )
 
 
+class ModelHierarchy:
+    """
+    Index of how the indexed models extend each other, built once (at startup)
+    so the query builder doesn't have to walk the MRO of every indexed model
+    each time it needs to know a model's parents or children.
+
+    Anything that isn't an indexed model (e.g. mixins, or models defined after
+    it's built) is worked out from its MRO on first use and then remembered.
+    """
+
+    def __init__(self, indexed_models: list[Type[Indexed]]):
+        self.indexed_models = list(indexed_models)
+        self.children: dict[type, list[Type[Indexed]]] = {}
+        self.root_index_models: dict[type, type] = {}
+        self.indexed_ancestors: dict[type, list[Type[Indexed]]] = {}
+        self.unique_index_fields: dict[type, bool] = {}
+        self.configured_fields: set = set()
+
+        for model in self.indexed_models:
+            for base_cls in inspect.getmro(model)[1:]:
+                self.children.setdefault(base_cls, []).append(model)
+
+    def get_children(self, model_class: type) -> list[Type[Indexed]]:
+        """
+        Returns every indexed model that extends model_class, in the order of
+        get_indexed_models()
+        """
+        return self.children.get(model_class, [])
+
+    def has_unique_index_fields(self, model_class: Type[Indexed]) -> bool:
+        if model_class not in self.unique_index_fields:
+            self.unique_index_fields[model_class] = (
+                model_class._has_unique_index_fields()
+            )
+        return self.unique_index_fields[model_class]
+
+    def get_extended_models_with_unique_indexed_fields(
+        self, model_class: type
+    ) -> list[Type[Indexed]]:
+        return [
+            child
+            for child in self.get_children(model_class)
+            if issubclass(child, Indexed) and self.has_unique_index_fields(child)
+        ]
+
+    def get_root_index_model(self, model_class: Type[Indexed]) -> type:
+        if model_class not in self.root_index_models:
+            root_index_model = model_class
+            for model in reversed(inspect.getmro(model_class)):
+                if model != Indexed and issubclass(model, Indexed):
+                    root_index_model = model
+                    break
+            self.root_index_models[model_class] = root_index_model
+        return self.root_index_models[model_class]
+
+    def get_indexed_ancestors(self, model_class: type) -> list[Type[Indexed]]:
+        """
+        Returns the indexed models in model_class' MRO (including itself) that
+        define their own indexed_fields, root first
+        """
+        if model_class not in self.indexed_ancestors:
+            indexed_ancestors = [
+                model
+                for model in reversed(inspect.getmro(model_class))
+                if class_is_indexed(model)
+                and issubclass(model, Indexed)
+                and self.has_unique_index_fields(model)
+            ]
+            for model in indexed_ancestors:
+                self.configure_indexed_fields(model)
+            self.indexed_ancestors[model_class] = indexed_ancestors
+        return self.indexed_ancestors[model_class]
+
+    def configure_indexed_fields(self, model_class: Type[Indexed]):
+        """
+        Sets the configuration_model of each of the model's indexed_fields,
+        once: a field listed by more than one model belongs to the first one
+        configured, which for get_indexed_ancestors is the one nearest the root
+        """
+        for field in model_class.indexed_fields:
+            if field not in self.configured_fields:
+                field.configuration_model = model_class
+                self.configured_fields.add(field)
+
+
+model_hierarchy = None
+
+
+def build_model_hierarchy() -> ModelHierarchy:
+    global model_hierarchy
+    model_hierarchy = ModelHierarchy(get_indexed_models())
+    return model_hierarchy
+
+
+def get_model_hierarchy() -> ModelHierarchy:
+    if model_hierarchy is None:
+        return build_model_hierarchy()
+    return model_hierarchy
+
+
 ##################################
 # END OF EXTRAS
 ##################################
@@ -195,12 +284,12 @@ def get_indexed_field_name(
     model_field_name: str,
     analyzer: AnalysisType,
 ):
-    from wagtail_extended_search.settings import wagtail_extended_search_settings
+    from wagtail_extended_search import settings as search_settings
 
     field_name_suffix = (
-        wagtail_extended_search_settings["analyzers"][analyzer.value][
-            "index_fieldname_suffix"
-        ]
+        search_settings.get_setting(
+            f"analyzers__{analyzer.value}__index_fieldname_suffix"
+        )
         or ""
     )
     return f"{model_field_name}{field_name_suffix}"
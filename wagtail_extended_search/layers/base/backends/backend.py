@@ -1,12 +1,18 @@
 from typing import Optional, Union
 
+from django.conf import settings
 from wagtail.search.backends.elasticsearch7 import (
     Elasticsearch7SearchQueryCompiler,
+    Elasticsearch7SearchResults,
     Field,
 )
-from wagtail.search.query import Fuzzy, MatchAll, Not, Phrase, PlainText
+from wagtail.search.query import Boost, Fuzzy, MatchAll, Not, Phrase, PlainText
 
 from wagtail_extended_search import settings as search_settings
+from wagtail_extended_search.boosts import get_boost_table
+
+# Elasticsearch's own default
+DEFAULT_TRACK_TOTAL_HITS = 10000
 
 
 class ExtendedSearchQueryCompiler(Elasticsearch7SearchQueryCompiler):
@@ -17,6 +23,10 @@ class ExtendedSearchQueryCompiler(Elasticsearch7SearchQueryCompiler):
     PR maybe worth referencing https://github.com/wagtail/wagtail/issues/5422
     """
 
+    # set while compiling a query that only counts matches, so layers can
+    # leave out work that only affects scores
+    for_count = False
+
     def __init__(self, *args, **kwargs):
         """Remove this when we get wagtail PR 11018 merged & deployed"""
         super().__init__(*args, **kwargs)
@@ -24,6 +34,24 @@ class ExtendedSearchQueryCompiler(Elasticsearch7SearchQueryCompiler):
             Field(self.mapping.all_field_name)
         ]
 
+    def get_count_query(self):
+        """
+        The query for counting matches: scores aren't needed, so it's run in
+        a filter context (which the search backend can cache) and layers skip
+        their scoring work
+        """
+        return {"constant_score": {"filter": self._get_for_count(self.get_query)}}
+
+    def get_inner_count_query(self):
+        return self._get_for_count(self.get_inner_query)
+
+    def _get_for_count(self, get_query):
+        self.for_count = True
+        try:
+            return get_query()
+        finally:
+            self.for_count = False
+
     def get_boosted_fields(self, fields):
         """
         This is needed because we are backporting to strings WAY TOO EARLY
@@ -49,65 +77,103 @@ class ExtendedSearchQueryCompiler(Elasticsearch7SearchQueryCompiler):
         if not fields:
             return super()._remap_fields(fields)
 
+        registry = self.get_searchable_field_registry(
+            get_searchable_fields__args, get_searchable_fields__kwargs
+        )
         remapped_fields = []
-
-        searchable_fields = {
-            f.field_name: f
-            for f in self.get_searchable_fields(
-                *get_searchable_fields__args,
-                **get_searchable_fields__kwargs,
-            )
-        }
-
         for field_name in fields:
-            field = searchable_fields.get(field_name)
-            if field:
-                field_name = self.mapping.get_field_column_name(field)
-                remapped_fields.append(Field(field_name, field.boost or 1))
-            else:
-                # @TODO this works but ideally we'd move get_field_column_name to handle this directly
-                field_name_parts = field_name.split(".")
-                if field_name_parts[0] in searchable_fields:
-                    parent_related_field = searchable_fields[field_name_parts[0]]
-                    field_name = self.mapping.get_field_column_name(
-                        parent_related_field
-                    )
-                    field_name_remainder = ".".join(field_name_parts[1:])
-                    field_name = f"{field_name}.{field_name_remainder}"
-
-                    # Get the field boost from the settings so it can be managed in the DB.
-                    child_field = parent_related_field.get_related_field(
-                        field_name_remainder
-                    )
-                    field_settings_key = search_settings.get_settings_field_key(
-                        self.queryset.model, child_field
-                    )
-                    field_boost = float(
-                        search_settings.wagtail_extended_search_settings["boost_parts"][
-                            "fields"
-                        ].get(field_settings_key, 1)
-                    )
-                    remapped_fields.append(Field(field_name, boost=field_boost))
-
+            if remapped_field := registry.get_remapped_field(field_name):
+                remapped_fields.append(remapped_field)
         return remapped_fields
 
+    def get_searchable_field_registry(
+        self,
+        get_searchable_fields__args: tuple,
+        get_searchable_fields__kwargs: dict,
+    ) -> "SearchableFieldRegistry":
+        """
+        Returns the registry of remapped fields for this compiler's model and
+        the given get_searchable_fields arguments, building it if the
+        settings have changed since it was last used
+        """
+        global _searchable_field_registries
+        snapshot = search_settings.wagtail_extended_search_settings
+        registries_snapshot, registries = _searchable_field_registries
+        if registries_snapshot is not snapshot:
+            registries = {}
+            _searchable_field_registries = (snapshot, registries)
+
+        registry_key = (
+            type(self),
+            self.queryset.model,
+            get_searchable_fields__args,
+            tuple(sorted(get_searchable_fields__kwargs.items())),
+        )
+        if registry_key not in registries:
+            with search_settings.record_settings_dependencies() as dependencies:
+                searchable_fields = self.get_searchable_fields(
+                    *get_searchable_fields__args,
+                    **get_searchable_fields__kwargs,
+                )
+            registries[registry_key] = SearchableFieldRegistry(
+                searchable_fields,
+                self.mapping,
+                self.queryset.model,
+                dependencies,
+            )
+        return registries[registry_key]
+
     def _join_and_compile_queries(self, query, fields, boost=1.0):
         """
         Handle a generalised situation of one or more queries that need
         compilation and potentially joining as siblings. If more than one field
         then compile a query for each field then combine with disjunction
         max (or operator which takes the max score out of each of the
-        field queries)
+        field queries), unless the query can be compiled for all the fields
+        at once (see _compile_multi_field_query)
         """
         if len(fields) == 1:
             return self._compile_query(query, fields[0], boost)
         else:
+            multi_field_query = self._compile_multi_field_query(
+                query, [self.to_field(f) for f in fields], boost
+            )
+            if multi_field_query is not None:
+                return multi_field_query
+
             field_queries = []
             for field in fields:
                 field_queries.append(self._compile_query(query, field, boost))
 
             return {"dis_max": {"queries": field_queries}}
 
+    def _compile_multi_field_query(
+        self, query, fields: list[Field], boost=1.0
+    ) -> Optional[dict]:
+        """
+        Compiles leaf queries into a single (best_fields) multi_match query
+        with field^boost notation, which scores the same as a dis_max over a
+        copy of the query for each field. Returns None for other queries.
+
+        With SEARCH_ENABLE_CROSS_FIELD_AND_QUERIES, AND queries are compiled
+        to a cross_fields multi_match instead, which only needs each term to
+        be in one of the fields rather than all of them in the same field.
+        """
+        if isinstance(query, Boost):
+            return self._compile_multi_field_query(
+                query.subquery, fields, boost * query.boost
+            )
+        if type(query) is PlainText:
+            multi_field_query = self._compile_plaintext_query(query, fields, boost)
+            if query.operator == "and" and getattr(
+                settings, "SEARCH_ENABLE_CROSS_FIELD_AND_QUERIES", False
+            ):
+                # cross_fields (unlike combined_fields) allows the fields to
+                # have different analyzers
+                multi_field_query["multi_match"]["type"] = "cross_fields"
+            return multi_field_query
+        return None
+
     def to_string(self, field: Union[str, Field]) -> str:
         if isinstance(field, Field):
             return field.field_name
@@ -167,3 +233,118 @@ class ExtendedSearchQueryCompiler(Elasticsearch7SearchQueryCompiler):
 
         else:
             return self._join_and_compile_queries(self.query, fields)
+
+
+class ExtendedSearchResults(Elasticsearch7SearchResults):
+    """
+    Search requests also ask for the total number of hits, up to
+    SEARCH_TRACK_TOTAL_HITS, so counting the results after fetching some of
+    them (as SearchPaginator does) doesn't need another request
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # shared with clones, since slicing doesn't change the total
+        self._total_hits: dict[str, int] = {}
+
+    def _clone(self):
+        new = super()._clone()
+        new._total_hits = self._total_hits
+        return new
+
+    def _get_es_body(self, for_count=False):
+        if for_count:
+            return {"query": self.query_compiler.get_count_query()}
+        body = super()._get_es_body(for_count)
+        body["track_total_hits"] = getattr(
+            settings, "SEARCH_TRACK_TOTAL_HITS", DEFAULT_TRACK_TOTAL_HITS
+        )
+        return body
+
+    def _backend_do_search(self, body, **kwargs):
+        response = super()._backend_do_search(body, **kwargs)
+        total = response["hits"].get("total")
+        # past the cap, the total is only a lower bound so counting the
+        # results still needs a count request
+        if isinstance(total, dict) and total.get("relation") == "eq":
+            self._total_hits["value"] = total["value"]
+        return response
+
+    def _do_count(self):
+        if "value" not in self._total_hits:
+            return super()._do_count()
+
+        hit_count = self._total_hits["value"] - self.start
+        if self.stop is not None:
+            hit_count = min(hit_count, self.stop - self.start)
+        return max(hit_count, 0)
+
+
+class SearchableFieldRegistry:
+    """
+    Maps the field names used in queries (including dotted paths into
+    RelatedFields) to index columns and boosts for one model, so compiling a
+    query doesn't have to regenerate the model's search fields.
+
+    The columns and settings keys of every path into a RelatedFields tree are
+    worked out up front; boosts are resolved the first time each field is
+    asked for. Lookups still record the settings the remapped field depends
+    on.
+    """
+
+    def __init__(self, searchable_fields, mapping, model, dependencies=()):
+        self.searchable_fields = {f.field_name: f for f in searchable_fields}
+        self.mapping = mapping
+        self.model = model
+        self.dependencies = frozenset(dependencies)
+        self.related_field_paths = self._get_related_field_paths()
+        self.remapped_fields: dict[str, tuple[Optional[Field], frozenset[str]]] = {}
+
+    def _get_related_field_paths(self) -> dict[str, tuple[str, str]]:
+        """
+        Returns the column name and settings key for every dotted path into the
+        model's RelatedFields
+        """
+        related_field_paths = {}
+        for field_name, field in self.searchable_fields.items():
+            if not hasattr(field, "get_related_field_paths"):
+                continue
+            column_name = self.mapping.get_field_column_name(field)
+            for path, child_field in field.get_related_field_paths().items():
+                related_field_paths[f"{field_name}.{path}"] = (
+                    f"{column_name}.{path}",
+                    search_settings.get_settings_field_key(self.model, child_field),
+                )
+        return related_field_paths
+
+    def get_remapped_field(self, field_name: str) -> Optional[Field]:
+        if field_name not in self.remapped_fields:
+            with search_settings.record_settings_dependencies() as dependencies:
+                remapped_field = self._remap_field(field_name)
+            self.remapped_fields[field_name] = (
+                remapped_field,
+                frozenset(dependencies),
+            )
+
+        remapped_field, dependencies = self.remapped_fields[field_name]
+        search_settings.record_settings_dependencies_used(
+            *self.dependencies, *dependencies
+        )
+        return remapped_field
+
+    def _remap_field(self, field_name: str) -> Optional[Field]:
+        field = self.searchable_fields.get(field_name)
+        if field:
+            column_name = self.mapping.get_field_column_name(field)
+            return Field(column_name, field.boost or 1)
+
+        if field_name not in self.related_field_paths:
+            return None
+
+        # Get the field boost from the settings so it can be managed in the DB.
+        column_name, field_settings_key = self.related_field_paths[field_name]
+        field_boost = get_boost_table().get_field_boost(field_settings_key)
+        return Field(column_name, boost=field_boost)
+
+
+_searchable_field_registries: tuple[object, dict] = (None, {})
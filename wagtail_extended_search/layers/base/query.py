@@ -0,0 +1,159 @@
+import copy
+import weakref
+
+from wagtail.search.query import SearchQuery
+
+
+class ImmutableSearchQuery(SearchQuery):
+    """
+    A SearchQuery whose attributes can't be reassigned once it has been
+    initialised, so a single built query can be shared between threads and
+    requests. Use `replace` to get a changed copy instead.
+    """
+
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise AttributeError(f"{self.__class__.__name__} instances are immutable")
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        if getattr(self, "_frozen", False):
+            raise AttributeError(f"{self.__class__.__name__} instances are immutable")
+        super().__delattr__(name)
+
+    def __setstate__(self, state):
+        # used by copy and pickle, which would otherwise be stopped by
+        # __setattr__ once _frozen has been restored
+        self.__dict__.update(state)
+
+    def freeze(self):
+        """
+        Call this at the end of __init__, once all attributes are set
+        """
+        object.__setattr__(self, "_frozen", True)
+
+    def replace(self, **changes):
+        """
+        Returns a shallow copy of this query with the given attributes changed,
+        sharing everything else with the original
+        """
+        new_query = copy.copy(self)
+        for name, value in changes.items():
+            object.__setattr__(new_query, name, value)
+        return new_query
+
+
+def get_query_attributes(query: SearchQuery) -> dict:
+    """
+    Returns a copy of a query's attributes
+    """
+    return dict(vars(query))
+
+
+def get_query_key(query) -> tuple:
+    """
+    Returns a hashable key describing a query's structure, equal for any two
+    queries that would compile to the same thing
+    """
+    if isinstance(query, SearchQuery):
+        return (
+            type(query),
+            tuple(
+                (name, get_query_key(value))
+                for name, value in sorted(get_query_attributes(query).items())
+                if not name.startswith("_")
+            ),
+        )
+    if isinstance(query, (list, tuple)):
+        return tuple(get_query_key(value) for value in query)
+    if isinstance(query, dict):
+        return tuple(
+            (name, get_query_key(value)) for name, value in sorted(query.items())
+        )
+    return query
+
+
+def replace_query_attributes(query: SearchQuery, **changes) -> SearchQuery:
+    """
+    Returns a shallow copy of the query with the given attributes changed,
+    leaving the (possibly cached and shared) original untouched.
+    """
+    if isinstance(query, ImmutableSearchQuery):
+        return query.replace(**changes)
+
+    # Wagtail's own query classes, e.g. Or, And, Not, Boost
+    new_query = copy.copy(query)
+    for name, value in changes.items():
+        setattr(new_query, name, value)
+    return new_query
+
+
+_interned_queries: "weakref.WeakValueDictionary[tuple, SearchQuery]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+def intern_query(query: SearchQuery) -> SearchQuery:
+    """
+    Returns the one shared instance of a query structurally equal to the one
+    given, interning its subqueries first, so identical subtrees of built
+    queries are held in memory once however many queries they appear in.
+
+    Only subtrees made up entirely of ImmutableSearchQuery nodes are shared.
+    Wagtail's own query classes (e.g. Or, Boost) can be changed in place, so
+    they, and any node above them, are kept to the query they were built for.
+    """
+    return _intern_query(query)[0]
+
+
+def _intern_query(query: SearchQuery) -> tuple[SearchQuery, bool]:
+    """
+    Returns the query with its subqueries interned, and whether it can be
+    shared itself
+    """
+    shareable = isinstance(query, ImmutableSearchQuery)
+    changes = {}
+    for name, value in get_query_attributes(query).items():
+        if isinstance(value, SearchQuery):
+            interned_value, value_shareable = _intern_query(value)
+            shareable = shareable and value_shareable
+            if interned_value is not value:
+                changes[name] = interned_value
+        elif isinstance(value, list) and any(isinstance(v, SearchQuery) for v in value):
+            interned_value = []
+            for v in value:
+                if isinstance(v, SearchQuery):
+                    v, v_shareable = _intern_query(v)
+                    shareable = shareable and v_shareable
+                interned_value.append(v)
+            if any(a is not b for a, b in zip(interned_value, value)):
+                changes[name] = interned_value
+    if changes:
+        query = replace_query_attributes(query, **changes)
+    if not shareable:
+        return query, False
+
+    try:
+        # subqueries are interned already, so can be told apart by identity
+        key = (
+            type(query),
+            tuple(
+                (name, _get_interning_key(value))
+                for name, value in sorted(get_query_attributes(query).items())
+                if not name.startswith("_")
+            ),
+        )
+        return _interned_queries.setdefault(key, query), True
+    except TypeError:
+        # something in the query can't be hashed, so it can't be shared
+        return query, False
+
+
+def _get_interning_key(value):
+    if isinstance(value, SearchQuery):
+        return id(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(_get_interning_key(v) for v in value)
+    if isinstance(value, dict):
+        return tuple((k, _get_interning_key(v)) for k, v in sorted(value.items()))
+    return value
@@ -1,27 +1,52 @@
-from wagtail.search.query import Fuzzy, Phrase
+from typing import Optional
+
+from django.conf import settings
+from wagtail.search.query import Boost, Fuzzy, Or, Phrase, PlainText
 
 from wagtail_extended_search.layers.base.backends.backend import (
     ExtendedSearchQueryCompiler,
 )
+from wagtail_extended_search.layers.boost.query import BoundedFuzzy
 
 
 class BoostSearchQueryCompiler(ExtendedSearchQueryCompiler):
     def _compile_query(self, query, field, boost=1.0):
+        if isinstance(query, Or) and getattr(
+            settings, "SEARCH_ENABLE_FUSED_FIELD_QUERIES", False
+        ):
+            fused_query = self._compile_fused_query(query, field, boost)
+            if fused_query is not None:
+                return fused_query
         if isinstance(query, Fuzzy):
             return self._compile_fuzzy_query(query, [field], boost)
         if isinstance(query, Phrase):
             return self._compile_phrase_query(query, [field], boost)
         return super()._compile_query(query, field, boost)
 
+    def _compile_multi_field_query(self, query, fields, boost=1.0):
+        if isinstance(query, Fuzzy):
+            return self._compile_fuzzy_query(query, fields, boost)
+        if isinstance(query, Phrase):
+            return self._compile_phrase_query(query, fields, boost)
+        return super()._compile_multi_field_query(query, fields, boost)
+
     def _compile_fuzzy_query(self, query, fields, boost=1.0):
         """
-        Support boosting
+        Support boosting, and the options of BoundedFuzzy queries
         """
         match_query = super()._compile_fuzzy_query(query, fields)
 
+        if isinstance(query, BoundedFuzzy):
+            if "multi_match" in match_query:
+                match_query["multi_match"].update(query.get_options())
+            elif "match" in match_query:
+                for field in fields:
+                    match_query["match"][field.field_name].update(query.get_options())
+
         if boost != 1.0:
             if "multi_match" in match_query:
-                match_query["multi_match"]["boost"] = boost * fields[0].boost
+                # the fields' own boosts are already in the field^boost list
+                match_query["multi_match"]["boost"] = boost
             elif "match" in match_query:
                 for field in fields:
                     match_query["match"][field.field_name]["boost"] = (
@@ -38,7 +63,8 @@ class BoostSearchQueryCompiler(ExtendedSearchQueryCompiler):
 
         if boost != 1.0:
             if "multi_match" in match_query:
-                match_query["multi_match"]["boost"] = boost * fields[0].boost
+                # the fields' own boosts are already in the field^boost list
+                match_query["multi_match"]["boost"] = boost
             elif "match_phrase" in match_query:
                 for field in fields:
                     query = match_query["match_phrase"][field.field_name]
@@ -53,3 +79,70 @@ class BoostSearchQueryCompiler(ExtendedSearchQueryCompiler):
                         }
 
         return match_query
+
+    def _compile_fused_query(self, query: Or, field, boost=1.0) -> Optional[dict]:
+        """
+        Compiles the phrase, AND and OR queries for the same search query
+        string on a field into a single bool query: the OR query has to match,
+        and the AND and phrase queries add to its score as tiers for documents
+        with every term and with the exact phrase, each at its own boost.
+        Documents score the same as with the separate queries.
+
+        Returns None if the query isn't one that can be fused.
+        """
+        query_strings = set()
+        boosts = {"phrase": 0.0, "and": 0.0, "or": 0.0}
+        other_queries = []
+        for subquery in query.subqueries:
+            subquery_boost = 1.0
+            inner_query = subquery
+            if isinstance(inner_query, Boost):
+                subquery_boost = inner_query.boost
+                inner_query = inner_query.subquery
+
+            if isinstance(inner_query, Phrase):
+                boosts["phrase"] += subquery_boost
+            elif type(inner_query) is PlainText:
+                boosts[inner_query.operator] += subquery_boost
+            else:
+                other_queries.append(subquery)
+                continue
+            query_strings.add(inner_query.query_string)
+
+        if len(query_strings) != 1 or not boosts["or"] or not boosts["phrase"]:
+            return None
+
+        query_string = query_strings.pop()
+        tiers = [
+            self._compile_phrase_query(
+                Phrase(query_string), [field], boost * boosts["phrase"]
+            )
+        ]
+        if boosts["and"]:
+            tiers.append(
+                self._compile_plaintext_query(
+                    PlainText(query_string, operator="and"),
+                    [field],
+                    boost * boosts["and"],
+                )
+            )
+        fused_query = {
+            "bool": {
+                "must": self._compile_plaintext_query(
+                    PlainText(query_string, operator="or"),
+                    [field],
+                    boost * boosts["or"],
+                ),
+                "should": tiers,
+            }
+        }
+        if not other_queries:
+            return fused_query
+        return {
+            "bool": {
+                "should": [
+                    fused_query,
+                    *[self._compile_query(sq, field, boost) for sq in other_queries],
+                ]
+            }
+        }
@@ -0,0 +1,43 @@
+from typing import Optional, Union
+
+from wagtail.search.query import Fuzzy
+
+
+class BoundedFuzzy(Fuzzy):
+    """
+    A Fuzzy query with the options that bound how many terms each of its
+    tokens expands to; options left as None use the search backend's
+    defaults.
+    """
+
+    def __init__(
+        self,
+        query_string: str,
+        operator: str = Fuzzy.DEFAULT_OPERATOR,
+        fuzziness: Optional[Union[str, int]] = None,
+        prefix_length: Optional[int] = None,
+        max_expansions: Optional[int] = None,
+    ):
+        super().__init__(query_string, operator)
+        self.fuzziness = fuzziness
+        self.prefix_length = prefix_length
+        self.max_expansions = max_expansions
+
+    def get_options(self) -> dict:
+        return {
+            name: value
+            for name, value in (
+                ("fuzziness", self.fuzziness),
+                ("prefix_length", self.prefix_length),
+                ("max_expansions", self.max_expansions),
+            )
+            if value is not None
+        }
+
+    def __repr__(self):
+        options = "".join(
+            f" {name}={value!r}" for name, value in self.get_options().items()
+        )
+        return (
+            f"<BoundedFuzzy {self.query_string!r} operator={self.operator!r}{options}>"
+        )
@@ -5,6 +5,9 @@ from wagtail_extended_search.layers.base.backends.backend import (
 )
 from wagtail_extended_search.layers.filtered.query import Filtered
 
+# columns Wagtail's Elasticsearch mapping indexes as keyword fields
+KEYWORD_COLUMN_NAMES = ("content_type",)
+
 
 class FilteredSearchMapping(Elasticsearch7Mapping):
     def get_field_column_name(self, field):
@@ -42,9 +45,22 @@ class FilteredSearchQueryCompiler(ExtendedSearchQueryCompiler):
             column_name = self.mapping.get_field_column_name(field)
 
         if lookup == "contains":
-            return {"match": {column_name: value}}
+            # keyword columns are matched exactly by term(s) filters, without
+            # analysing the value, and can be cached by the search backend;
+            # any other column is analysed so still needs a match query
+            if column_name not in KEYWORD_COLUMN_NAMES:
+                return {"match": {column_name: value}}
+            if isinstance(value, (list, tuple)):
+                return {"terms": {column_name: list(value)}}
+            return {"term": {column_name: value}}
 
         if lookup == "excludes":
-            return {"bool": {"mustNot": {"terms": {column_name: value}}}}
+            if not isinstance(value, (list, tuple)):
+                value = [value]
+            return {"bool": {"mustNot": {"terms": {column_name: list(value)}}}}
 
         return super()._process_lookup(field, lookup, value)
+
+    def get_content_type_filter(self):
+        content_type = self.mapping_class(self.queryset.model).get_content_type()
+        return {"term": {"content_type": content_type}}
@@ -1,7 +1,9 @@
 from wagtail.search.query import SearchQuery
 
+from wagtail_extended_search.layers.base.query import ImmutableSearchQuery
 
-class Filtered(SearchQuery):
+
+class Filtered(ImmutableSearchQuery):
     def __init__(self, subquery: SearchQuery, filters: list[tuple]) -> None:
         if not isinstance(subquery, SearchQuery):
             raise TypeError("The `subquery` parameter must be of type SearchQuery")
@@ -14,6 +16,7 @@ class Filtered(SearchQuery):
 
         self.subquery = subquery
         self.filters = filters
+        self.freeze()
 
     def __repr__(self) -> str:
         return "<Filtered {} filters=[{}]>".format(
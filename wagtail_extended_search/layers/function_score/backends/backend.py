@@ -11,21 +11,19 @@ class FunctionScoreSearchQueryCompiler(ExtendedSearchQueryCompiler):
         return super()._compile_query(query, field, boost)
 
     def _compile_function_score_query(self, query, fields, boost=1.0):
-        if query.function_name == "script_score":
-            params = query.function_params
-        else:  # it's a decay query
-            score_functions = {
-                f.function_name: f for f in query.model_class.get_score_functions()
-            }
-            score_func = score_functions[query.function_name]
+        if self.for_count:
+            # score functions don't change what matches
+            return self._join_and_compile_queries(query.subquery, fields, boost)
 
-            # This is in place of get_field_column_name to build the name of the indexed field.
-            remapped_field_name = score_func.get_score_name() + "_filter"
-            params = {remapped_field_name: query.function_params["_field_name_"]}
-
-        return {
-            "function_score": {
-                "query": self._join_and_compile_queries(query.subquery, fields, boost),
-                query.function_name: params,
-            }
+        function_score = {
+            "query": self._join_and_compile_queries(query.subquery, fields, boost),
+            "functions": [
+                {function_name: function_params}
+                for function_name, function_params in query.functions
+            ],
         }
+        if query.score_mode is not None:
+            function_score["score_mode"] = query.score_mode
+        if query.boost_mode is not None:
+            function_score["boost_mode"] = query.boost_mode
+        return {"function_score": function_score}
@@ -84,6 +84,17 @@ class ScoreFunction:
             )
         return score_name
 
+    def get_query_params(self) -> dict:
+        """
+        The function's params as they're passed to the search backend, with
+        decay functions pointing at the indexed field they score on
+        """
+        if self.function_name == "script_score":
+            return self.params
+
+        # This is in place of get_field_column_name to build the name of the indexed field.
+        return {self.get_score_name() + "_filter": self.params["_field_name_"]}
+
     def generate_fields(
         self,
         parent_field: Optional[BaseField] = None,
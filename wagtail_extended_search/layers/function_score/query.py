@@ -3,40 +3,73 @@ from typing import Optional
 from django.db import models
 from wagtail.search.query import SearchQuery
 
+from wagtail_extended_search.layers.base.query import ImmutableSearchQuery
+
+# how the scores of the functions are combined with each other
+FUNCTION_SCORE_MODES = ("multiply", "sum", "avg", "first", "max", "min")
+# how the combined function score is combined with the query's score
+FUNCTION_BOOST_MODES = ("multiply", "replace", "sum", "avg", "max", "min")
+
+
+class FunctionScore(ImmutableSearchQuery):
+    """
+    Applies all of a model's score functions to the subquery's score at once;
+    functions is a tuple of (function_name, function_params) pairs, with the
+    params as they're passed to the search backend (see
+    ScoreFunction.get_query_params)
+    """
 
-class FunctionScore(SearchQuery):
     remapped_fields = None
 
     def __init__(
         self,
         model_class: models.Model,
         subquery: SearchQuery,
-        function_name: str,
-        function_params: dict,
-        field: Optional[str] = None,
+        functions: tuple[tuple[str, dict], ...],
+        score_mode: Optional[str] = None,
+        boost_mode: Optional[str] = None,
     ):
         if not isinstance(subquery, SearchQuery):
             raise TypeError("The `subquery` parameter must be of type SearchQuery")
 
-        if not isinstance(function_name, str):
-            raise TypeError("The `function_name` parameter must be a string")
+        if not isinstance(functions, (list, tuple)) or not functions:
+            raise TypeError("The `functions` parameter must be a non-empty tuple")
+
+        for function in functions:
+            if (
+                not isinstance(function, tuple)
+                or len(function) != 2
+                or not isinstance(function[0], str)
+                or not isinstance(function[1], dict)
+            ):
+                raise TypeError(
+                    "Each of the `functions` must be a (function_name, "
+                    "function_params) tuple"
+                )
 
-        if not isinstance(function_params, dict):
-            raise TypeError("The `function_params` parameter must be a dict")
+        if score_mode is not None and score_mode not in FUNCTION_SCORE_MODES:
+            raise ValueError(
+                f"The `score_mode` parameter must be one of {FUNCTION_SCORE_MODES}"
+            )
 
-        if field is not None and not isinstance(field, str):
-            raise TypeError("The `field` parameter must be a string")
+        if boost_mode is not None and boost_mode not in FUNCTION_BOOST_MODES:
+            raise ValueError(
+                f"The `boost_mode` parameter must be one of {FUNCTION_BOOST_MODES}"
+            )
 
         self.model_class = model_class
         self.subquery = subquery
-        self.function_name = function_name
-        self.function_params = function_params
-        self.field = field
+        self.functions = tuple(functions)
+        self.score_mode = score_mode
+        self.boost_mode = boost_mode
+        self.freeze()
 
     def __repr__(self):
-        return "<FunctionScore {} function_name='{}' function_params='{}' field='{}' >".format(
-            repr(self.subquery),
-            self.function_name,
-            self.function_params,
-            self.field,
+        return (
+            "<FunctionScore {} functions={} score_mode='{}' boost_mode='{}' >".format(
+                repr(self.subquery),
+                [function_name for function_name, _ in self.functions],
+                self.score_mode,
+                self.boost_mode,
+            )
         )
@@ -18,6 +18,16 @@ class ModelFieldNameMixin:
         self.parent_field = parent_field
         self.configuration_model = configuration_model
 
+    @property
+    def parent_field(self):
+        return self._parent_field
+
+    @parent_field.setter
+    def parent_field(self, parent_field):
+        self._parent_field = parent_field
+        # the definition model is found by the field that owns the relation
+        self._definition_models = {}
+
     def get_field(self, cls):
         return cls._meta.get_field(self.model_field_name)
 
@@ -25,6 +35,12 @@ class ModelFieldNameMixin:
         if self.configuration_model:
             return self.configuration_model
 
+        # finding it can mean walking the MRO, but the answer never changes
+        if cls not in self._definition_models:
+            self._definition_models[cls] = self._get_definition_model(cls)
+        return self._definition_models[cls]
+
+    def _get_definition_model(self, cls):
         if base_cls := super().get_definition_model(cls):
             return base_cls
 
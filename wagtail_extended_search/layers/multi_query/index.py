@@ -1,6 +1,11 @@
+from typing import Optional
+
 from wagtail_extended_search.layers.one_to_many.index import IndexedField
 from wagtail_extended_search.types import AnalysisType
 
+# see the fuzzy settings
+FUZZY_OPTIONS = ("fuzziness", "prefix_length", "max_expansions", "min_token_length")
+
 
 class MultiQueryIndexedField(IndexedField):
     def __init__(
@@ -9,6 +14,7 @@ class MultiQueryIndexedField(IndexedField):
         tokenized: bool = False,
         explicit: bool = False,
         fuzzy: bool = False,
+        fuzzy_options: Optional[dict] = None,
         **kwargs,
     ):
         super().__init__(*args, **kwargs)
@@ -16,6 +22,11 @@ class MultiQueryIndexedField(IndexedField):
         self.explicit = explicit
         self.fuzzy = fuzzy
 
+        self.fuzzy_options = dict(fuzzy_options or {})
+        for option in self.fuzzy_options:
+            if option not in FUZZY_OPTIONS:
+                raise TypeError(f"{option} isn't a fuzzy option")
+
         if tokenized or explicit or fuzzy:
             self.search = True
 
@@ -46,10 +57,12 @@ class MultiQueryIndexedField(IndexedField):
         from wagtail_extended_search.index import get_indexed_field_name
 
         field_settings_key = search_settings.get_settings_field_key(cls, self)
-        field_boosts = search_settings.wagtail_extended_search_settings["boost_parts"][
-            "fields"
-        ]
-        field_boost = field_boosts.get(field_settings_key)
+        try:
+            field_boost = search_settings.get_setting(
+                f"boost_parts__fields__{field_settings_key}"
+            )
+        except KeyError:
+            field_boost = None
 
         search_field_variants = []
 
@@ -57,9 +70,9 @@ class MultiQueryIndexedField(IndexedField):
             variant_args = (get_indexed_field_name(self.model_field_name, analyzer),)
             variant_kwargs = {
                 "es_extra": {
-                    "analyzer": search_settings.wagtail_extended_search_settings[
-                        "analyzers"
-                    ][analyzer.value]["es_analyzer"]
+                    "analyzer": search_settings.get_setting(
+                        f"analyzers__{analyzer.value}__es_analyzer"
+                    )
                 },
             }
 
@@ -20,13 +20,22 @@ class NestedSearchQueryCompiler(ExtendedSearchQueryCompiler):
             return self._compile_nested_query(query, [field], boost)
         return super()._compile_query(query, field, boost)
 
+    def _compile_multi_field_query(self, query, fields, boost=1.0):
+        # one nested query for all the fields, rather than one for each
+        if isinstance(query, Nested):
+            return self._compile_nested_query(query, fields, boost)
+        return super()._compile_multi_field_query(query, fields, boost)
+
     def _compile_nested_query(self, query, fields, boost=1.0):
         """
         Add OS DSL elements to support Nested fields
         """
-        return {
-            "nested": {
-                "path": query.path,
-                "query": self._join_and_compile_queries(query.subquery, fields, boost),
-            }
+        nested_query = {
+            "path": query.path,
+            "query": self._join_and_compile_queries(query.subquery, fields, boost),
         }
+        if self.for_count:
+            nested_query["score_mode"] = "none"
+        elif query.score_mode:
+            nested_query["score_mode"] = query.score_mode
+        return {"nested": nested_query}
@@ -1,19 +1,37 @@
+from typing import Optional
+
 from wagtail.search.query import SearchQuery
 
+from wagtail_extended_search.layers.base.query import ImmutableSearchQuery
+
+# how the scores of matching nested documents are combined
+NESTED_SCORE_MODES = ("avg", "max", "min", "none", "sum")
 
-class Nested(SearchQuery):
-    def __init__(self, subquery: SearchQuery, path: str) -> None:
+
+class Nested(ImmutableSearchQuery):
+    def __init__(
+        self, subquery: SearchQuery, path: str, score_mode: Optional[str] = None
+    ) -> None:
         if not isinstance(subquery, SearchQuery):
             raise TypeError("The `subquery` parameter must be of type SearchQuery")
 
         if not isinstance(path, str):
             raise TypeError("The `path` parameter must be a string")
 
+        if score_mode is not None and score_mode not in NESTED_SCORE_MODES:
+            raise ValueError(
+                f"The `score_mode` parameter must be one of {NESTED_SCORE_MODES}"
+            )
+
         self.subquery = subquery
         self.path = path
+        self.score_mode = score_mode
+        self.freeze()
 
     def __repr__(self) -> str:
-        return "<Nested {} path='{}'>".format(
+        score_mode = f" score_mode='{self.score_mode}'" if self.score_mode else ""
+        return "<Nested {} path='{}'{}>".format(
             repr(self.subquery),
             self.path,
+            score_mode,
         )
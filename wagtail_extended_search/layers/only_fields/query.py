@@ -1,8 +1,10 @@
 from django.db import models
 from wagtail.search.query import SearchQuery
 
+from wagtail_extended_search.layers.base.query import ImmutableSearchQuery
 
-class OnlyFields(SearchQuery):
+
+class OnlyFields(ImmutableSearchQuery):
     remapped_fields = None
 
     def __init__(
@@ -17,6 +19,7 @@ class OnlyFields(SearchQuery):
         self.subquery = subquery
         self.only_model = only_model
         self.fields = fields
+        self.freeze()
 
     def __repr__(self) -> str:
         return "<OnlyFields {} fields=[{}]>".format(
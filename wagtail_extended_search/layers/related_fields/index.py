@@ -6,14 +6,26 @@ from modelcluster.fields import ParentalManyToManyField
 from wagtail.search import index
 
 from wagtail_extended_search.layers.model_field_name.index import ModelFieldNameMixin
+from wagtail_extended_search.layers.nested.query import NESTED_SCORE_MODES
+from wagtail_extended_search.layers.one_to_many.index import IndexedField
 
 if TYPE_CHECKING:
     from wagtail_extended_search.index import Indexed
     from wagtail_extended_search.layers.model_field_name.index import BaseField
-    from wagtail_extended_search.layers.one_to_many.index import IndexedField
 
 
 class RelatedFields(ModelFieldNameMixin, index.RelatedFields):
+    def __init__(self, *args, score_mode: Optional[str] = None, **kwargs):
+        """
+        score_mode sets how the scores of the related objects that match a
+        search are combined (see NESTED_SCORE_MODES); the search backend's
+        default is "avg"
+        """
+        super().__init__(*args, **kwargs)
+        if score_mode is not None and score_mode not in NESTED_SCORE_MODES:
+            raise ValueError(f"score_mode must be one of {NESTED_SCORE_MODES}")
+        self.score_mode = score_mode
+
     def select_on_queryset(self, queryset):
         """
         This method runs either prefetch_related or select_related on the queryset
@@ -78,22 +90,45 @@ class RelatedFields(ModelFieldNameMixin, index.RelatedFields):
                 parent_field=self.parent_field,
                 configuration_model=self.configuration_model,
                 fields=generated_fields,
+                score_mode=self.score_mode,
             )
         ]
 
     def get_related_field(self, field_name):
         """
-        Return the "child most" related field for a given field name.
+        Return the "child most" related field for a given field name, only
+        walking the fields along its path.
 
         Example:
             `author.books.title` would return the title SearchField
         """
+        field_name, _, child_field_name = field_name.partition(".")
+        for field in self.fields:
+            if field.field_name != field_name:
+                continue
+            if not child_field_name:
+                return field
+            if isinstance(field, RelatedFields):
+                return field.get_related_field(child_field_name)
+            return None
+        return None
+
+    def get_related_field_paths(self) -> dict[str, index.BaseField]:
+        """
+        Returns every field under this one keyed by its dotted path (relative
+        to this field). This walks the whole tree, so it isn't cached here:
+        SearchableFieldRegistry keeps the paths for each settings snapshot.
+
+        Example:
+            `{"books": <RelatedFields books>, "books.title": <SearchField title>}`
+        """
+        related_field_paths = {}
         for f in self.fields:
-            if f.field_name == field_name:
-                if isinstance(f, RelatedFields):
-                    new_field_name = field_name.split(".")[1:]
-                    return f.get_related_field(new_field_name)
-                return f
+            related_field_paths[f.field_name] = f
+            if isinstance(f, RelatedFields):
+                for path, child_field in f.get_related_field_paths().items():
+                    related_field_paths[f"{f.field_name}.{path}"] = child_field
+        return related_field_paths
 
     def __repr__(self) -> str:
         return f"<RelatedFields {self.field_name} fields={sorted([str(f) for f in self.fields])}>"
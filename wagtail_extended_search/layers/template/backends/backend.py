@@ -0,0 +1,36 @@
+from wagtail_extended_search.layers.base.backends.backend import (
+    ExtendedSearchQueryCompiler,
+)
+from wagtail_extended_search.layers.template.query import QueryTemplate
+
+
+class TemplateSearchQueryCompiler(ExtendedSearchQueryCompiler):
+    def get_inner_query(self):
+        if isinstance(self.query, QueryTemplate):
+            return self._compile_template_query(self.query)
+        return super().get_inner_query()
+
+    def _compile_query(self, query, field, boost=1.0):
+        if isinstance(query, QueryTemplate):
+            raise NotImplementedError(
+                "`QueryTemplate` can only be used as the root query of a search."
+            )
+        return super()._compile_query(query, field, boost)
+
+    def _compile_template_query(self, query):
+        """
+        Templates are compiled against the default fields of the model they
+        were built for, so they can't be reused for anything else
+        """
+        if self.fields:
+            raise ValueError(
+                "`QueryTemplate` queries don't support searching explicit fields"
+            )
+
+        if query.model_class != self.queryset.model:
+            raise ValueError(
+                f"This `QueryTemplate` was compiled for {query.model_class.__name__}, "
+                f"not {self.queryset.model.__name__}"
+            )
+
+        return query.render(for_count=self.for_count)
@@ -0,0 +1,98 @@
+import json
+from typing import Optional
+
+from django.db import models
+
+from wagtail_extended_search.layers.base.query import ImmutableSearchQuery
+
+# Mustache style so the serialized DSL reads like an OpenSearch search template
+QUERY_SLOT = "{{search_query}}"
+
+
+class QueryTemplate(ImmutableSearchQuery):
+    """
+    A query that has already been compiled into the search backend's DSL, with
+    slots where the user's query string goes. Binding a query string to it is
+    a string join, so nothing needs compiling per request.
+
+    It can also hold the fragments of the query compiled for counting matches
+    (see ExtendedSearchQueryCompiler.get_count_query).
+    """
+
+    def __init__(
+        self,
+        model_class: models.Model,
+        fragments: list[str],
+        query_string: Optional[str] = None,
+        count_fragments: Optional[list[str]] = None,
+    ) -> None:
+        if not isinstance(fragments, list) or not fragments:
+            raise TypeError("The `fragments` parameter must be a non-empty list")
+
+        if count_fragments is not None and (
+            not isinstance(count_fragments, list) or not count_fragments
+        ):
+            raise TypeError("The `count_fragments` parameter must be a non-empty list")
+
+        if query_string is not None and not isinstance(query_string, str):
+            raise TypeError("The `query_string` parameter must be a string")
+
+        self.model_class = model_class
+        self.fragments = fragments
+        self.query_string = query_string
+        self.count_fragments = count_fragments
+        self.freeze()
+
+    @classmethod
+    def from_compiled_query(
+        cls,
+        model_class: models.Model,
+        compiled_query: dict,
+        compiled_count_query: Optional[dict] = None,
+    ) -> "QueryTemplate":
+        """
+        Serializes a compiled query that was built with QUERY_SLOT in place of
+        the query string, and splits it into fragments around those slots
+        """
+        count_fragments = None
+        if compiled_count_query is not None:
+            count_fragments = cls._split_compiled_query(compiled_count_query)
+        return cls(
+            model_class,
+            cls._split_compiled_query(compiled_query),
+            count_fragments=count_fragments,
+        )
+
+    @staticmethod
+    def _split_compiled_query(compiled_query: dict) -> list[str]:
+        serialized_query = json.dumps(compiled_query, separators=(",", ":"))
+        serialized_slot = json.dumps(QUERY_SLOT)[1:-1]
+        return serialized_query.split(serialized_slot)
+
+    def bind(self, query_string: str) -> "QueryTemplate":
+        return self.__class__(
+            self.model_class, self.fragments, query_string, self.count_fragments
+        )
+
+    def render(self, for_count: bool = False) -> dict:
+        """
+        Renders the query with the bound query string, or the query for
+        counting matches if there is one and for_count is set
+        """
+        if self.query_string is None:
+            raise ValueError("A query string must be bound before rendering")
+
+        fragments = self.fragments
+        if for_count and self.count_fragments is not None:
+            fragments = self.count_fragments
+
+        # escape the query string the same way the rest of the DSL was escaped
+        serialized_query_string = json.dumps(self.query_string)[1:-1]
+        return json.loads(serialized_query_string.join(fragments))
+
+    def __repr__(self) -> str:
+        return "<QueryTemplate model='{}' slots={} query_string={}>".format(
+            self.model_class.__name__,
+            len(self.fragments) - 1,
+            repr(self.query_string),
+        )
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+
+from wagtail_extended_search.layers.base.backends.backend import ExtendedSearchResults
+
+# Elasticsearch's default index.max_result_window; from + size can't go past it
+DEFAULT_MAX_RESULT_WINDOW = 10000
+
+
+class SearchPaginator(Paginator):
+    """
+    Paginates search results with a single search request per page: the
+    page's results are fetched before the results are counted, so the count
+    comes from the same response (see ExtendedSearchResults)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._prefetched_pages = {}
+
+    def page(self, number):
+        if isinstance(self.object_list, ExtendedSearchResults):
+            self._prefetch_page(number)
+        return super().page(number)
+
+    def _prefetch_page(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            # validate_number raises the right error
+            return
+        if number < 1 or number in self._prefetched_pages:
+            return
+
+        bottom = (number - 1) * self.per_page
+        # the last page can take up to `orphans` extra results
+        top = bottom + self.per_page + self.orphans
+        total = self._get_known_total()
+        if total is not None and bottom >= total:
+            # out of range, so validate_number raises EmptyPage
+            return
+        if top > getattr(
+            settings, "SEARCH_MAX_RESULT_WINDOW", DEFAULT_MAX_RESULT_WINDOW
+        ):
+            # the search backend would reject the request; count the results
+            # first so validate_number can check the page
+            return
+
+        self._prefetched_pages[number] = (bottom, list(self.object_list[bottom:top]))
+
+    def _get_known_total(self):
+        if "count" in self.__dict__:
+            return self.count
+        return self.object_list._total_hits.get("value")
+
+    def _get_page(self, object_list, number, paginator):
+        if number in self._prefetched_pages:
+            bottom, results = self._prefetched_pages[number]
+            top = bottom + self.per_page
+            if top + self.orphans >= self.count:
+                top = self.count
+            object_list = results[: top - bottom]
+        return super()._get_page(object_list, number, paginator)
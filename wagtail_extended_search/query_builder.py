@@ -1,111 +1,180 @@
-import inspect
 import logging
-from typing import Optional, Type
+import re
+from typing import Callable, Optional, Type
 
 from django.conf import settings
-from django.core.cache import cache
 from django.db import models
 from wagtail.search import index
-from wagtail.search.query import Boost, Fuzzy, Phrase, PlainText, SearchQuery
+from wagtail.search.backends import get_search_backend
+from wagtail.search.query import And, Boost, Fuzzy, Or, Phrase, PlainText, SearchQuery
 
 from wagtail_extended_search import settings as search_settings
+from wagtail_extended_search.boosts import get_boost_table
+from wagtail_extended_search.cache import query_cache
 from wagtail_extended_search.index import (
     BaseField,
     Indexed,
     get_indexed_field_name,
-    get_indexed_models,
+    get_model_hierarchy,
 )
+from wagtail_extended_search.layers.base.query import (
+    get_query_key,
+    intern_query,
+    replace_query_attributes,
+)
+from wagtail_extended_search.layers.boost.query import BoundedFuzzy
 from wagtail_extended_search.layers.filtered.query import Filtered
 from wagtail_extended_search.layers.function_score.index import ScoreFunction
 from wagtail_extended_search.layers.function_score.query import FunctionScore
 from wagtail_extended_search.layers.model_field_name.index import SearchField
+from wagtail_extended_search.layers.multi_query.index import FUZZY_OPTIONS
 from wagtail_extended_search.layers.nested.query import Nested
 from wagtail_extended_search.layers.one_to_many.index import IndexedField
 from wagtail_extended_search.layers.only_fields.query import OnlyFields
 from wagtail_extended_search.layers.related_fields.index import RelatedFields
-from wagtail_extended_search.types import AnalysisType, SearchQueryType
+from wagtail_extended_search.layers.template.query import QUERY_SLOT, QueryTemplate
+from wagtail_extended_search.tokenizer import tokenize
+from wagtail_extended_search.types import AnalysisType, QueryShape, SearchQueryType
 
 logger = logging.getLogger(__name__)
 
+NUMERIC_QUERY_RE = re.compile(r"\d+(?:[.,]\d+)*")
+
 
 class Variable:
-    def __init__(self, name: str, query_type: SearchQueryType) -> None:
-        self.name = name
-        self.query_type = query_type
+    """
+    Placeholder for the search query string in a built query. Immutable so
+    that built queries can be cached and shared; swap_variables never changes
+    the query it's given.
+
+    The analyzer is the es_analyzer of the fields the variable is searched
+    against, used to work out which tokens the search backend will look for.
+    Fuzzy variables also carry the options for their fuzzy queries (see the
+    fuzzy settings).
+    """
+
+    __slots__ = ("name", "query_type", "analyzer", "fuzzy_options")
+
+    def __init__(
+        self,
+        name: str,
+        query_type: SearchQueryType,
+        analyzer: Optional[str] = None,
+        fuzzy_options: Optional[dict] = None,
+    ) -> None:
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "query_type", query_type)
+        object.__setattr__(self, "analyzer", analyzer)
+        object.__setattr__(
+            self, "fuzzy_options", tuple(sorted((fuzzy_options or {}).items()))
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Variable instances are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Variable instances are immutable")
+
+    def __reduce__(self):
+        return (
+            self.__class__,
+            (self.name, self.query_type, self.analyzer, dict(self.fuzzy_options)),
+        )
 
-    def output(self, query_str: str):
-        # split can be super basic since we don't support advanced search
-        query_parts = query_str.split()
+    def _get_key(self) -> tuple:
+        return (self.name, self.query_type, self.analyzer, self.fuzzy_options)
+
+    def __eq__(self, other):
+        if not isinstance(other, Variable):
+            return NotImplemented
+        return self._get_key() == other._get_key()
+
+    def __hash__(self):
+        return hash(self._get_key())
+
+    def __repr__(self) -> str:
+        analyzer = f" analyzer={self.analyzer}" if self.analyzer else ""
+        fuzzy_options = "".join(f" {k}={v!r}" for k, v in self.fuzzy_options)
+        return (
+            f"<Variable {self.name} query_type={self.query_type}"
+            f"{analyzer}{fuzzy_options}>"
+        )
+
+    def output(self, query_str: str, word_count: Optional[int] = None):
+        if word_count is None and self.analyzer is not None:
+            return self._output_for_tokens(query_str)
+
+        if word_count is None:
+            # split can be super basic since we don't support advanced search
+            word_count = len(query_str.split())
         match self.query_type:
             case SearchQueryType.PHRASE:
                 query = Phrase(query_str)
             case SearchQueryType.QUERY_AND:
                 # check the query_str merits an AND - does it contain multiple words?
-                if len(query_parts) > 1:
+                if word_count > 1:
                     query = PlainText(query_str, operator="and")
                 else:
                     query = None
             case SearchQueryType.QUERY_OR:
                 query = PlainText(query_str, operator="or")
             case SearchQueryType.FUZZY:
-                query = Fuzzy(query_str)
+                query = self._get_fuzzy_query(query_str)
             case _:
                 raise ValueError(f"{self.query_type} must be a valid SearchQueryType")
         return query
 
+    def _get_fuzzy_query(self, query_str: str) -> Fuzzy:
+        fuzzy_options = dict(self.fuzzy_options)
+        fuzzy_options.pop("min_token_length", None)
+        if not fuzzy_options:
+            return Fuzzy(query_str)
+        return BoundedFuzzy(query_str, **fuzzy_options)
 
-class QueryBuilder:
-    @classmethod
-    def _get_boost_for_querytype(cls, query_type: SearchQueryType):
-        match query_type:
+    def _is_fuzzy_token(self, token: str) -> bool:
+        """
+        Numbers and short tokens aren't worth the expansions of a fuzzy query
+        """
+        min_token_length = dict(self.fuzzy_options).get("min_token_length") or 0
+        return len(token) >= min_token_length and not NUMERIC_QUERY_RE.fullmatch(token)
+
+    def _output_for_tokens(self, query_str: str):
+        """
+        Skips queries that can't match anything once the query string has been
+        through the analyzer (e.g. it's all stop words). The tokens are only an
+        approximation, so the search backend still gets the query string as
+        it was given.
+        """
+        tokens = tokenize(query_str, self.analyzer)
+        query = None
+        match self.query_type:
             case SearchQueryType.PHRASE:
-                query_boost_key = "phrase"
+                if tokens:
+                    query = Phrase(query_str)
             case SearchQueryType.QUERY_AND:
-                query_boost_key = "query_and"
+                # an AND of one distinct token is the same as the OR query
+                if len(tokens) > 1:
+                    query = PlainText(query_str, operator="and")
             case SearchQueryType.QUERY_OR:
-                query_boost_key = "query_or"
+                if tokens:
+                    query = PlainText(query_str, operator="or")
             case SearchQueryType.FUZZY:
-                query_boost_key = "fuzzy"
+                fuzzy_words = [w for w in query_str.split() if self._is_fuzzy_token(w)]
+                if tokens and fuzzy_words:
+                    query = self._get_fuzzy_query(" ".join(fuzzy_words))
             case _:
-                raise ValueError(f"{query_type} must be a valid SearchQueryType")
+                raise ValueError(f"{self.query_type} must be a valid SearchQueryType")
+        return query
 
-        if setting_boost := search_settings.wagtail_extended_search_settings[
-            "boost_parts"
-        ]["query_types"][query_boost_key]:
-            return float(setting_boost)
-        return 1.0
 
+class QueryBuilder:
     @classmethod
-    def _get_boost_for_analysistype(cls, analysis_type: AnalysisType):
-        match analysis_type:
-            case AnalysisType.EXPLICIT:
-                analysis_boost_key = "explicit"
-            case AnalysisType.TOKENIZED:
-                analysis_boost_key = "tokenized"
-            case AnalysisType.KEYWORD:
-                analysis_boost_key = "explicit"
-            case AnalysisType.FILTER:
-                raise ValueError("FILTER is not a valid AnalysisType for a query")
-            case _:
-                raise ValueError(f"{analysis_type} must be a valid AnalysisType")
-        if setting_boost := search_settings.wagtail_extended_search_settings[
-            "boost_parts"
-        ]["analyzers"][analysis_boost_key]:
-            return float(setting_boost)
-        return 1.0
+    def _get_boost_for_querytype(cls, query_type: SearchQueryType):
+        return get_boost_table().get_query_type_boost(query_type)
 
     @classmethod
-    def _get_boost_for_field(cls, model_class, field):
-        definition_class = field.get_definition_model(model_class)
-        field_key = search_settings.get_settings_field_key(definition_class, field)
-        try:
-            return float(
-                search_settings.wagtail_extended_search_settings["boost_parts"][
-                    "fields"
-                ][field_key]
-            )
-        except KeyError:
-            return 1.0
+    def _get_boost_for_analysistype(cls, analysis_type: AnalysisType):
+        return get_boost_table().get_analysis_type_boost(analysis_type)
 
     @classmethod
     def _get_boost_for_field_querytype_analysistype(
@@ -136,12 +205,34 @@ class QueryBuilder:
         )
 
         field_name = get_indexed_field_name(base_field_name, analysis_type)
+        es_analyzer = search_settings.get_setting(
+            f"analyzers__{analysis_type.value}__es_analyzer"
+        )
+        fuzzy_options = None
+        if query_type == SearchQueryType.FUZZY:
+            fuzzy_options = cls._get_fuzzy_options(field)
         return OnlyFields(
-            Boost(Variable("search_query", query_type), boost),
+            Boost(
+                Variable("search_query", query_type, es_analyzer, fuzzy_options),
+                boost,
+            ),
             fields=[field_name],
             only_model=model_class,
         )
 
+    @classmethod
+    def _get_fuzzy_options(cls, field: index.BaseField) -> dict:
+        """
+        Returns the fuzzy settings, overridden by any of the field's own
+        fuzzy_options
+        """
+        fuzzy_options = {
+            option: search_settings.get_setting(f"fuzzy__{option}")
+            for option in FUZZY_OPTIONS
+        }
+        fuzzy_options.update(getattr(field, "fuzzy_options", None) or {})
+        return fuzzy_options
+
     @classmethod
     def _combine_queries(cls, q1: Optional[SearchQuery], q2: Optional[SearchQuery]):
         if q1 and q2:
@@ -152,9 +243,9 @@ class QueryBuilder:
     def _build_search_query_for_searchfield(
         cls, model_class, field, subquery, analyzer
     ):
-        for query_type in search_settings.wagtail_extended_search_settings["analyzers"][
-            analyzer.value
-        ]["query_types"]:
+        for query_type in search_settings.get_setting(
+            f"analyzers__{analyzer.value}__query_types"
+        ):
             query_element = (
                 cls._build_searchquery_for_query_field_querytype_analysistype(
                     model_class,
@@ -226,7 +317,11 @@ class QueryBuilder:
                 )
 
             return cls._combine_queries(
-                Nested(subquery=internal_subquery, path=path),
+                Nested(
+                    subquery=internal_subquery,
+                    path=path,
+                    score_mode=getattr(field, "score_mode", None),
+                ),
                 None,
             )
 
@@ -250,9 +345,7 @@ class QueryBuilder:
         if not es_analyzer:
             return AnalysisType.TOKENIZED
 
-        analyzer_settings = search_settings.wagtail_extended_search_settings[
-            "analyzers"
-        ]
+        analyzer_settings = search_settings.get_setting("analyzers")
         for analyzer_name, analyzer_setting in analyzer_settings.items():
             if analyzer_setting["es_analyzer"] == es_analyzer:
                 return AnalysisType(analyzer_name)
@@ -268,7 +361,13 @@ class CustomQueryBuilder(QueryBuilder):
     """
 
     @classmethod
-    def build_query_for_model(cls, model_class) -> Optional[SearchQuery]:
+    def build_query_for_model(
+        cls, model_class, exclude_fields=frozenset()
+    ) -> Optional[SearchQuery]:
+        """
+        Builds the query for a model's indexed fields, leaving out any in
+        exclude_fields; the model's score functions are always applied
+        """
         if not issubclass(model_class, Indexed):
             raise ValueError(f"{model_class} must be a subclass of Indexed.")
 
@@ -277,7 +376,7 @@ class CustomQueryBuilder(QueryBuilder):
         for field in model_class.get_indexed_fields():
             if isinstance(field, ScoreFunction):
                 score_configurations.append(field)
-            else:
+            elif field not in exclude_fields:
                 query_elements = cls._build_search_query(model_class, field)
                 if query_elements is not None:
                     query = cls._combine_queries(
@@ -285,74 +384,530 @@ class CustomQueryBuilder(QueryBuilder):
                         query_elements,
                     )
 
-        if query:
-            for score_configuration in score_configurations:
-                query = FunctionScore(
-                    model_class=score_configuration.configuration_model,
-                    subquery=query,
-                    function_name=score_configuration.function_name,
-                    function_params=score_configuration.params,
-                )
+        if query and score_configurations:
+            query = FunctionScore(
+                model_class=model_class,
+                subquery=query,
+                functions=tuple(
+                    (
+                        score_configuration.function_name,
+                        score_configuration.get_query_params(),
+                    )
+                    for score_configuration in score_configurations
+                ),
+                score_mode=search_settings.get_setting("function_score__score_mode"),
+                boost_mode=search_settings.get_setting("function_score__boost_mode"),
+            )
 
         return query
 
     @classmethod
     def swap_variables(
-        cls, query: SearchQuery, search_query: str
+        cls, query: SearchQuery, search_query: str, word_count: Optional[int] = None
     ) -> Optional[SearchQuery]:
         """
         Iterate through the query and swap out variables for the search_query.
+
+        The query passed in isn't changed; nodes on the path to each variable
+        are copied instead, so cached queries can be bound concurrently.
         """
+        return cls._replace_variables(
+            query, lambda variable: variable.output(search_query, word_count)
+        )
 
+    @classmethod
+    def _replace_variables(
+        cls,
+        query: SearchQuery,
+        replace_variable: Callable[[Variable], Optional[SearchQuery]],
+    ) -> Optional[SearchQuery]:
+        """
+        Returns a copy of the query with each variable replaced by the result
+        of replace_variable, dropping any queries left without a subquery
+        """
         if isinstance(query, Variable):
-            return query.output(search_query)
+            return replace_variable(query)
 
         if hasattr(query, "subqueries"):
-            query.subqueries = [
-                cls.swap_variables(sq, search_query) for sq in query.subqueries
+            subqueries = [
+                cls._replace_variables(sq, replace_variable) for sq in query.subqueries
             ]
-            query.subqueries = [sq for sq in query.subqueries if sq]
+            subqueries = [sq for sq in subqueries if sq]
 
-            if not query.subqueries:
+            if not subqueries:
                 return None
-            elif len(query.subqueries) == 1:
-                return query.subqueries[0]
+            elif len(subqueries) == 1:
+                return subqueries[0]
+            return cls._replace_query_attributes(query, subqueries=subqueries)
 
         if hasattr(query, "subquery"):
-            query.subquery = cls.swap_variables(query.subquery, search_query)
-            if not query.subquery:
+            subquery = cls._replace_variables(query.subquery, replace_variable)
+            if not subquery:
                 return None
+            return cls._replace_query_attributes(query, subquery=subquery)
+
+        return query
+
+    @classmethod
+    def _replace_query_attributes(cls, query: SearchQuery, **changes) -> SearchQuery:
+        """
+        Returns a shallow copy of the query with the given attributes changed,
+        leaving the (possibly cached and shared) original untouched.
+        """
+        return replace_query_attributes(query, **changes)
+
+    @classmethod
+    def simplify_query(cls, query: SearchQuery) -> SearchQuery:
+        """
+        Returns an equivalent query that compiles to less DSL:
+         - Or and And queries nested in one of the same type are flattened
+         - sibling OnlyFields queries for the same field and model are merged
+           into one
+         - sibling Nested queries in an Or for the same path (and score_mode)
+           are merged into one, so the search backend joins the nested
+           documents once
+         - duplicate siblings are dropped
+
+        The query passed in isn't changed.
+        """
+        if isinstance(query, (Or, And)):
+            subqueries = []
+            for subquery in query.subqueries:
+                subquery = cls.simplify_query(subquery)
+                if type(subquery) is type(query):
+                    subqueries += subquery.subqueries
+                else:
+                    subqueries.append(subquery)
+
+            subqueries = cls._merge_only_fields_queries(type(query), subqueries)
+            if isinstance(query, Or):
+                subqueries = cls._merge_nested_queries(subqueries)
+
+            unique_subqueries = {}
+            for subquery in subqueries:
+                unique_subqueries.setdefault(get_query_key(subquery), subquery)
+            subqueries = list(unique_subqueries.values())
+
+            if len(subqueries) == 1:
+                return subqueries[0]
+            return cls._replace_query_attributes(query, subqueries=subqueries)
+
+        if isinstance(getattr(query, "subquery", None), SearchQuery):
+            subquery = cls.simplify_query(query.subquery)
+            if subquery is not query.subquery:
+                return cls._replace_query_attributes(query, subquery=subquery)
 
         return query
 
+    @classmethod
+    def _merge_only_fields_queries(
+        cls, query_class: Type[SearchQuery], subqueries: list[SearchQuery]
+    ) -> list[SearchQuery]:
+        """
+        Merges OnlyFields queries for the same single field and model into one
+        OnlyFields query around a query_class of their subqueries, in place of
+        the first of them.
+
+        Queries over more than one field are left alone: the compiler takes
+        the best scoring field for each, which isn't the same thing once
+        they're merged.
+        """
+        only_fields_groups = {}
+        for subquery in subqueries:
+            if isinstance(subquery, OnlyFields) and len(subquery.fields) == 1:
+                key = (subquery.only_model, subquery.fields[0])
+                only_fields_groups.setdefault(key, []).append(subquery)
+
+        merged_subqueries = []
+        for subquery in subqueries:
+            if not isinstance(subquery, OnlyFields) or len(subquery.fields) != 1:
+                merged_subqueries.append(subquery)
+                continue
+
+            group = only_fields_groups.pop(
+                (subquery.only_model, subquery.fields[0]), None
+            )
+            if group is None:
+                # already merged into an earlier sibling
+                continue
+            if len(group) == 1:
+                merged_subqueries.append(subquery)
+                continue
+
+            merged_subquery = cls.simplify_query(
+                query_class([only_fields.subquery for only_fields in group])
+            )
+            merged_subqueries.append(subquery.replace(subquery=merged_subquery))
+        return merged_subqueries
+
+    @classmethod
+    def _merge_nested_queries(cls, subqueries: list[SearchQuery]) -> list[SearchQuery]:
+        """
+        Merges Nested queries for the same path and score_mode into one Nested
+        query around an Or of their subqueries, in place of the first of them.
+        This only holds for the subqueries of an Or: in an And, each Nested
+        query can be matched by a different nested document.
+
+        With the default "avg" score_mode, a nested document matching only
+        some of the merged subqueries counts towards the average of them all,
+        so scores can shift a little; only "sum" scores exactly the same.
+        """
+        nested_groups = {}
+        for subquery in subqueries:
+            if isinstance(subquery, Nested):
+                key = (subquery.path, subquery.score_mode)
+                nested_groups.setdefault(key, []).append(subquery)
+
+        merged_subqueries = []
+        for subquery in subqueries:
+            if not isinstance(subquery, Nested):
+                merged_subqueries.append(subquery)
+                continue
+
+            group = nested_groups.pop((subquery.path, subquery.score_mode), None)
+            if group is None:
+                # already merged into an earlier sibling
+                continue
+            if len(group) == 1:
+                merged_subqueries.append(subquery)
+                continue
+
+            merged_subquery = cls.simplify_query(
+                Or([nested.subquery for nested in group])
+            )
+            merged_subqueries.append(subquery.replace(subquery=merged_subquery))
+        return merged_subqueries
+
+    @classmethod
+    def get_query_shape(cls, query_str: str) -> QueryShape:
+        """
+        Works out which shape of query is needed for a search query string
+        """
+        query_str = query_str.strip()
+        if len(query_str) > 2 and query_str[0] == query_str[-1] == '"':
+            if query_str.count('"') == 2:
+                return QueryShape.QUOTED
+
+        word_count = len(query_str.split())
+        if word_count >= search_settings.get_setting(
+            "query_shapes__long__min_word_count"
+        ):
+            return QueryShape.LONG
+        if word_count > 1:
+            return QueryShape.MULTIPLE_WORDS
+        if NUMERIC_QUERY_RE.fullmatch(query_str):
+            return QueryShape.NUMERIC
+        return QueryShape.SINGLE_WORD
+
     @classmethod
     def get_search_query(cls, model_class, query_str: str):
-        built_query = cls.build_search_query(model_class)
+        query_cache.check_settings()
+
+        query_shape = cls.get_query_shape(query_str)
+        if query_shape == QueryShape.QUOTED:
+            query_str = query_str.strip()[1:-1]
+
+        words = query_str.split()
+        max_tokens = search_settings.get_setting("complexity__max_tokens")
+        if len(words) > max_tokens:
+            words = words[:max_tokens]
+            query_str = " ".join(words)
+        excluded = cls.get_excluded_parts(model_class, query_shape, len(words))
+
+        if getattr(settings, "SEARCH_ENABLE_QUERY_TEMPLATES", False):
+            query_template = cls.build_query_template(
+                model_class, query_shape, excluded=excluded
+            )
+            if query_template is None:
+                return None
+            return query_template.bind(query_str)
+
+        built_query = cls.build_search_query(
+            model_class, query_shape=query_shape, excluded=excluded
+        )
         return cls.swap_variables(built_query, query_str)
 
+    @classmethod
+    def get_excluded_parts(
+        cls, model_class, query_shape: QueryShape, word_count: int
+    ) -> tuple[str, ...]:
+        """
+        The parts left out of the query for a shape of search query string
+        with the given number of words (see build_search_query_within_budget),
+        worked out once per settings snapshot rather than for every search
+        """
+        global _excluded_parts
+        snapshot = search_settings.wagtail_extended_search_settings
+        excluded_parts_snapshot, excluded_parts = _excluded_parts
+        if excluded_parts_snapshot is not snapshot:
+            excluded_parts = {}
+            _excluded_parts = (snapshot, excluded_parts)
+
+        key = (model_class, query_shape, word_count)
+        if key not in excluded_parts:
+            _, excluded_parts[key] = cls.build_search_query_within_budget(
+                model_class, query_shape, word_count
+            )
+        return excluded_parts[key]
+
+    @classmethod
+    def build_search_query_within_budget(
+        cls, model_class, query_shape: QueryShape, word_count: int
+    ) -> tuple[Optional[SearchQuery], tuple[str, ...]]:
+        """
+        Returns the query for a shape of search query string with the given
+        number of words, leaving out parts of it (see the complexity
+        settings) until it's within the clause budget, along with the parts
+        that were left out
+        """
+        excluded = []
+        if word_count > search_settings.get_setting("complexity__max_fuzzy_tokens"):
+            excluded.append("query_types__fuzzy")
+
+        max_clauses = search_settings.get_setting("complexity__max_clauses")
+        degradation_steps = search_settings.get_setting("complexity__degradation_steps")
+        for step in [None, *degradation_steps]:
+            if step is not None:
+                if step in excluded:
+                    continue
+                excluded.append(step)
+            built_query = cls.build_search_query(
+                model_class, query_shape=query_shape, excluded=tuple(excluded)
+            )
+            if built_query is None:
+                break
+            if cls.estimate_clause_count(built_query, word_count) <= max_clauses:
+                break
+        else:
+            logger.warning(
+                "The %s query for %s still expands to more than %s clauses",
+                query_shape.value,
+                model_class._meta.label,
+                max_clauses,
+            )
+        return built_query, tuple(excluded)
+
+    @classmethod
+    def estimate_clause_count(cls, query: SearchQuery, word_count: int) -> int:
+        """
+        Estimates how many clauses a query expands to in the search backend
+        once it's bound to a search query string with the given number of
+        words
+        """
+        if isinstance(query, Variable):
+            if query.query_type == SearchQueryType.PHRASE:
+                return 1
+            # match queries get a clause for each word
+            return max(word_count, 1)
+
+        if hasattr(query, "subqueries"):
+            return sum(
+                cls.estimate_clause_count(sq, word_count) for sq in query.subqueries
+            )
+
+        if hasattr(query, "subquery"):
+            clause_count = cls.estimate_clause_count(query.subquery, word_count)
+            if isinstance(query, OnlyFields):
+                # each field gets its own copy of the subquery
+                clause_count *= max(len(query.fields), 1)
+            return clause_count
+
+        return 1
+
+    @classmethod
+    def build_query_template(
+        cls,
+        model_class,
+        query_shape: QueryShape,
+        ignore_cache=False,
+        excluded: tuple[str, ...] = (),
+    ) -> Optional[QueryTemplate]:
+        """
+        Compiles the query for a model class and shape of search query string
+        into the search backend's DSL once, leaving a slot wherever the search
+        query string goes.
+        """
+        return query_cache.get_or_build(
+            lambda: cls._build_query_template(
+                model_class, query_shape, ignore_cache, excluded
+            ),
+            "template",
+            model_class,
+            query_shape.value,
+            *excluded,
+            ignore_cache=ignore_cache,
+        )
+
+    @classmethod
+    def build_query_templates(cls, model_class, ignore_cache=False):
+        """
+        Builds the query templates get_search_query can look up for a model:
+        one for each shape of search query string and set of parts its number
+        of words leaves out of the query
+        """
+        max_tokens = search_settings.get_setting("complexity__max_tokens")
+        for query_shape in QueryShape:
+            if query_shape in (QueryShape.SINGLE_WORD, QueryShape.NUMERIC):
+                word_counts = range(1, 2)
+            else:
+                word_counts = range(1, max_tokens + 1)
+            excluded_parts = dict.fromkeys(
+                cls.get_excluded_parts(model_class, query_shape, word_count)
+                for word_count in word_counts
+            )
+            for excluded in excluded_parts:
+                cls.build_query_template(
+                    model_class, query_shape, ignore_cache, excluded
+                )
+
+    @classmethod
+    def _build_query_template(
+        cls,
+        model_class,
+        query_shape: QueryShape,
+        ignore_cache=False,
+        excluded: tuple[str, ...] = (),
+    ) -> Optional[QueryTemplate]:
+        built_query = cls.build_search_query(
+            model_class, ignore_cache, query_shape, excluded
+        )
+        # single words never get an AND query (see Variable.output)
+        single_word = query_shape in (QueryShape.SINGLE_WORD, QueryShape.NUMERIC)
+        query = cls.swap_variables(
+            built_query, QUERY_SLOT, word_count=1 if single_word else 2
+        )
+
+        query_template = None
+        if query is not None:
+            query_compiler_class = get_search_backend().query_compiler_class
+            query_compiler = query_compiler_class(model_class.objects.all(), query)
+            query_template = QueryTemplate.from_compiled_query(
+                model_class,
+                query_compiler.get_inner_query(),
+                query_compiler.get_inner_count_query(),
+            )
+
+        logger.debug(query_template)
+        return query_template
+
     @classmethod
     def build_search_query(
-        cls, model_class, ignore_cache=False
+        cls,
+        model_class,
+        ignore_cache=False,
+        query_shape: Optional[QueryShape] = None,
+        excluded: tuple[str, ...] = (),
     ) -> Optional[SearchQuery]:
         """
         Generates a full query for a model class, by running query builder
         against the given model as well as all models with the given as a
         parent; each has its own subquery using its own settings filtered by
         type, and all are joined together at the end.
+
+        Extended models that score the root model's fields the same way (see
+        shares_parent_query) are matched by the root model's query, and their
+        own subquery only covers the fields they add.
+
+        Given a query_shape, the query only has the query types used for that
+        shape of search query string; each shape is built and cached
+        separately. The query types and analyzers named in excluded (as
+        "query_types__<type>" or "analyzers__<analyzer>") are left out of it
+        too.
         """
-        if settings.SEARCH_ENABLE_QUERY_CACHE:
-            cache_key = model_class.__name__
-            if not ignore_cache:
-                built_query = cache.get(cache_key, None)
-                if built_query:
-                    return built_query
+        if excluded:
+            if query_shape is None:
+                raise ValueError("Only the query for a query_shape can exclude parts")
+            return query_cache.get_or_build(
+                lambda: cls._build_search_query_excluding(
+                    model_class, query_shape, excluded, ignore_cache
+                ),
+                "query",
+                model_class,
+                query_shape.value,
+                *excluded,
+                ignore_cache=ignore_cache,
+            )
+
+        if query_shape is not None:
+            return query_cache.get_or_build(
+                lambda: cls._build_search_query_for_shape(
+                    model_class, query_shape, ignore_cache
+                ),
+                "query",
+                model_class,
+                query_shape.value,
+                ignore_cache=ignore_cache,
+            )
+
+        return query_cache.get_or_build(
+            lambda: cls._build_full_search_query(model_class),
+            "query",
+            model_class,
+            ignore_cache=ignore_cache,
+        )
+
+    @classmethod
+    def _build_search_query_for_shape(
+        cls, model_class, query_shape: QueryShape, ignore_cache=False
+    ) -> Optional[SearchQuery]:
+        search_query = cls.build_search_query(model_class, ignore_cache)
+        query_types = {
+            SearchQueryType(query_type)
+            for query_type in search_settings.get_setting(
+                f"query_shapes__{query_shape.value}__query_types"
+            )
+        }
+        search_query = cls._replace_variables(
+            search_query,
+            lambda variable: variable if variable.query_type in query_types else None,
+        )
+        if search_query is None:
+            return None
+        return intern_query(cls.simplify_query(search_query))
+
+    @classmethod
+    def _build_search_query_excluding(
+        cls,
+        model_class,
+        query_shape: QueryShape,
+        excluded: tuple[str, ...],
+        ignore_cache=False,
+    ) -> Optional[SearchQuery]:
+        search_query = cls.build_search_query(model_class, ignore_cache, query_shape)
+        excluded_query_types = set()
+        excluded_analyzers = set()
+        for part in excluded:
+            kind, _, name = part.partition(search_settings.NESTING_SEPARATOR)
+            if kind == "query_types":
+                excluded_query_types.add(SearchQueryType(name))
+            elif kind == "analyzers":
+                excluded_analyzers.add(
+                    search_settings.get_setting(f"analyzers__{name}__es_analyzer")
+                )
+            else:
+                raise ValueError(f"{part} isn't a query type or analyzer to exclude")
+
+        def exclude_variable(variable: Variable) -> Optional[Variable]:
+            if variable.query_type in excluded_query_types:
+                return None
+            if variable.analyzer in excluded_analyzers:
+                return None
+            return variable
+
+        search_query = cls._replace_variables(search_query, exclude_variable)
+        if search_query is None:
+            return None
+        return intern_query(cls.simplify_query(search_query))
 
+    @classmethod
+    def _build_full_search_query(cls, model_class) -> Optional[SearchQuery]:
         extended_models = cls.get_extended_models_with_unique_indexed_fields(
             model_class
         )
         # build full query for each extended model
         queries = []
         queried_content_types = []
+        shared_fields = None
         for sub_model_class in extended_models:
             # Filter so it only applies to "docs with that model anywhere in the
             # contenttypes list".
@@ -360,8 +915,20 @@ class CustomQueryBuilder(QueryBuilder):
             sub_model_contenttype = (
                 f"{sub_model_class._meta.app_label}.{sub_model_class.__name__}"
             )
+            if cls.shares_parent_query(model_class, sub_model_class):
+                # The root query already matches docs of this model, so its
+                # query only needs the fields it adds to the root model's
+                if shared_fields is None:
+                    shared_fields = set(model_class.get_indexed_fields())
+                subquery = cls.build_query_for_model(
+                    sub_model_class, exclude_fields=shared_fields
+                )
+                if subquery is None:
+                    continue
+            else:
+                subquery = cls.build_query_for_model(sub_model_class)
+                queried_content_types.append(sub_model_contenttype)
 
-            subquery = cls.build_query_for_model(sub_model_class)
             query = Filtered(
                 subquery=subquery,
                 filters=[
@@ -373,10 +940,10 @@ class CustomQueryBuilder(QueryBuilder):
                 ],
             )
             queries.append(query)
-            queried_content_types.append(sub_model_contenttype)
 
         # Build query for root model passed in to method, filter to exclude docs
-        # with contenttypes matching any of the already queried models.
+        # with contenttypes matching any of the models that were queried in
+        # full.
         subquery = cls.build_query_for_model(model_class)
         if subquery is not None:
             root_query = Filtered(
@@ -396,15 +963,59 @@ class CustomQueryBuilder(QueryBuilder):
             search_query = queries[0]
             for q in queries[1:]:
                 search_query |= q
+            search_query = intern_query(cls.simplify_query(search_query))
         else:
             search_query = None
 
-        if settings.SEARCH_ENABLE_QUERY_CACHE:
-            cache.set(cache_key, search_query)
-
         logger.debug(search_query)
         return search_query
 
+    @classmethod
+    def shares_parent_query(
+        cls, model_class: Type[Indexed], sub_model_class: Type[Indexed]
+    ) -> bool:
+        """
+        Whether the root model's query scores the extended model's docs the
+        same way the extended model's own query would: they have the same
+        score functions, and none of the root model's field boosts are
+        overridden for the extended model.
+
+        The root and extended model's queries are summed, which only scores
+        the same as one query when the score functions multiply the query's
+        score (the function_score__boost_mode setting).
+        """
+        score_functions = model_class.get_score_functions()
+        if sub_model_class.get_score_functions() != score_functions:
+            return False
+
+        if score_functions and search_settings.get_setting(
+            "function_score__boost_mode"
+        ) not in (None, "multiply"):
+            return False
+
+        for field in model_class.get_indexed_fields():
+            if isinstance(field, BaseField) and cls._get_indexed_field_boost(
+                model_class, field
+            ) != cls._get_indexed_field_boost(sub_model_class, field):
+                return False
+        return True
+
+    @classmethod
+    def _get_indexed_field_boost(cls, model_class, field):
+        """
+        The boost a model's search fields get for an indexed field: the one in
+        the settings for the model being queried (as the field's search field
+        variants get it, see MultiQueryIndexedField.get_search_field_variants),
+        or the field's own if there isn't one
+        """
+        field_settings_key = search_settings.get_settings_field_key(model_class, field)
+        try:
+            return search_settings.get_setting(
+                f"boost_parts__fields__{field_settings_key}"
+            )
+        except KeyError:
+            return getattr(field, "boost", None)
+
     @classmethod
     def get_extended_models_with_unique_indexed_fields(
         cls, model_class: Type[Indexed]
@@ -413,14 +1024,9 @@ class CustomQueryBuilder(QueryBuilder):
         Iterate indexed models extending the root model that have unique
         index fields.
         """
-        extended_model_classes = []
-        indexed_models = get_indexed_models()
-        for indexed_model in indexed_models:
-            if (
-                indexed_model != model_class
-                and model_class in inspect.getmro(indexed_model)
-                and issubclass(indexed_model, Indexed)
-                and indexed_model.has_unique_index_fields()
-            ):
-                extended_model_classes.append(indexed_model)
-        return extended_model_classes
+        return get_model_hierarchy().get_extended_models_with_unique_indexed_fields(
+            model_class
+        )
+
+
+_excluded_parts: tuple[object, dict] = (None, {})
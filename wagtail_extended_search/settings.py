@@ -1,9 +1,17 @@
+import hashlib
+import json
 import os
+import threading
+import time
 from collections import ChainMap
-from collections.abc import Mapping
+from collections.abc import Iterable, Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import MappingProxyType
 from typing import Any, Optional
 
 from django.conf import settings as django_settings
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured
 from django.db.utils import ProgrammingError
 
@@ -20,6 +28,8 @@ env_file_path = os.path.join(
 
 SETTINGS_KEY = "SEARCH_EXTENDED"
 NESTING_SEPARATOR = "__"
+SETTINGS_GENERATION_CACHE_KEY = "wagtail_extended_search:settings_generation"
+DEFAULT_SETTINGS_CHECK_INTERVAL = 5
 DEFAULT_SETTINGS = {
     "boost_parts": {
         "query_types": {
@@ -65,6 +75,55 @@ DEFAULT_SETTINGS = {
             "query_types": ["phrase"],
         },
     },
+    "query_shapes": {
+        # The query types used for each shape of search query string
+        "single_word": {
+            "query_types": ["phrase", "query_or", "fuzzy"],
+        },
+        "multiple_words": {
+            "query_types": ["phrase", "query_and", "query_or", "fuzzy"],
+        },
+        "quoted": {
+            "query_types": ["phrase"],
+        },
+        "numeric": {
+            "query_types": ["phrase", "query_or"],
+        },
+        "long": {
+            "min_word_count": 8,
+            "query_types": ["phrase", "query_and", "query_or"],
+        },
+    },
+    "fuzzy": {
+        # Passed on to fuzzy queries; fields can override them with
+        # MultiQueryIndexedField(fuzzy_options=...)
+        "fuzziness": "AUTO",
+        "prefix_length": 1,
+        "max_expansions": 25,
+        # Shorter tokens, and numbers, aren't searched for fuzzily
+        "min_token_length": 3,
+    },
+    "complexity": {
+        # Search query strings are cut down to this many words
+        "max_tokens": 32,
+        # Fuzzy queries are left out for search query strings with more words
+        "max_fuzzy_tokens": 5,
+        # The most clauses a query should expand to; the parts of the query
+        # below are left out, in order, until it fits
+        "max_clauses": 1024,
+        "degradation_steps": [
+            "query_types__fuzzy",
+            "query_types__query_and",
+            "analyzers__explicit",
+        ],
+    },
+    "function_score": {
+        # All of a model's score functions are applied in one function_score
+        # query; score_mode combines the functions' scores and boost_mode
+        # combines that with the query's score
+        "score_mode": "multiply",
+        "boost_mode": "multiply",
+    },
 }
 
 
@@ -302,12 +361,286 @@ class SearchSettings(NestedChainMap):
                 output[k] = v
         return output
 
+    def to_snapshot(self) -> "SettingsSnapshot":
+        return SettingsSnapshot(
+            self.to_dict(),
+            types=NestedChainMap(self.fields, self.defaults),
+            fields_version=get_settings_version(self.fields),
+        )
+
+
+def coerce_setting_value(value: Any, default: Any) -> Any:
+    """
+    Converts a setting's value to the type of the default it overrides, since
+    DB and ENV settings are always strings
+    """
+    if isinstance(value, list):
+        value = tuple(value)
+    if value is None or default is None:
+        return value
+
+    try:
+        if isinstance(default, bool):
+            if isinstance(value, str):
+                return value.strip().lower() in ("1", "true", "yes", "on")
+            return bool(value)
+        if isinstance(default, (int, float)):
+            value = float(value)
+            # whole numbers stay whole for counts and limits, e.g.
+            # complexity__max_tokens; boosts are used as floats either way
+            if isinstance(default, int) and value.is_integer():
+                return int(value)
+            return value
+    except ValueError:
+        return value
+    if isinstance(default, (list, tuple)) and isinstance(value, str):
+        return tuple(part.strip() for part in value.split(",") if part.strip())
+    return value
+
+
+class SettingsSnapshot(Mapping):
+    """
+    Immutable copy of the settings, flattened when it's created so that both
+    nested (`snapshot["boost_parts"]["fields"]`) and flat
+    (`snapshot["boost_parts__fields"]`) lookups are a single dict lookup.
+
+    Values are coerced to the type of the default they override, and lists
+    become tuples. Iterating over it only gives the top level keys.
+    """
+
+    def __init__(
+        self,
+        settings_dict: Mapping,
+        types: Optional[Mapping] = None,
+        fields_version: str = "",
+    ):
+        self._flat: dict[str, Any] = {}
+        self._nested = self._freeze(settings_dict, types or {}, None)
+        self.version = get_settings_version(self._nested)
+        self.fields_version = fields_version
+
+    def _freeze(
+        self, settings_dict: Mapping, types: Mapping, prefix: Optional[str]
+    ) -> MappingProxyType:
+        frozen = {}
+        for key, value in settings_dict.items():
+            flat_key = f"{prefix}{NESTING_SEPARATOR}{key}" if prefix else key
+            default = types.get(key)
+            if isinstance(value, Mapping):
+                if not isinstance(default, Mapping):
+                    default = {}
+                value = self._freeze(value, default, flat_key)
+            else:
+                value = coerce_setting_value(value, default)
+            frozen[key] = value
+            self._flat[flat_key] = value
+        return MappingProxyType(frozen)
+
+    def __getitem__(self, key: str) -> Any:
+        return self._flat[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._flat
+
+    def __iter__(self):
+        return iter(self._nested)
+
+    def __len__(self) -> int:
+        return len(self._nested)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self) -> str:
+        return f"<SettingsSnapshot version={self.version}>"
+
+    def all_keys(self) -> list[str]:
+        """
+        Returns a list of the *flattened* keys of all the settings
+        """
+        return [
+            key for key, value in self._flat.items() if not isinstance(value, Mapping)
+        ]
+
+
+def _serialize_setting_value(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
+
+
+def get_settings_version(settings_dict: Mapping) -> str:
+    """
+    Returns a short digest of the settings, which changes whenever any of the
+    values do; used to version anything built from the settings
+    """
+    serialized_settings = json.dumps(
+        settings_dict, sort_keys=True, default=_serialize_setting_value
+    )
+    return hashlib.blake2b(serialized_settings.encode(), digest_size=8).hexdigest()
+
+
+def export_settings():
+    """
+    Re-exports the settings after any of the underlying settings sources have
+    changed; the whole snapshot is swapped in one go
+    """
+    global wagtail_extended_search_settings
+    wagtail_extended_search_settings = settings_singleton.to_snapshot()
+
+
+_settings_dependencies: ContextVar[Optional[set[str]]] = ContextVar(
+    "settings_dependencies", default=None
+)
+
+
+def _get_setting_value(key: str) -> Any:
+    return wagtail_extended_search_settings[key]
+
+
+def get_setting(key: str) -> Any:
+    """
+    Returns the value for a flat settings key, e.g.
+    `boost_parts__fields__app.model.field`, recording the key as a dependency
+    of anything being built (see `record_settings_dependencies`). Missing keys
+    raise KeyError, and are still recorded since setting them changes things.
+    """
+    record_settings_dependencies_used(key)
+    return _get_setting_value(key)
+
+
+def record_settings_dependencies_used(*keys: str):
+    if (dependencies := _settings_dependencies.get()) is not None:
+        dependencies.update(keys)
+
+
+@contextmanager
+def record_settings_dependencies():
+    """
+    Collects the flat keys of every setting read with `get_setting` inside the
+    block; they're also passed up to any enclosing block
+    """
+    parent_dependencies = _settings_dependencies.get()
+    dependencies: set[str] = set()
+    token = _settings_dependencies.set(dependencies)
+    try:
+        yield dependencies
+    finally:
+        _settings_dependencies.reset(token)
+        if parent_dependencies is not None:
+            parent_dependencies.update(dependencies)
+
+
+def get_settings_dependencies_version(keys: Iterable[str]) -> str:
+    """
+    Returns a short digest of the values of the given flat keys, along with
+    the indexed fields, so that it only changes when something built from
+    those keys would
+    """
+    exported_settings = wagtail_extended_search_settings
+    values = {}
+    missing_keys = []
+    for key in sorted(keys):
+        try:
+            values[key] = exported_settings[key]
+        except KeyError:
+            missing_keys.append(key)
+    return get_settings_version(
+        {
+            "fields": exported_settings.fields_version,
+            "values": values,
+            "missing": missing_keys,
+        }
+    )
+
+
+class SettingsGeneration:
+    """
+    Tracks the generation of the db settings, a counter in the shared cache
+    that's bumped whenever a `Setting` is saved or deleted, so that every
+    process (not just the one that saved it) reloads its settings.
+
+    Checks are throttled to once every SEARCH_SETTINGS_CHECK_INTERVAL seconds
+    so they're cheap enough to make on every search.
+    """
+
+    def __init__(self):
+        self.generation = None
+        self.last_checked = None
+        self._lock = threading.Lock()
+
+    @property
+    def check_interval(self) -> float:
+        return getattr(
+            django_settings,
+            "SEARCH_SETTINGS_CHECK_INTERVAL",
+            DEFAULT_SETTINGS_CHECK_INTERVAL,
+        )
+
+    def get_shared_generation(self) -> int:
+        return cache.get(SETTINGS_GENERATION_CACHE_KEY, 0)
+
+    def bump(self):
+        """
+        Moves the shared generation on, and keeps this process in step with it
+        """
+        cache.add(SETTINGS_GENERATION_CACHE_KEY, 0, timeout=None)
+        try:
+            generation = cache.incr(SETTINGS_GENERATION_CACHE_KEY)
+        except ValueError:
+            # evicted between the add and the incr
+            generation = 1
+            cache.set(SETTINGS_GENERATION_CACHE_KEY, generation, timeout=None)
+        with self._lock:
+            self.generation = generation
+            self.last_checked = time.monotonic()
+
+    def sync(self):
+        """
+        Records the shared generation without reloading anything, for when the
+        settings have just been loaded
+        """
+        with self._lock:
+            self.generation = self.get_shared_generation()
+            self.last_checked = time.monotonic()
+
+    def check(self) -> bool:
+        """
+        Reloads the db settings if another process has changed them since we
+        last looked; returns whether it did
+        """
+        now = time.monotonic()
+        if (
+            self.last_checked is not None
+            and now - self.last_checked < self.check_interval
+        ):
+            return False
+
+        with self._lock:
+            self.last_checked = now
+            generation = self.get_shared_generation()
+            # compare for equality, the counter restarts if it's evicted
+            if generation == self.generation:
+                return False
+            if self.generation is None:
+                # not synced yet, so nothing can be out of date
+                self.generation = generation
+                return False
+            self.generation = generation
+            settings_singleton.initialise_db_dict()
+            export_settings()
+        return True
+
 
 settings_singleton = SearchSettings()
+settings_generation = SettingsGeneration()
 
 # NB please don't import this directly, import the module as a whole
 # this is because it can get re-exported after a value is updated
-wagtail_extended_search_settings = settings_singleton.to_dict()
+wagtail_extended_search_settings = settings_singleton.to_snapshot()
 
 
 def get_settings_field_key(model_class, field) -> str:
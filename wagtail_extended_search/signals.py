@@ -1,12 +1,17 @@
 from django.db.models.signals import post_delete, post_save
 
 from wagtail_extended_search import settings
+from wagtail_extended_search.cache import query_cache
 from wagtail_extended_search.models import Setting
 
 
 def update_searchsetting_queryset(sender, **kwargs):
     settings.settings_singleton.initialise_db_dict()
-    settings.wagtail_extended_search_settings = settings.settings_singleton.to_dict()
+    settings.export_settings()
+    # let the other processes know they need to reload theirs
+    settings.settings_generation.bump()
+    # entries built from the old settings can't be reached any more
+    query_cache.clear_local()
 
 
 post_save.connect(update_searchsetting_queryset, sender=Setting)
@@ -1,6 +1,8 @@
 import inspect
+import json
 from unittest.mock import call
 
+import pytest
 from wagtail.models import Page
 from wagtail.search.backends.elasticsearch7 import (
     Elasticsearch7SearchQueryCompiler,
@@ -9,14 +11,17 @@ from wagtail.search.backends.elasticsearch7 import (
 from wagtail.search.index import RelatedFields, SearchField
 from wagtail.search.query import (
     MATCH_NONE,
+    Boost,
     Fuzzy,
     MatchAll,
     Not,
+    Or,
     Phrase,
     PlainText,
     SearchQuery,
 )
 
+from wagtail_extended_search import settings as search_settings
 from wagtail_extended_search.backends.backend import (
     BoostSearchQueryCompiler,
     CustomSearchBackend,
@@ -25,11 +30,28 @@ from wagtail_extended_search.backends.backend import (
     ExtendedSearchQueryCompiler,
     FilteredSearchMapping,
     FilteredSearchQueryCompiler,
+    FunctionScoreSearchQueryCompiler,
     NestedSearchQueryCompiler,
     OnlyFieldSearchQueryCompiler,
     SearchBackend,
 )
+from wagtail_extended_search.layers.base.backends.backend import (
+    ExtendedSearchResults,
+    SearchableFieldRegistry,
+)
+from wagtail_extended_search.layers.boost.query import BoundedFuzzy
+from wagtail_extended_search.layers.function_score.query import FunctionScore
+from wagtail_extended_search.layers.template.backends.backend import (
+    TemplateSearchQueryCompiler,
+)
+from wagtail_extended_search.layers.template.query import QUERY_SLOT, QueryTemplate
 from wagtail_extended_search.query import Filtered, Nested, OnlyFields
+from wagtail_extended_search.query_builder import Variable
+from wagtail_extended_search.settings import (
+    SettingsSnapshot,
+    record_settings_dependencies,
+)
+from wagtail_extended_search.types import SearchQueryType
 
 
 class TestExtendedSearchQueryCompiler:
@@ -96,6 +118,7 @@ class TestExtendedSearchQueryCompiler:
         mock_compile.assert_called_once_with(query, "bar", 6.6)
 
         mock_compile.reset_mock()
+        query = Not(PlainText("quid"))
         result = compiler._join_and_compile_queries(query, ["bar", "baz", "bam"], 6.6)
         assert result == {"dis_max": {"queries": ["--FOO--", "--FOO--", "--FOO--"]}}
         mock_compile.assert_has_calls(
@@ -103,6 +126,43 @@ class TestExtendedSearchQueryCompiler:
         )
         assert mock_compile.call_count == 3
 
+    def test_join_compile_queries_collapses_leaf_queries(self, mocker, settings):
+        mock_compile = mocker.patch(
+            "wagtail_extended_search.layers.base.backends.backend.ExtendedSearchQueryCompiler._compile_query",
+        )
+        query = Boost(PlainText("quid pro", operator="and"), 2.0)
+        compiler = ExtendedSearchQueryCompiler(Page.objects.all(), query)
+        result = compiler._join_and_compile_queries(
+            query, [Field("bar", boost=3.0), "baz"], 1.5
+        )
+        assert result == {
+            "multi_match": {
+                "query": "quid pro",
+                "operator": "and",
+                "boost": 3.0,
+                "fields": ["bar^3.0", "baz"],
+            }
+        }
+        mock_compile.assert_not_called()
+
+        # AND queries can match their terms across the fields
+        settings.SEARCH_ENABLE_CROSS_FIELD_AND_QUERIES = True
+        result = compiler._join_and_compile_queries(
+            query, [Field("bar", boost=3.0), "baz"], 1.5
+        )
+        assert result["multi_match"]["type"] == "cross_fields"
+        result = compiler._join_and_compile_queries(
+            Boost(PlainText("quid pro", operator="or"), 2.0),
+            [Field("bar", boost=3.0), "baz"],
+            1.5,
+        )
+        assert "type" not in result["multi_match"]
+
+        # phrase and fuzzy queries need the boost layer
+        assert (
+            compiler._compile_multi_field_query(Phrase("quid"), [Field("bar")]) is None
+        )
+
     def test_get_inner_query_works_the_same_as_parent(self, mocker):
         query = PlainText("foo")
         compiler = ExtendedSearchQueryCompiler(Page.objects.all(), query)
@@ -254,6 +314,144 @@ class TestExtendedSearchQueryCompiler:
         mock_join_and_compile.assert_called_once()
 
 
+class TestExtendedSearchResults:
+    def test_get_es_body_uses_count_query_for_counts(self, mocker):
+        compiler = mocker.Mock()
+        compiler.get_query.return_value = "--query--"
+        compiler.get_count_query.return_value = "--count-query--"
+        compiler.get_sort.return_value = None
+        results = ExtendedSearchResults(mocker.Mock(), compiler)
+        assert results._get_es_body() == {
+            "query": "--query--",
+            "track_total_hits": 10000,
+        }
+        assert results._get_es_body(for_count=True) == {"query": "--count-query--"}
+
+    def get_results(self, mocker, total):
+        backend = mocker.Mock()
+        backend.es.search.return_value = {"hits": {"hits": [], "total": total}}
+        backend.es.count.return_value = {"count": 99}
+        compiler = mocker.Mock()
+        compiler.get_query.return_value = "--query--"
+        compiler.get_sort.return_value = None
+        compiler.queryset.filter.return_value = []
+        return ExtendedSearchResults(backend, compiler)
+
+    def test_get_es_body_tracks_total_hits(self, mocker, settings):
+        results = self.get_results(mocker, None)
+        assert results._get_es_body()["track_total_hits"] == 10000
+        settings.SEARCH_TRACK_TOTAL_HITS = True
+        assert results._get_es_body()["track_total_hits"] is True
+
+    def test_count_uses_total_from_search(self, mocker):
+        results = self.get_results(mocker, {"value": 42, "relation": "eq"})
+        list(results[10:20])
+        results.backend.es.search.assert_called_once()
+        assert results.count() == 42
+        assert results[10:20].count() == 10
+        assert results[40:].count() == 2
+        results.backend.es.count.assert_not_called()
+
+    def test_count_past_the_cap_needs_a_count_request(self, mocker):
+        results = self.get_results(mocker, {"value": 10000, "relation": "gte"})
+        list(results[:10])
+        assert results.count() == 99
+        results.backend.es.count.assert_called_once()
+
+
+class TestSearchableFieldRegistry:
+    def get_registry(self, mocker, **kwargs):
+        mapping = mocker.Mock()
+        mapping.get_field_column_name.side_effect = lambda f: f"{f.field_name}_col"
+        related_field = mocker.Mock(field_name="--related--")
+        child_field = mocker.Mock(field_name="--child--")
+        grandchild_field = mocker.Mock(field_name="--grandchild--")
+        related_field.get_related_field_paths.return_value = {
+            "--child--": child_field,
+            "--child--.--grandchild--": grandchild_field,
+        }
+        searchable_fields = [
+            mocker.Mock(spec=SearchField, field_name="--field-1--", boost=2.0),
+            mocker.Mock(spec=SearchField, field_name="--field-2--", boost=None),
+            related_field,
+        ]
+        return (
+            SearchableFieldRegistry(searchable_fields, mapping, Page, **kwargs),
+            mapping,
+            related_field,
+        )
+
+    def test_get_remapped_field(self, mocker):
+        registry, mapping, _ = self.get_registry(mocker)
+        field = registry.get_remapped_field("--field-1--")
+        assert (field.field_name, field.boost) == ("--field-1--_col", 2.0)
+        field = registry.get_remapped_field("--field-2--")
+        assert (field.field_name, field.boost) == ("--field-2--_col", 1)
+        assert registry.get_remapped_field("--missing--") is None
+        assert registry.get_remapped_field("--missing--.--child--") is None
+
+    def test_get_remapped_field_uses_boost_table_for_related_fields(self, mocker):
+        registry, _, related_field = self.get_registry(mocker)
+        # every path is resolved up front
+        assert registry.related_field_paths == {
+            "--related--.--child--": (
+                "--related--_col.--child--",
+                "wagtailcore.page.--child--",
+            ),
+            "--related--.--child--.--grandchild--": (
+                "--related--_col.--child--.--grandchild--",
+                "wagtailcore.page.--grandchild--",
+            ),
+        }
+        mock_get_field_boost = mocker.patch(
+            "wagtail_extended_search.boosts.BoostTable.get_field_boost",
+            return_value=4.5,
+        )
+        field = registry.get_remapped_field("--related--.--child--.--grandchild--")
+        assert field.field_name == "--related--_col.--child--.--grandchild--"
+        assert field.boost == 4.5
+        related_field.get_related_field_paths.assert_called_once_with()
+        mock_get_field_boost.assert_called_once_with("wagtailcore.page.--grandchild--")
+
+    def test_get_remapped_field_is_memoised(self, mocker):
+        registry, mapping, _ = self.get_registry(mocker, dependencies={"--dep--"})
+        field = registry.get_remapped_field("--field-1--")
+        mapping.get_field_column_name.reset_mock()
+        with record_settings_dependencies() as dependencies:
+            assert registry.get_remapped_field("--field-1--") is field
+        mapping.get_field_column_name.assert_not_called()
+        # the registry's dependencies are recorded on every lookup
+        assert dependencies == {"--dep--"}
+
+    def test_compiler_reuses_registry_until_settings_change(self, mocker):
+        mock_get_searchable_fields = mocker.patch(
+            "wagtail.search.backends.elasticsearch7.Elasticsearch7SearchQueryCompiler.get_searchable_fields",
+            return_value=[],
+        )
+        mocker.patch.object(
+            search_settings,
+            "wagtail_extended_search_settings",
+            SettingsSnapshot({}),
+        )
+        compiler = ExtendedSearchQueryCompiler(Page.objects.all(), PlainText("foo"))
+        mock_get_searchable_fields.reset_mock()
+
+        registry = compiler.get_searchable_field_registry((), {})
+        assert compiler.get_searchable_field_registry((), {}) is registry
+        mock_get_searchable_fields.assert_called_once_with()
+
+        other_registry = compiler.get_searchable_field_registry((), {"foo": "bar"})
+        assert other_registry is not registry
+        mock_get_searchable_fields.assert_called_with(foo="bar")
+
+        mocker.patch.object(
+            search_settings,
+            "wagtail_extended_search_settings",
+            SettingsSnapshot({}),
+        )
+        assert compiler.get_searchable_field_registry((), {}) is not registry
+
+
 class TestOnlyFieldSearchQueryCompiler:
     def test_compile_query_uses_parent_when_not_onlyfields(self, mocker):
         mock_parent = mocker.patch(
@@ -364,6 +562,209 @@ class TestBoostSearchQueryCompiler:
         result = compiler._compile_fuzzy_query(query, [field, field2], boost=47.0)
         assert result["multi_match"]["boost"] == 47.0
 
+    def test_compile_fuzzy_query_passes_on_bounded_fuzzy_options(self):
+        query = BoundedFuzzy(
+            "quid", fuzziness="AUTO:4,8", prefix_length=2, max_expansions=10
+        )
+        field = Field("foo")
+        compiler = BoostSearchQueryCompiler(Page.objects.all(), query)
+        result = compiler._compile_fuzzy_query(query, [field], boost=3.0)
+        assert result == {
+            "match": {
+                "foo": {
+                    "query": "quid",
+                    "fuzziness": "AUTO:4,8",
+                    "prefix_length": 2,
+                    "max_expansions": 10,
+                    "boost": 3.0,
+                }
+            }
+        }
+        result = compiler._compile_fuzzy_query(query, [field, Field("bar")])
+        assert result["multi_match"]["fuzziness"] == "AUTO:4,8"
+        assert result["multi_match"]["prefix_length"] == 2
+        assert result["multi_match"]["max_expansions"] == 10
+
+        # unset options are left to the search backend
+        query = BoundedFuzzy("quid", max_expansions=10)
+        result = compiler._compile_fuzzy_query(query, [field])
+        assert result == {
+            "match": {
+                "foo": {"query": "quid", "fuzziness": "AUTO", "max_expansions": 10}
+            }
+        }
+
+    def test_compile_multi_field_query(self):
+        fields = [Field("foo", boost=2.0), Field("bar")]
+        query = Boost(Phrase("quid"), 3.0)
+        compiler = BoostSearchQueryCompiler(Page.objects.all(), query)
+        assert compiler._join_and_compile_queries(query, fields, 2.0) == {
+            "multi_match": {
+                "query": "quid",
+                "fields": ["foo^2.0", "bar"],
+                "type": "phrase",
+                "boost": 6.0,
+            }
+        }
+
+        query = BoundedFuzzy("quid", max_expansions=10)
+        assert compiler._join_and_compile_queries(query, fields) == {
+            "multi_match": {
+                "query": "quid",
+                "fuzziness": "AUTO",
+                "fields": ["foo^2.0", "bar"],
+                "max_expansions": 10,
+            }
+        }
+
+        query = Or([Phrase("quid"), PlainText("quid")])
+        result = compiler._join_and_compile_queries(query, fields)
+        assert len(result["dis_max"]["queries"]) == 2
+
+    def test_compile_fused_query(self, settings):
+        field = Field("foo", boost=2.0)
+        query = Or(
+            [
+                Boost(Phrase("quid pro"), 10.0),
+                Boost(PlainText("quid pro", operator="and"), 2.5),
+                PlainText("quid pro", operator="or"),
+            ]
+        )
+        compiler = BoostSearchQueryCompiler(Page.objects.all(), query)
+        fused_query = {
+            "bool": {
+                "must": {"match": {"foo": {"query": "quid pro", "boost": 6.0}}},
+                "should": [
+                    {"match_phrase": {"foo": {"query": "quid pro", "boost": 60.0}}},
+                    {
+                        "match": {
+                            "foo": {
+                                "query": "quid pro",
+                                "operator": "and",
+                                "boost": 15.0,
+                            }
+                        }
+                    },
+                ],
+            }
+        }
+        assert compiler._compile_fused_query(query, field, 3.0) == fused_query
+
+        # fused queries are optional
+        result = compiler._compile_query(query, field, 3.0)
+        assert len(result["bool"]["should"]) == 3
+        settings.SEARCH_ENABLE_FUSED_FIELD_QUERIES = True
+        assert compiler._compile_query(query, field, 3.0) == fused_query
+
+        # other queries are left alongside the fused query
+        fuzzy_query = Fuzzy("quid pro")
+        result = compiler._compile_query(
+            Or([*query.subqueries, fuzzy_query]), field, 3.0
+        )
+        assert result == {
+            "bool": {
+                "should": [
+                    fused_query,
+                    compiler._compile_fuzzy_query(fuzzy_query, [field], 3.0),
+                ]
+            }
+        }
+
+        # nothing to fuse without both phrase and OR queries for one string
+        for subqueries in (
+            query.subqueries[:2],
+            query.subqueries[1:],
+            [Phrase("quid"), PlainText("pro")],
+        ):
+            assert compiler._compile_fused_query(Or(subqueries), field) is None
+
+    def test_compile_fused_query_for_bound_variables(self):
+        # the query types of a field, as bound to a search query string with
+        # capitals and stop words
+        query = Or(
+            [
+                Boost(
+                    Variable("q", query_type, "snowball").output("The Old Bakery"), 2.0
+                )
+                for query_type in (
+                    SearchQueryType.PHRASE,
+                    SearchQueryType.QUERY_AND,
+                    SearchQueryType.QUERY_OR,
+                )
+            ]
+        )
+        compiler = BoostSearchQueryCompiler(Page.objects.all(), query)
+        assert compiler._compile_fused_query(query, Field("foo")) == {
+            "bool": {
+                "must": {"match": {"foo": {"query": "The Old Bakery", "boost": 2.0}}},
+                "should": [
+                    {
+                        "match_phrase": {
+                            "foo": {"query": "The Old Bakery", "boost": 2.0}
+                        }
+                    },
+                    {
+                        "match": {
+                            "foo": {
+                                "query": "The Old Bakery",
+                                "operator": "and",
+                                "boost": 2.0,
+                            }
+                        }
+                    },
+                ],
+            }
+        }
+
+    def test_fused_query_scores_like_separate_queries(self, settings):
+        def score(query, document):
+            """
+            Roughly how the search backend scores a document with just the one
+            field: every matching clause adds its boost
+            """
+            ((query_type, clause),) = query.items()
+            if query_type == "bool":
+                must, should = clause.get("must", []), clause.get("should", [])
+                must = [must] if isinstance(must, dict) else must
+                should = [should] if isinstance(should, dict) else should
+                must_scores = [score(q, document) for q in must]
+                should_scores = [score(q, document) for q in should]
+                should_scores = [s for s in should_scores if s is not None]
+                if None in must_scores or not (must_scores or should_scores):
+                    return None
+                return sum(must_scores) + sum(should_scores)
+
+            (field_query,) = clause.values()
+            terms = field_query["query"].split()
+            words = document.split()
+            if query_type == "match_phrase":
+                matched = f" {field_query['query']} " in f" {document} "
+            elif field_query.get("operator") == "and":
+                matched = all(term in words for term in terms)
+            else:
+                matched = any(term in words for term in terms)
+            return field_query.get("boost", 1.0) if matched else None
+
+        field = Field("foo")
+        query = Or(
+            [
+                Boost(Phrase("old bakery"), 10.0),
+                Boost(PlainText("old bakery", operator="and"), 2.5),
+                PlainText("old bakery", operator="or"),
+            ]
+        )
+        compiler = BoostSearchQueryCompiler(Page.objects.all(), query)
+        separate_query = compiler._compile_query(query, field)
+        settings.SEARCH_ENABLE_FUSED_FIELD_QUERIES = True
+        fused_query = compiler._compile_query(query, field)
+        assert fused_query != separate_query
+
+        documents = ["the old bakery", "bakery old", "old mill", "new mill"]
+        scores = [score(fused_query, document) for document in documents]
+        assert scores == [score(separate_query, document) for document in documents]
+        # every term but not the phrase still gets the AND query's boost
+        assert scores == [13.5, 3.5, 1.0, None]
+
     def test_compile_phrase_query(self):
         query = Phrase("quid")
         field = Field("foo")
@@ -419,6 +820,74 @@ class TestNestedSearchQueryCompiler:
         assert result["nested"]["query"] == parent_compiler._compile_query(
             query.subquery, field
         )
+        assert "score_mode" not in result["nested"]
+
+        query = Nested(Phrase("quid"), path="content.content_page", score_mode="max")
+        result = compiler._compile_nested_query(query, [field])
+        assert result["nested"]["score_mode"] == "max"
+
+    def test_compile_nested_query_once_for_many_fields(self):
+        query = Nested(PlainText("quid"), path="content", score_mode="sum")
+        fields = [Field("content.title", boost=2.0), Field("content.body")]
+        compiler = NestedSearchQueryCompiler(Page.objects.all(), query)
+        assert compiler._join_and_compile_queries(query, fields) == {
+            "nested": {
+                "path": "content",
+                "query": {
+                    "multi_match": {
+                        "query": "quid",
+                        "operator": "and",
+                        "fields": ["content.title^2.0", "content.body"],
+                    }
+                },
+                "score_mode": "sum",
+            }
+        }
+
+
+class TestFunctionScoreSearchQueryCompiler:
+    def test_compile_query_catches_function_score(self, mocker):
+        mock_compile_function_score = mocker.patch(
+            "wagtail_extended_search.backends.backend.FunctionScoreSearchQueryCompiler._compile_function_score_query"
+        )
+        query = PlainText("quid")
+        field = Field("baz")
+        compiler = FunctionScoreSearchQueryCompiler(Page.objects.all(), query)
+        compiler._compile_query(query, field, 443)
+        mock_compile_function_score.assert_not_called()
+        query = FunctionScore(
+            Page, query, functions=(("script_score", {"script": {"source": "1"}}),)
+        )
+        compiler = FunctionScoreSearchQueryCompiler(Page.objects.all(), query)
+        compiler._compile_query(query, field, 443)
+        mock_compile_function_score.assert_called_once_with(query, [field], 443)
+
+    def test_compile_function_score_query(self, mocker):
+        model_class = mocker.Mock()
+        decay = {"date_scorefunction_filter": {"scale": "10d", "decay": 0.5}}
+        script = {"script": {"source": "_score * 2"}}
+        query = FunctionScore(
+            model_class,
+            Phrase("quid"),
+            functions=(("gauss", decay), ("script_score", script)),
+        )
+        field = Field("foo")
+        compiler = FunctionScoreSearchQueryCompiler(Page.objects.all(), query)
+        parent_compiler = ExtendedSearchQueryCompiler(Page.objects.all(), query)
+        result = compiler._compile_function_score_query(query, [field])
+        assert result == {
+            "function_score": {
+                "query": parent_compiler._compile_query(query.subquery, field),
+                "functions": [{"gauss": decay}, {"script_score": script}],
+            }
+        }
+        # the functions are resolved when the query is built
+        model_class.get_score_functions.assert_not_called()
+
+        query = query.replace(score_mode="sum", boost_mode="replace")
+        result = compiler._compile_function_score_query(query, [field])
+        assert result["function_score"]["score_mode"] == "sum"
+        assert result["function_score"]["boost_mode"] == "replace"
 
 
 class TestFilteredSearchQueryCompiler:
@@ -482,13 +951,29 @@ class TestFilteredSearchQueryCompiler:
         result = compiler._process_lookup(field, "contains", 334)
         mock_parent.assert_not_called()
         assert result == {"match": {"foobar": 334}}
+        result = compiler._process_lookup("content_type", "contains", "foo.Bar")
+        mock_parent.assert_not_called()
+        assert result == {"term": {"content_type": "foo.Bar"}}
+        result = compiler._process_lookup(
+            "content_type", "contains", ["foo.Bar", "foo.Baz"]
+        )
+        mock_parent.assert_not_called()
+        assert result == {"terms": {"content_type": ["foo.Bar", "foo.Baz"]}}
         result = compiler._process_lookup(field, "excludes", "bar")
         mock_parent.assert_not_called()
-        assert result == {"bool": {"mustNot": {"terms": {"foobar": "bar"}}}}
+        assert result == {"bool": {"mustNot": {"terms": {"foobar": ["bar"]}}}}
+        result = compiler._process_lookup(field, "excludes", ["bar", "baz"])
+        assert result == {"bool": {"mustNot": {"terms": {"foobar": ["bar", "baz"]}}}}
         result = compiler._process_lookup(field, "gte", "bar")
         mock_parent.assert_called_with(field, "gte", "bar")
         assert result == parent_compiler._process_lookup(field, "gte", "bar")
 
+    def test_get_content_type_filter(self):
+        compiler = FilteredSearchQueryCompiler(Page.objects.all(), PlainText("quid"))
+        assert compiler.get_content_type_filter() == {
+            "term": {"content_type": "wagtailcore.Page"}
+        }
+
 
 class TestFilteredSearchMapping:
     def test_get_field_column_name(self, mocker):
@@ -509,15 +994,94 @@ class TestFilteredSearchMapping:
         assert result == "content_type"
 
 
+class TestTemplateSearchQueryCompiler:
+    def test_get_inner_query_renders_templates(self, mocker):
+        mock_parent = mocker.patch(
+            "wagtail_extended_search.layers.base.backends.backend.ExtendedSearchQueryCompiler.get_inner_query"
+        )
+        query = QueryTemplate.from_compiled_query(
+            Page, {"match": {"foo": QUERY_SLOT}}
+        ).bind("quid")
+        compiler = TemplateSearchQueryCompiler(Page.objects.all(), query)
+        assert compiler.get_inner_query() == {"match": {"foo": "quid"}}
+        mock_parent.assert_not_called()
+
+        query = PlainText("quid")
+        compiler = TemplateSearchQueryCompiler(Page.objects.all(), query)
+        assert compiler.get_inner_query() == mock_parent.return_value
+        mock_parent.assert_called_once()
+
+    def test_get_count_query_renders_count_templates(self):
+        query = QueryTemplate.from_compiled_query(
+            Page,
+            {"match": {"foo": {"query": QUERY_SLOT, "boost": 2.0}}},
+            {"match": {"foo": QUERY_SLOT}},
+        ).bind("quid")
+        compiler = TemplateSearchQueryCompiler(Page.objects.all(), query)
+        assert compiler.get_inner_count_query() == {"match": {"foo": "quid"}}
+        assert compiler.get_inner_query() == {
+            "match": {"foo": {"query": "quid", "boost": 2.0}}
+        }
+
+    def test_compile_template_query_checks_model_and_fields(self):
+        class OtherModel: ...
+
+        query = QueryTemplate.from_compiled_query(
+            Page, {"match": {"foo": QUERY_SLOT}}
+        ).bind("quid")
+        compiler = TemplateSearchQueryCompiler(Page.objects.all(), query)
+        compiler.fields = ["title"]
+        with pytest.raises(ValueError):
+            compiler._compile_template_query(query)
+
+        query = QueryTemplate.from_compiled_query(
+            OtherModel, {"match": {"foo": QUERY_SLOT}}
+        ).bind("quid")
+        compiler = TemplateSearchQueryCompiler(Page.objects.all(), query)
+        with pytest.raises(ValueError):
+            compiler._compile_template_query(query)
+
+    def test_compile_query_rejects_nested_templates(self):
+        query = QueryTemplate.from_compiled_query(
+            Page, {"match": {"foo": QUERY_SLOT}}
+        ).bind("quid")
+        compiler = TemplateSearchQueryCompiler(Page.objects.all(), query)
+        with pytest.raises(NotImplementedError):
+            compiler._compile_query(query, Field("foo"))
+
+
+class TestCustomSearchQueryCompiler:
+    def test_get_count_query_skips_scoring(self):
+        query = FunctionScore(
+            Page,
+            Nested(Phrase("quid"), path="content", score_mode="max"),
+            functions=(("script_score", {"script": {"source": "_score * 2"}}),),
+        )
+        compiler = CustomSearchQueryCompiler(Page.objects.all(), query)
+        count_query = compiler.get_count_query()
+        assert list(count_query) == ["constant_score"]
+        count_filter = count_query["constant_score"]["filter"]["bool"]
+        assert count_filter["filter"] == {"term": {"content_type": "wagtailcore.Page"}}
+        serialized_count_query = json.dumps(count_query)
+        assert "function_score" not in serialized_count_query
+        assert '"score_mode": "none"' in serialized_count_query
+        assert '"score_mode": "max"' not in serialized_count_query
+
+        assert compiler.for_count is False
+        assert "function_score" in json.dumps(compiler.get_query())
+
+
 class TestCustomSearchBackend:
     def test_correct_mappings_and_backends_configured(self):
         assert CustomSearchBackend.query_compiler_class == CustomSearchQueryCompiler
         assert CustomSearchBackend.mapping_class == CustomSearchMapping
+        assert CustomSearchBackend.results_class == ExtendedSearchResults
         assert ExtendedSearchQueryCompiler in inspect.getmro(CustomSearchQueryCompiler)
         assert BoostSearchQueryCompiler in inspect.getmro(CustomSearchQueryCompiler)
         assert FilteredSearchQueryCompiler in inspect.getmro(CustomSearchQueryCompiler)
         assert NestedSearchQueryCompiler in inspect.getmro(CustomSearchQueryCompiler)
         assert OnlyFieldSearchQueryCompiler in inspect.getmro(CustomSearchQueryCompiler)
+        assert TemplateSearchQueryCompiler in inspect.getmro(CustomSearchQueryCompiler)
         assert FilteredSearchMapping in inspect.getmro(CustomSearchMapping)
 
     def test_custom_search_backend_used(self):
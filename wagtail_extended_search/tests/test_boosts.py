@@ -0,0 +1,79 @@
+import pytest
+
+from wagtail_extended_search import settings as search_settings
+from wagtail_extended_search.boosts import BoostTable, get_boost_table
+from wagtail_extended_search.settings import (
+    DEFAULT_SETTINGS,
+    SettingsSnapshot,
+    record_settings_dependencies,
+)
+from wagtail_extended_search.types import AnalysisType, SearchQueryType
+
+
+def get_snapshot(**boost_parts):
+    return SettingsSnapshot(
+        {
+            "boost_parts": {
+                "query_types": {
+                    "phrase": "10",
+                    "query_and": 2.5,
+                    "query_or": None,
+                    "fuzzy": "not-a-number",
+                },
+                "analyzers": {"explicit": 3.5, "tokenized": 0},
+                "fields": {"app.model.title": "5", "app.model.body": 0},
+                **boost_parts,
+            }
+        },
+        types=DEFAULT_SETTINGS,
+    )
+
+
+class TestBoostTable:
+    def test_query_type_boosts(self):
+        boost_table = BoostTable(get_snapshot())
+        assert boost_table.get_query_type_boost(SearchQueryType.PHRASE) == 10.0
+        assert boost_table.get_query_type_boost(SearchQueryType.QUERY_AND) == 2.5
+        assert boost_table.get_query_type_boost(SearchQueryType.QUERY_OR) == 1.0
+        assert boost_table.get_query_type_boost(SearchQueryType.FUZZY) == 1.0
+        with pytest.raises(ValueError):
+            boost_table.get_query_type_boost("phrase")
+
+    def test_analysis_type_boosts(self):
+        boost_table = BoostTable(get_snapshot())
+        assert boost_table.get_analysis_type_boost(AnalysisType.EXPLICIT) == 3.5
+        assert boost_table.get_analysis_type_boost(AnalysisType.KEYWORD) == 3.5
+        assert boost_table.get_analysis_type_boost(AnalysisType.TOKENIZED) == 1.0
+        with pytest.raises(ValueError, match="FILTER is not a valid"):
+            boost_table.get_analysis_type_boost(AnalysisType.FILTER)
+        with pytest.raises(ValueError):
+            boost_table.get_analysis_type_boost(AnalysisType.NGRAM)
+
+    def test_field_boosts(self):
+        boost_table = BoostTable(get_snapshot())
+        assert boost_table.get_field_boost("app.model.title") == 5.0
+        assert boost_table.get_field_boost("app.model.body") == 0.0
+        assert boost_table.get_field_boost("app.model.missing") == 1.0
+
+    def test_lookups_record_dependencies(self):
+        boost_table = BoostTable(get_snapshot())
+        with record_settings_dependencies() as dependencies:
+            boost_table.get_query_type_boost(SearchQueryType.PHRASE)
+            boost_table.get_analysis_type_boost(AnalysisType.KEYWORD)
+            boost_table.get_field_boost("app.model.missing")
+        assert dependencies == {
+            "boost_parts__query_types__phrase",
+            "boost_parts__analyzers__explicit",
+            "boost_parts__fields__app.model.missing",
+        }
+
+    def test_get_boost_table(self, mocker):
+        boost_table = get_boost_table()
+        assert boost_table.snapshot is search_settings.wagtail_extended_search_settings
+        assert get_boost_table() is boost_table
+
+        mocker.patch.object(
+            search_settings, "wagtail_extended_search_settings", get_snapshot()
+        )
+        assert get_boost_table() is not boost_table
+        assert get_boost_table().get_field_boost("app.model.title") == 5.0
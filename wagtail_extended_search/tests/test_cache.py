@@ -0,0 +1,232 @@
+import pytest
+from django.core.cache import cache
+from wagtail.search.query import Or, PlainText
+
+from wagtail_extended_search import settings as search_settings
+from wagtail_extended_search.cache import CACHE_KEY_PREFIX, CacheEntry, QueryCache
+from wagtail_extended_search.layers.filtered.query import Filtered
+from wagtail_extended_search.settings import SettingsSnapshot
+
+
+class ModelClass:
+    class Meta:
+        label_lower = "mock.modelclass"
+
+    _meta = Meta()
+
+
+class TestQueryCache:
+    @pytest.fixture(autouse=True)
+    def enable_cache(self, settings):
+        settings.SEARCH_ENABLE_QUERY_CACHE = True
+        cache.clear()
+
+    def test_get_key(self):
+        query_cache = QueryCache()
+        assert (
+            query_cache.get_key("query", ModelClass, "abc123")
+            == f"{CACHE_KEY_PREFIX}:query:mock.modelclass:abc123"
+        )
+        assert (
+            query_cache.get_key("template", ModelClass, "abc123", 1)
+            == f"{CACHE_KEY_PREFIX}:template:mock.modelclass:abc123:1"
+        )
+
+    def test_settings_change_misses_local_cache(self, mocker):
+        query_cache = QueryCache()
+        build = mocker.Mock(return_value=PlainText("foo"))
+        query_cache.get_or_build(build, "query", ModelClass)
+        mocker.patch.object(
+            search_settings.wagtail_extended_search_settings, "version", "new-version"
+        )
+        # nothing it depends on changed, so it comes from the shared cache
+        query_cache.get_or_build(build, "query", ModelClass)
+        build.assert_called_once()
+        assert len(query_cache._local) == 2
+
+    def test_get_or_build(self, mocker):
+        query_cache = QueryCache()
+        build = mocker.Mock(return_value=PlainText("foo"))
+
+        result = query_cache.get_or_build(build, "query", ModelClass)
+        assert repr(result) == repr(PlainText("foo"))
+        assert query_cache.get_or_build(build, "query", ModelClass) is result
+        build.assert_called_once()
+
+        query_cache.get_or_build(build, "query", ModelClass, ignore_cache=True)
+        assert build.call_count == 2
+
+    def test_check_settings(self, mocker):
+        query_cache = QueryCache()
+        query_cache.set_local("a", 1)
+        mock_check = mocker.patch.object(
+            search_settings.settings_generation, "check", return_value=False
+        )
+        query_cache.check_settings()
+        assert query_cache.get_local("a") == (True, 1)
+
+        mock_check.return_value = True
+        query_cache.check_settings()
+        assert query_cache.get_local("a") == (False, None)
+
+        # builds don't check, so the settings can't change part way through one
+        mock_check.reset_mock()
+        query_cache.get_or_build(lambda: PlainText("foo"), "query", ModelClass)
+        mock_check.assert_not_called()
+
+    def test_get_or_build_caches_none(self, mocker):
+        query_cache = QueryCache()
+        build = mocker.Mock(return_value=None)
+        assert query_cache.get_or_build(build, "query", ModelClass) is None
+        assert query_cache.get_or_build(build, "query", ModelClass) is None
+        build.assert_called_once()
+
+    def test_get_or_build_uses_shared_cache(self, mocker):
+        query = Or(
+            [
+                Filtered(PlainText("foo"), filters=[("content_type", "excludes", [])]),
+                PlainText("bar"),
+            ]
+        )
+        QueryCache().get_or_build(lambda: query, "query", ModelClass)
+
+        # a second process has an empty local cache
+        build = mocker.Mock()
+        result = QueryCache().get_or_build(build, "query", ModelClass)
+        build.assert_not_called()
+        assert repr(result) == repr(query)
+        assert result is not query
+
+    def test_get_or_build_disabled(self, mocker, settings):
+        settings.SEARCH_ENABLE_QUERY_CACHE = False
+        query_cache = QueryCache()
+        build = mocker.Mock(return_value=PlainText("foo"))
+        query_cache.get_or_build(build, "query", ModelClass)
+        query_cache.get_or_build(build, "query", ModelClass)
+        assert build.call_count == 2
+        assert not query_cache._local
+
+    def test_only_dependent_entries_are_rebuilt(self, mocker):
+        settings_dict = {
+            "boost_parts": {"fields": {"mock.modelclass.title": 2.0}},
+            "analyzers": {"tokenized": {"query_types": ["phrase"]}},
+        }
+        mocker.patch.object(
+            search_settings,
+            "wagtail_extended_search_settings",
+            SettingsSnapshot(settings_dict),
+        )
+
+        def build_title():
+            return search_settings.get_setting(
+                "boost_parts__fields__mock.modelclass.title"
+            )
+
+        def build_analyzer():
+            return search_settings.get_setting("analyzers__tokenized__query_types")
+
+        build_title = mocker.Mock(side_effect=build_title)
+        build_analyzer = mocker.Mock(side_effect=build_analyzer)
+        QueryCache().get_or_build(build_title, "title", ModelClass)
+        QueryCache().get_or_build(build_analyzer, "analyzer", ModelClass)
+
+        settings_dict["boost_parts"]["fields"]["mock.modelclass.title"] = 3.0
+        mocker.patch.object(
+            search_settings,
+            "wagtail_extended_search_settings",
+            SettingsSnapshot(settings_dict),
+        )
+        assert QueryCache().get_or_build(build_title, "title", ModelClass) == 3.0
+        assert QueryCache().get_or_build(build_analyzer, "analyzer", ModelClass) == (
+            "phrase",
+        )
+        assert build_title.call_count == 2
+        build_analyzer.assert_called_once()
+
+    def test_dependencies_pass_to_outer_build(self, mocker):
+        mocker.patch.object(
+            search_settings,
+            "wagtail_extended_search_settings",
+            SettingsSnapshot({"analyzers": {"tokenized": {"query_types": ["phrase"]}}}),
+        )
+        query_cache = QueryCache()
+        query_cache.get_or_build(
+            lambda: search_settings.get_setting("analyzers__tokenized__query_types"),
+            "inner",
+            ModelClass,
+        )
+        entry = query_cache.build(
+            lambda: query_cache.get_or_build(mocker.Mock(), "inner", ModelClass)
+        )
+        assert entry.value == ("phrase",)
+        assert entry.dependencies == {"analyzers__tokenized__query_types"}
+
+    def test_waits_for_other_build(self, mocker):
+        query_cache = QueryCache()
+        key = query_cache.get_key(
+            "query",
+            ModelClass,
+            search_settings.wagtail_extended_search_settings.version,
+        )
+        # another process holds the build lock
+        cache.add(f"{key}:lock", 1)
+        mocker.patch("wagtail_extended_search.cache.BUILD_WAIT_INTERVAL", 0)
+        mocker.patch.object(
+            query_cache,
+            "get_shared",
+            side_effect=[
+                (False, None),
+                (False, None),
+                (True, CacheEntry("built", frozenset())),
+            ],
+        )
+        build = mocker.Mock()
+        assert query_cache.get_or_build(build, "query", ModelClass) == "built"
+        build.assert_not_called()
+
+    def test_build_lock_is_kept_while_in_use(self, mocker):
+        query_cache = QueryCache()
+        key = query_cache.get_key(
+            "query",
+            ModelClass,
+            search_settings.wagtail_extended_search_settings.version,
+        )
+        build_locks = []
+
+        def build():
+            build_locks.append(query_cache._build_locks[key])
+            return PlainText("foo")
+
+        query_cache.get_or_build(build, "query", ModelClass, ignore_cache=True)
+        # while another thread is still waiting on the lock, it's the one used
+        waiting_lock = build_locks[0]
+        query_cache.get_or_build(build, "query", ModelClass, ignore_cache=True)
+        assert build_locks[1] is waiting_lock
+
+        # and once nothing is, it's dropped
+        del build_locks[:], waiting_lock
+        assert key not in query_cache._build_locks
+
+    def test_local_cache_is_lru(self):
+        query_cache = QueryCache(max_size=2)
+        query_cache.set_local("a", 1)
+        query_cache.set_local("b", 2)
+        query_cache.get_local("a")
+        query_cache.set_local("c", 3)
+        assert query_cache.get_local("a") == (True, 1)
+        assert query_cache.get_local("b") == (False, None)
+        assert query_cache.get_local("c") == (True, 3)
+
+        query_cache.clear_local()
+        assert query_cache.get_local("a") == (False, None)
+
+    def test_serialization(self):
+        query = PlainText("foo", operator="and")
+        serialized = QueryCache.serialize(query)
+        assert isinstance(serialized, bytes)
+        assert repr(QueryCache.deserialize(serialized)) == repr(query)
+
+    def test_bad_shared_entry_is_ignored(self):
+        query_cache = QueryCache()
+        cache.set("bad", b"not zlib")
+        assert query_cache.get_shared_value("bad") == (False, None)
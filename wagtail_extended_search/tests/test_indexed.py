@@ -14,8 +14,11 @@ from wagtailmedia.models import Media
 
 from wagtail_extended_search.index import (
     DWIndexedField,
+    Indexed,
+    ModelHierarchy,
     class_is_indexed,
     get_indexed_models,
+    get_model_hierarchy,
 )
 from wagtail_extended_search.management.commands.create_index_fields_json import (
     JSON_FILE,
@@ -269,3 +272,90 @@ from wagtail_extended_search.management.commands.create_index_fields_json import
 #                 " If this was intentional, please update the JSON file by running the"
 #                 " `create_index_fields_json` management command."
 #             )
+
+
+class TestModelHierarchy:
+    def get_classes(self):
+        class Root(Indexed):
+            @classmethod
+            def _has_unique_index_fields(cls):
+                return True
+
+        class Child(Root): ...
+
+        class UnchangedChild(Root):
+            @classmethod
+            def _has_unique_index_fields(cls):
+                return False
+
+        class GrandChild(Child): ...
+
+        return Root, Child, UnchangedChild, GrandChild
+
+    def test_get_extended_models_with_unique_indexed_fields(self):
+        Root, Child, UnchangedChild, GrandChild = self.get_classes()
+        hierarchy = ModelHierarchy([Root, Child, UnchangedChild, GrandChild])
+        assert hierarchy.get_children(Root) == [Child, UnchangedChild, GrandChild]
+        assert hierarchy.get_extended_models_with_unique_indexed_fields(Root) == [
+            Child,
+            GrandChild,
+        ]
+        assert hierarchy.get_extended_models_with_unique_indexed_fields(Child) == [
+            GrandChild
+        ]
+        assert (
+            hierarchy.get_extended_models_with_unique_indexed_fields(GrandChild) == []
+        )
+
+    def test_has_unique_index_fields_is_remembered(self, mocker):
+        Root, Child, UnchangedChild, GrandChild = self.get_classes()
+        hierarchy = ModelHierarchy([Root])
+        mock_check = mocker.patch.object(
+            Root, "_has_unique_index_fields", return_value=True
+        )
+        assert hierarchy.has_unique_index_fields(Root)
+        assert hierarchy.has_unique_index_fields(Root)
+        mock_check.assert_called_once_with()
+
+    def test_get_root_index_model(self):
+        Root, Child, UnchangedChild, GrandChild = self.get_classes()
+        hierarchy = ModelHierarchy([Root, Child, UnchangedChild, GrandChild])
+        assert hierarchy.get_root_index_model(GrandChild) == Root
+        assert hierarchy.get_root_index_model(Root) == Root
+
+    def test_get_indexed_ancestors(self, mocker):
+        Root, Child, UnchangedChild, GrandChild = self.get_classes()
+        mocker.patch(
+            "wagtail_extended_search.index.class_is_indexed",
+            side_effect=lambda cls: cls in (Root, Child, UnchangedChild, GrandChild),
+        )
+        hierarchy = ModelHierarchy([Root, Child, UnchangedChild, GrandChild])
+        assert hierarchy.get_indexed_ancestors(GrandChild) == [Root, Child, GrandChild]
+        assert hierarchy.get_indexed_ancestors(UnchangedChild) == [Root]
+
+    def test_indexed_fields_are_configured_once(self, mocker):
+        Root, Child, UnchangedChild, GrandChild = self.get_classes()
+        root_field = DWIndexedField("title")
+        child_field = DWIndexedField("summary")
+        Root.indexed_fields = [root_field]
+        Child.indexed_fields = [root_field, child_field]
+        mocker.patch(
+            "wagtail_extended_search.index.class_is_indexed",
+            side_effect=lambda cls: cls in (Root, Child, UnchangedChild, GrandChild),
+        )
+        hierarchy = ModelHierarchy([Root, Child, UnchangedChild, GrandChild])
+        hierarchy.get_indexed_ancestors(GrandChild)
+        # a field belongs to the model nearest the root that lists it
+        assert root_field.configuration_model == Root
+        assert child_field.configuration_model == Child
+
+        mock_configure = mocker.patch.object(hierarchy, "configure_indexed_fields")
+        hierarchy.get_indexed_ancestors(GrandChild)
+        mock_configure.assert_not_called()
+
+    def test_get_model_hierarchy(self, mocker):
+        mocker.patch("wagtail_extended_search.index.model_hierarchy", None)
+        hierarchy = get_model_hierarchy()
+        assert isinstance(hierarchy, ModelHierarchy)
+        assert get_model_hierarchy() is hierarchy
+        assert hierarchy.indexed_models == get_indexed_models()
@@ -227,6 +227,14 @@ class TestRelatedFields:
         assert field.field_name == "foo"
         assert field.model_field_name == field.field_name
         assert field.fields == ["bar", "baz"]
+        assert field.score_mode is None
+
+    def test_score_mode(self):
+        field = RelatedFields("foo", ["bar"], score_mode="max")
+        assert field.score_mode == "max"
+
+        with pytest.raises(ValueError, match="score_mode must be one of"):
+            RelatedFields("foo", ["bar"], score_mode="median")
 
     def test_relatedfields_inheritance(self):
         assert issubclass(RelatedFields, ModelFieldNameMixin)
@@ -376,6 +384,32 @@ class TestRelatedFields:
             "--search-field--",
         ]
 
+    def test_get_related_field(self):
+        title = SearchField("title")
+        name = SearchField("name")
+        publisher = RelatedFields("publisher", [name])
+        books = RelatedFields("books", [title, publisher])
+        field = RelatedFields("author", [books])
+        assert field.get_related_field_paths() == {
+            "books": books,
+            "books.title": title,
+            "books.publisher": publisher,
+            "books.publisher.name": name,
+        }
+        assert field.get_related_field("books.title") == title
+        assert field.get_related_field("books.publisher.name") == name
+        assert field.get_related_field("books.missing") is None
+
+        # the fields are looked up as they are now, at any level
+        books.fields = [publisher]
+        assert field.get_related_field("books.title") is None
+        publisher.fields.append(title)
+        assert field.get_related_field("books.publisher.title") == title
+
+        field.fields = [publisher]
+        assert field.get_related_field("books.publisher.name") is None
+        assert field.get_related_field("publisher.name") == name
+
 
 class TestIndexedField:
     def test_init_params_accepted_defaults_and_all_saved(self):
@@ -692,6 +726,20 @@ class TestMultiQueryIndexedField:
         assert field.tokenized
         assert field.fuzzy
 
+    def test_init_fuzzy_options(self):
+        field = MultiQueryIndexedField("foo", fuzzy=True)
+        assert field.fuzzy_options == {}
+
+        field = MultiQueryIndexedField(
+            "foo", fuzzy=True, fuzzy_options={"prefix_length": 2}
+        )
+        assert field.fuzzy_options == {"prefix_length": 2}
+
+        with pytest.raises(TypeError, match="transpositions isn't a fuzzy option"):
+            MultiQueryIndexedField(
+                "foo", fuzzy=True, fuzzy_options={"transpositions": False}
+            )
+
     def test_init_params_set_search_param_when_needed(self):
         field = MultiQueryIndexedField("foo", tokenized=True)
         assert field.search
@@ -854,9 +902,7 @@ class TestGetIndexedField:
         settings.settings_singleton["analyzers"][analyzer.value][
             "index_fieldname_suffix"
         ] = "bar"
-        settings.wagtail_extended_search_settings = (
-            settings.settings_singleton.to_dict()
-        )
+        settings.export_settings()
 
         assert (
             settings.settings_singleton["analyzers"][analyzer.value][
@@ -869,6 +915,4 @@ class TestGetIndexedField:
         settings.settings_singleton["analyzers"][analyzer.value][
             "index_fieldname_suffix"
         ] = ""
-        settings.wagtail_extended_search_settings = (
-            settings.settings_singleton.to_dict()
-        )
+        settings.export_settings()
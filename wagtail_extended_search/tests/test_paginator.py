@@ -0,0 +1,101 @@
+import pytest
+from django.core.paginator import EmptyPage, PageNotAnInteger
+
+from wagtail_extended_search.layers.base.backends.backend import ExtendedSearchResults
+from wagtail_extended_search.paginator import SearchPaginator
+
+
+class TestSearchPaginator:
+    def get_results(self, mocker, total):
+        hits = [{"fields": {"pk": [str(pk)]}} for pk in range(total)]
+
+        def search(body, from_, size, **kwargs):
+            return {
+                "hits": {
+                    "hits": hits[from_ : from_ + size],
+                    "total": {"value": total, "relation": "eq"},
+                }
+            }
+
+        backend = mocker.Mock()
+        backend.es.search.side_effect = search
+        results = ExtendedSearchResults(backend, mocker.Mock())
+        mocker.patch.object(
+            ExtendedSearchResults,
+            "_get_results_from_hits",
+            lambda self, hits: [hit["fields"]["pk"][0] for hit in hits],
+        )
+        return results
+
+    def test_page_is_fetched_with_one_request(self, mocker):
+        results = self.get_results(mocker, 25)
+        paginator = SearchPaginator(results, 10)
+
+        page = paginator.page(2)
+        assert list(page) == [str(pk) for pk in range(10, 20)]
+        assert paginator.count == 25
+        assert paginator.num_pages == 3
+        results.backend.es.search.assert_called_once()
+        results.backend.es.count.assert_not_called()
+
+        page = paginator.page("3")
+        assert list(page) == [str(pk) for pk in range(20, 25)]
+        assert results.backend.es.search.call_count == 2
+
+    def test_orphans_join_the_last_page(self, mocker):
+        results = self.get_results(mocker, 12)
+        paginator = SearchPaginator(results, 10, orphans=2)
+        assert list(paginator.page(1)) == [str(pk) for pk in range(12)]
+        assert paginator.num_pages == 1
+
+        results = self.get_results(mocker, 13)
+        paginator = SearchPaginator(results, 10, orphans=2)
+        assert list(paginator.page(1)) == [str(pk) for pk in range(10)]
+
+    def test_invalid_pages(self, mocker):
+        results = self.get_results(mocker, 5)
+        paginator = SearchPaginator(results, 10)
+        with pytest.raises(PageNotAnInteger):
+            paginator.page("foo")
+        with pytest.raises(EmptyPage):
+            paginator.page(0)
+        results.backend.es.search.assert_not_called()
+
+        list(paginator.page(1))
+        with pytest.raises(EmptyPage):
+            paginator.page(2)
+        # the total is known, so out of range pages aren't searched for
+        results.backend.es.search.assert_called_once()
+        results.backend.es.count.assert_not_called()
+
+    def test_out_of_range_page_before_the_total_is_known(self, mocker):
+        results = self.get_results(mocker, 5)
+        paginator = SearchPaginator(results, 10)
+        with pytest.raises(EmptyPage):
+            paginator.page(2)
+        with pytest.raises(EmptyPage):
+            paginator.page(3)
+        results.backend.es.search.assert_called_once()
+
+    def test_pages_past_the_result_window_are_counted_first(self, mocker, settings):
+        results = self.get_results(mocker, 5)
+        results.backend.es.count.return_value = {"count": 5}
+        paginator = SearchPaginator(results, 10)
+        with pytest.raises(EmptyPage):
+            paginator.page(100000)
+        results.backend.es.search.assert_not_called()
+        results.backend.es.count.assert_called_once()
+
+        settings.SEARCH_MAX_RESULT_WINDOW = 20
+        results = self.get_results(mocker, 25)
+        results.backend.es.count.return_value = {"count": 25}
+        paginator = SearchPaginator(results, 10)
+        page = paginator.page(3)
+        results.backend.es.count.assert_called_once()
+        # not prefetched, so the page is searched for as it's read
+        results.backend.es.search.assert_not_called()
+        assert list(page) == [str(pk) for pk in range(20, 25)]
+
+    def test_other_object_lists_are_paginated_as_usual(self):
+        paginator = SearchPaginator(list(range(25)), 10)
+        assert list(paginator.page(3)) == list(range(20, 25))
@@ -1,6 +1,16 @@
+import copy
+import pickle
+
 import pytest
-from wagtail.search.query import PlainText
+from wagtail.search.query import Boost, Or, PlainText
 
+from wagtail_extended_search.layers.base.query import (
+    get_query_attributes,
+    get_query_key,
+    intern_query,
+)
+from wagtail_extended_search.layers.function_score.query import FunctionScore
+from wagtail_extended_search.layers.template.query import QUERY_SLOT, QueryTemplate
 from wagtail_extended_search.query import Filtered, Nested, OnlyFields
 
 
@@ -80,6 +90,12 @@ class TestNested:
 
         assert repr(te.subquery) == repr(PlainText("foo"))
         assert te.path == "bar"
+        assert te.score_mode is None
+
+        te = Nested(PlainText("foo"), "bar", score_mode="max")
+        assert te.score_mode == "max"
+        with pytest.raises(ValueError, match="The `score_mode` parameter must be"):
+            Nested(PlainText("foo"), "bar", score_mode="median")
 
     def test_repr(self):
         assert (
@@ -91,6 +107,54 @@ class TestNested:
             )
             == f"<Nested {repr(PlainText('foo'))} path='bar'>"
         )
+        assert (
+            repr(Nested(PlainText("foo"), "bar", score_mode="sum"))
+            == f"<Nested {repr(PlainText('foo'))} path='bar' score_mode='sum'>"
+        )
+
+
+class TestFunctionScore:
+    functions = (("script_score", {"script": {"source": "_score * 2"}}),)
+
+    def test_init_sets_attributes(self):
+        with pytest.raises(
+            TypeError, match="The `subquery` parameter must be of type SearchQuery"
+        ):
+            FunctionScore(None, "foo", self.functions)
+        with pytest.raises(
+            TypeError, match="The `functions` parameter must be a non-empty tuple"
+        ):
+            FunctionScore(None, PlainText("foo"), ())
+        with pytest.raises(TypeError, match="Each of the `functions` must be a"):
+            FunctionScore(None, PlainText("foo"), (("script_score",),))
+        with pytest.raises(ValueError, match="The `score_mode` parameter must be"):
+            FunctionScore(None, PlainText("foo"), self.functions, score_mode="all")
+        with pytest.raises(ValueError, match="The `boost_mode` parameter must be"):
+            FunctionScore(None, PlainText("foo"), self.functions, boost_mode="all")
+
+        te = FunctionScore(None, PlainText("foo"), list(self.functions))
+        assert repr(te.subquery) == repr(PlainText("foo"))
+        assert te.functions == self.functions
+        assert te.score_mode is None
+        assert te.boost_mode is None
+
+        te = FunctionScore(
+            None,
+            PlainText("foo"),
+            self.functions,
+            score_mode="sum",
+            boost_mode="replace",
+        )
+        assert te.score_mode == "sum"
+        assert te.boost_mode == "replace"
+
+    def test_repr(self):
+        assert repr(
+            FunctionScore(None, PlainText("foo"), self.functions, score_mode="sum")
+        ) == (
+            f"<FunctionScore {repr(PlainText('foo'))} functions=['script_score'] "
+            "score_mode='sum' boost_mode='None' >"
+        )
 
 
 class TestFiltered:
@@ -151,3 +215,195 @@ class TestFiltered:
             )
             == f"<Filtered {repr(PlainText('foo'))} filters=[('bar', 'baz', 'foobar')]>"
         )
+
+
+class TestImmutableSearchQuery:
+    def test_attributes_cant_change(self):
+        query = Nested(PlainText("foo"), path="bar")
+        with pytest.raises(AttributeError):
+            query.path = "baz"
+        with pytest.raises(AttributeError):
+            del query.subquery
+        assert query.path == "bar"
+
+    def test_replace(self):
+        query = OnlyFields(PlainText("foo"), ["bar"], only_model="fuzz")
+        new_query = query.replace(subquery=PlainText("baz"))
+        assert new_query is not query
+        assert repr(query.subquery) == repr(PlainText("foo"))
+        assert repr(new_query.subquery) == repr(PlainText("baz"))
+        assert new_query.fields is query.fields
+        with pytest.raises(AttributeError):
+            new_query.fields = []
+
+    def test_pickle(self):
+        query = Filtered(PlainText("foo"), [("bar", "baz", "foobar")])
+        unpickled_query = pickle.loads(pickle.dumps(query))
+        assert repr(unpickled_query) == repr(query)
+        with pytest.raises(AttributeError):
+            unpickled_query.filters = []
+
+    def test_get_query_attributes(self):
+        query = Nested(PlainText("foo"), path="bar")
+        assert get_query_attributes(query) == {
+            "_frozen": True,
+            "subquery": query.subquery,
+            "path": "bar",
+            "score_mode": None,
+        }
+        copied_query = copy.copy(query)
+        assert copied_query.path == "bar"
+        with pytest.raises(AttributeError):
+            copied_query.path = "baz"
+
+
+class TestGetQueryKey:
+    def test_equal_for_the_same_structure(self):
+        query = Filtered(
+            OnlyFields(PlainText("foo", boost=2.0), ["bar"], only_model="fuzz"),
+            [("content_type", "excludes", ["baz"])],
+        )
+        same_query = Filtered(
+            OnlyFields(PlainText("foo", boost=2.0), ["bar"], only_model="fuzz"),
+            [("content_type", "excludes", ["baz"])],
+        )
+        assert get_query_key(query) == get_query_key(same_query)
+        hash(get_query_key(query))
+
+        assert get_query_key(query) != get_query_key(
+            Filtered(
+                OnlyFields(PlainText("foo", boost=3.0), ["bar"], only_model="fuzz"),
+                [("content_type", "excludes", ["baz"])],
+            )
+        )
+        assert get_query_key(query) != get_query_key(
+            Nested(
+                OnlyFields(PlainText("foo", boost=2.0), ["bar"], only_model="fuzz"),
+                path="content_type",
+            )
+        )
+
+
+class TestInternQuery:
+    def test_equal_queries_are_shared(self):
+        class ModelClass: ...
+
+        def build_query():
+            return Or(
+                [
+                    OnlyFields(
+                        QueryTemplate(ModelClass, ["{", "}"]),
+                        ["bar"],
+                        only_model="fuzz",
+                    ),
+                    Filtered(
+                        OnlyFields(
+                            QueryTemplate(ModelClass, ["{", "}"]),
+                            ["bar"],
+                            only_model="fuzz",
+                        ),
+                        [("content_type", "excludes", ["baz"])],
+                    ),
+                ]
+            )
+
+        query = build_query()
+        query_repr = repr(query)
+        interned_query = intern_query(query)
+        assert repr(interned_query) == query_repr
+        assert interned_query.subqueries[0] is interned_query.subqueries[1].subquery
+        # the query passed in isn't changed
+        assert query.subqueries[0] is not query.subqueries[1].subquery
+
+        # Or can be changed in place, so only its subqueries are shared
+        other_interned_query = intern_query(build_query())
+        assert other_interned_query is not interned_query
+        assert other_interned_query.subqueries[1] is interned_query.subqueries[1]
+
+        assert intern_query(
+            OnlyFields(
+                QueryTemplate(ModelClass, ["{", "}"]), ["baz"], only_model="fuzz"
+            )
+        ) is not (interned_query.subqueries[0])
+
+    def test_mutable_queries_arent_shared(self):
+        def build_query():
+            return OnlyFields(Boost(PlainText("foo"), 2.0), ["bar"], only_model="fuzz")
+
+        query = build_query()
+        assert intern_query(query) is query
+        assert intern_query(build_query()) is not query
+
+    def test_unhashable_queries_arent_shared(self):
+        query = Filtered(PlainText("foo"), [("bar", "baz", {"foobar"})])
+        assert intern_query(query) is query
+
+
+class TestQueryTemplate:
+    def test_init_sets_attributes(self):
+        with pytest.raises(
+            TypeError, match="The `fragments` parameter must be a non-empty list"
+        ):
+            QueryTemplate("model", [])
+        with pytest.raises(
+            TypeError, match="The `query_string` parameter must be a string"
+        ):
+            QueryTemplate("model", ["{}"], 1)
+
+        qt = QueryTemplate("model", ["{}"])
+        assert qt.model_class == "model"
+        assert qt.fragments == ["{}"]
+        assert qt.query_string is None
+
+    def test_from_compiled_query_splits_on_slots(self):
+        qt = QueryTemplate.from_compiled_query(
+            "model",
+            {"bool": {"should": [{"match": {"a": QUERY_SLOT}}, {"b": QUERY_SLOT}]}},
+        )
+        assert qt.fragments == [
+            '{"bool":{"should":[{"match":{"a":"',
+            '"}},{"b":"',
+            '"}]}}',
+        ]
+
+    def test_bind_returns_new_instance(self):
+        qt = QueryTemplate.from_compiled_query("model", {"match": {"a": QUERY_SLOT}})
+        bound = qt.bind("foo")
+        assert bound is not qt
+        assert qt.query_string is None
+        assert bound.query_string == "foo"
+        assert bound.fragments is qt.fragments
+
+    def test_render(self):
+        qt = QueryTemplate.from_compiled_query(
+            "model", {"match": {"a": {"query": QUERY_SLOT, "boost": 2.0}}}
+        )
+        with pytest.raises(ValueError):
+            qt.render()
+        assert qt.bind("foo").render() == {
+            "match": {"a": {"query": "foo", "boost": 2.0}}
+        }
+        assert qt.bind('"foo" \\ bar').render() == {
+            "match": {"a": {"query": '"foo" \\ bar', "boost": 2.0}}
+        }
+
+    def test_render_for_count(self):
+        qt = QueryTemplate.from_compiled_query("model", {"match": {"a": QUERY_SLOT}})
+        assert qt.count_fragments is None
+        # falls back to the query when there's no count query
+        assert qt.bind("foo").render(for_count=True) == {"match": {"a": "foo"}}
+
+        qt = QueryTemplate.from_compiled_query(
+            "model",
+            {"match": {"a": {"query": QUERY_SLOT, "boost": 2.0}}},
+            {"match": {"a": QUERY_SLOT}},
+        )
+        bound = qt.bind("foo")
+        assert bound.count_fragments is qt.count_fragments
+        assert bound.render() == {"match": {"a": {"query": "foo", "boost": 2.0}}}
+        assert bound.render(for_count=True) == {"match": {"a": "foo"}}
+
+        with pytest.raises(
+            TypeError, match="The `count_fragments` parameter must be a non-empty list"
+        ):
+            QueryTemplate("model", ["{}"], count_fragments=[])
@@ -1,3 +1,4 @@
+import pickle
 from unittest.mock import call
 
 import pytest
@@ -5,12 +6,36 @@ from django.test import override_settings
 from wagtail.search.query import And, Boost, Fuzzy, Not, Or, Phrase, PlainText
 
 from wagtail_extended_search import settings
-from wagtail_extended_search.index import (IndexedField, RelatedFields,
-                                           SearchField)
+from wagtail_extended_search.index import (BaseField, IndexedField,
+                                           RelatedFields, SearchField)
+from wagtail_extended_search.layers.boost.query import BoundedFuzzy
+from wagtail_extended_search.layers.function_score.index import ScoreFunction
+from wagtail_extended_search.layers.function_score.query import FunctionScore
+from wagtail_extended_search.layers.multi_query.index import MultiQueryIndexedField
+from wagtail_extended_search.layers.template.query import QUERY_SLOT, QueryTemplate
 from wagtail_extended_search.query import Filtered, Nested, OnlyFields
 from wagtail_extended_search.query_builder import (CustomQueryBuilder,
                                                    QueryBuilder, Variable)
-from wagtail_extended_search.types import AnalysisType, SearchQueryType
+from wagtail_extended_search.types import AnalysisType, QueryShape, SearchQueryType
+
+
+def patch_settings(mocker, updated_settings: dict):
+    """
+    Swaps in a snapshot of the current settings with the given flat keys
+    updated, since the exported settings can't be changed in place
+    """
+    settings_dict = settings.settings_singleton.to_dict()
+    for key, value in updated_settings.items():
+        *key_parts, last_key_part = key.split(settings.NESTING_SEPARATOR)
+        sub_dict = settings_dict
+        for key_part in key_parts:
+            sub_dict = sub_dict.setdefault(key_part, {})
+        sub_dict[last_key_part] = value
+    mocker.patch.object(
+        settings,
+        "wagtail_extended_search_settings",
+        settings.SettingsSnapshot(settings_dict, types=settings.DEFAULT_SETTINGS),
+    )
 
 
 class MockModelClass:
@@ -50,6 +75,57 @@ class TestCustomQueryBuilder:
         assert CustomQueryBuilder.build_query_for_model(MockModelClass) == "foo"
         mock_combine.assert_called_once_with(None, "--query--")
 
+    def test_build_query_for_model_resolves_score_functions(self, mocker):
+        mocker.patch("wagtail_extended_search.query_builder.Indexed", object)
+        built_query = PlainText("foo")
+        mocker.patch(
+            "wagtail_extended_search.query_builder.CustomQueryBuilder._build_search_query",
+            return_value=built_query,
+        )
+        decay_function = ScoreFunction(
+            "gauss", field_name="date", scale="10d", decay=0.5
+        )
+        decay_function.configuration_model = mocker.Mock()
+        decay_function.configuration_model.get_root_index_model.return_value = (
+            decay_function.configuration_model
+        )
+        other_decay_function = ScoreFunction(
+            "gauss", field_name="updated", scale="1d", decay=0.2
+        )
+        other_decay_function.configuration_model = decay_function.configuration_model
+        script_function = ScoreFunction("script_score", source="_score * 2")
+
+        class ModelWithScoreFunctions(MockModelClass):
+            indexed_fields = [
+                "--field--",
+                decay_function,
+                other_decay_function,
+                script_function,
+            ]
+
+        query = CustomQueryBuilder.build_query_for_model(ModelWithScoreFunctions)
+        assert isinstance(query, FunctionScore)
+        assert query.model_class is ModelWithScoreFunctions
+        assert query.subquery is built_query
+        assert query.functions == (
+            ("gauss", {"date_scorefunction_filter": {"scale": "10d", "decay": 0.5}}),
+            ("gauss", {"updated_scorefunction_filter": {"scale": "1d", "decay": 0.2}}),
+            ("script_score", {"script": {"source": "_score * 2"}}),
+        )
+        assert query.score_mode == "multiply"
+        assert query.boost_mode == "multiply"
+
+        patch_settings(
+            mocker,
+            {
+                "function_score__score_mode": "sum",
+                "function_score__boost_mode": "replace",
+            },
+        )
+        query = CustomQueryBuilder.build_query_for_model(ModelWithScoreFunctions)
+        assert query.score_mode == "sum"
+        assert query.boost_mode == "replace"
+
     def test_get_extended_models_with_unique_indexed_fields(self, mocker):
         base_model_class = mocker.Mock()
         extended_model_class = mocker.Mock()
@@ -99,6 +175,10 @@ class TestCustomQueryBuilder:
         model_class = mocker.Mock()
         query = "foo"  # PlainText("foo")
         built_query = PlainText("foo")
+        mocker.patch(
+            "wagtail_extended_search.query_builder.CustomQueryBuilder.get_excluded_parts",
+            return_value=(),
+        )
         mock_build_search_query = mocker.patch(
             "wagtail_extended_search.query_builder.CustomQueryBuilder.build_search_query",
             return_value=built_query,
@@ -108,11 +188,250 @@ class TestCustomQueryBuilder:
             "wagtail_extended_search.query_builder.CustomQueryBuilder.swap_variables",
             return_value=output_query,
         )
+        mock_check_settings = mocker.patch(
+            "wagtail_extended_search.query_builder.query_cache.check_settings"
+        )
         result = CustomQueryBuilder.get_search_query(model_class, query)
-        mock_build_search_query.assert_called_once_with(model_class)
+        mock_check_settings.assert_called_once_with()
+        mock_build_search_query.assert_called_once_with(
+            model_class, query_shape=QueryShape.SINGLE_WORD, excluded=()
+        )
         mock_swap_variables.assert_called_once_with(built_query, query)
         assert result == output_query
 
+        mock_build_search_query.reset_mock()
+        mock_swap_variables.reset_mock()
+        CustomQueryBuilder.get_search_query(model_class, ' "foo bar" ')
+        mock_build_search_query.assert_called_once_with(
+            model_class, query_shape=QueryShape.QUOTED, excluded=()
+        )
+        # the quotes are taken off the query that's searched for
+        mock_swap_variables.assert_called_once_with(built_query, "foo bar")
+
+        mock_swap_variables.reset_mock()
+        patch_settings(mocker, {"complexity__max_tokens": 3})
+        CustomQueryBuilder.get_search_query(model_class, "a b c d e")
+        mock_swap_variables.assert_called_once_with(built_query, "a b c")
+
+    def test_get_query_shape(self):
+        get_query_shape = CustomQueryBuilder.get_query_shape
+        assert get_query_shape("foo") == QueryShape.SINGLE_WORD
+        assert get_query_shape(" foo ") == QueryShape.SINGLE_WORD
+        assert get_query_shape("foo bar") == QueryShape.MULTIPLE_WORDS
+        assert get_query_shape('"foo bar"') == QueryShape.QUOTED
+        assert get_query_shape('"foo"') == QueryShape.QUOTED
+        assert get_query_shape('""') == QueryShape.SINGLE_WORD
+        assert get_query_shape('"foo" "bar"') == QueryShape.MULTIPLE_WORDS
+        assert get_query_shape("2024") == QueryShape.NUMERIC
+        assert get_query_shape("1,000.50") == QueryShape.NUMERIC
+        assert get_query_shape("v2") == QueryShape.SINGLE_WORD
+        assert get_query_shape("1 2") == QueryShape.MULTIPLE_WORDS
+        assert get_query_shape("a b c d e f g") == QueryShape.MULTIPLE_WORDS
+        assert get_query_shape("a b c d e f g h") == QueryShape.LONG
+
+    def test_get_query_shape_uses_settings(self, mocker):
+        patch_settings(mocker, {"query_shapes__long__min_word_count": 3})
+        get_query_shape = CustomQueryBuilder.get_query_shape
+        assert get_query_shape("foo bar") == QueryShape.MULTIPLE_WORDS
+        assert get_query_shape("foo bar baz") == QueryShape.LONG
+
+    @override_settings(SEARCH_ENABLE_QUERY_CACHE=False)
+    def test_build_search_query_for_shape(self, mocker):
+        model_class = mocker.Mock()
+        full_query = Filtered(
+            Or(
+                [
+                    OnlyFields(
+                        Boost(Variable("search_query", query_type), 1.0),
+                        fields=["title"],
+                        only_model=model_class,
+                    )
+                    for query_type in SearchQueryType
+                ]
+            ),
+            filters=[("content_type", "contains", "foo")],
+        )
+        mock_build_full_search_query = mocker.patch(
+            "wagtail_extended_search.query_builder.CustomQueryBuilder._build_full_search_query",
+            return_value=full_query,
+        )
+
+        def get_query_types(query):
+            # the OnlyFields queries for the title field are merged
+            return [
+                boost.subquery.query_type
+                for boost in query.subquery.subquery.subqueries
+            ]
+
+        result = CustomQueryBuilder.build_search_query(model_class)
+        assert result is full_query
+
+        result = CustomQueryBuilder.build_search_query(
+            model_class, query_shape=QueryShape.QUOTED
+        )
+        # a single query type is left on its own
+        assert isinstance(result.subquery, OnlyFields)
+        assert result.subquery.subquery.subquery.query_type == SearchQueryType.PHRASE
+        assert result.filters == full_query.filters
+
+        result = CustomQueryBuilder.build_search_query(
+            model_class, query_shape=QueryShape.NUMERIC
+        )
+        assert get_query_types(result) == [
+            SearchQueryType.PHRASE,
+            SearchQueryType.QUERY_OR,
+        ]
+
+        result = CustomQueryBuilder.build_search_query(
+            model_class, query_shape=QueryShape.MULTIPLE_WORDS
+        )
+        assert get_query_types(result) == list(SearchQueryType)
+        # the full query is left unchanged
+        assert len(full_query.subquery.subqueries) == len(SearchQueryType)
+
+        patch_settings(mocker, {"query_shapes__long__query_types": []})
+        assert (
+            CustomQueryBuilder.build_search_query(
+                model_class, query_shape=QueryShape.LONG
+            )
+            is None
+        )
+        assert mock_build_full_search_query.call_count == 5
+
+    @override_settings(SEARCH_ENABLE_QUERY_CACHE=False)
+    def test_build_search_query_excluding(self, mocker):
+        model_class = mocker.Mock()
+        full_query = Or(
+            [
+                OnlyFields(
+                    Boost(Variable("search_query", query_type, es_analyzer), 1.0),
+                    fields=[f"title_{es_analyzer}"],
+                    only_model=model_class,
+                )
+                for query_type in SearchQueryType
+                for es_analyzer in ("snowball", "simple")
+            ]
+        )
+        mocker.patch(
+            "wagtail_extended_search.query_builder.CustomQueryBuilder._build_full_search_query",
+            return_value=full_query,
+        )
+
+        result = CustomQueryBuilder.build_search_query(
+            model_class,
+            query_shape=QueryShape.MULTIPLE_WORDS,
+            excluded=("query_types__fuzzy", "analyzers__explicit"),
+        )
+        # what's left is all for the same field, so is merged
+        assert result.fields == ["title_snowball"]
+        variables = [boost.subquery for boost in result.subquery.subqueries]
+        assert variables == [
+            Variable("search_query", query_type, "snowball")
+            for query_type in (
+                SearchQueryType.PHRASE,
+                SearchQueryType.QUERY_AND,
+                SearchQueryType.QUERY_OR,
+            )
+        ]
+
+        with pytest.raises(ValueError, match="isn't a query type or analyzer"):
+            CustomQueryBuilder.build_search_query(
+                model_class,
+                query_shape=QueryShape.MULTIPLE_WORDS,
+                excluded=("boost_parts__fields",),
+            )
+        with pytest.raises(ValueError, match="Only the query for a query_shape"):
+            CustomQueryBuilder.build_search_query(
+                model_class, excluded=("query_types__fuzzy",)
+            )
+
+    def test_estimate_clause_count(self, mocker):
+        model_class = mocker.Mock()
+        query = Or(
+            [
+                OnlyFields(
+                    Boost(Variable("search_query", SearchQueryType.PHRASE), 1.0),
+                    fields=["title", "summary"],
+                    only_model=model_class,
+                ),
+                Nested(
+                    OnlyFields(
+                        Boost(Variable("search_query", SearchQueryType.QUERY_OR), 1.0),
+                        fields=["author.name"],
+                        only_model=model_class,
+                    ),
+                    path="author",
+                ),
+                Variable("search_query", SearchQueryType.FUZZY),
+            ]
+        )
+        assert CustomQueryBuilder.estimate_clause_count(query, 1) == 4
+        assert CustomQueryBuilder.estimate_clause_count(query, 3) == 8
+        assert CustomQueryBuilder.estimate_clause_count(PlainText("foo"), 3) == 1
+
+    def test_build_search_query_within_budget(self, mocker):
+        model_class = mocker.Mock()
+        built_queries = {
+            (): PlainText("foo"),
+            ("query_types__fuzzy",): PlainText("bar"),
+            ("query_types__fuzzy", "query_types__query_and"): PlainText("baz"),
+        }
+        mock_build_search_query = mocker.patch(
+            "wagtail_extended_search.query_builder.CustomQueryBuilder.build_search_query",
+            side_effect=lambda model_class, query_shape, excluded: built_queries.get(
+                excluded
+            ),
+        )
+        clause_counts = {"foo": 3000, "bar": 2000, "baz": 1000}
+        mocker.patch(
+            "wagtail_extended_search.query_builder.CustomQueryBuilder.estimate_clause_count",
+            side_effect=lambda query, word_count: clause_counts[query.query_string],
+        )
+        build_within_budget = CustomQueryBuilder.build_search_query_within_budget
+
+        result = build_within_budget(model_class, QueryShape.MULTIPLE_WORDS, 2)
+        assert result == (
+            built_queries[("query_types__fuzzy", "query_types__query_and")],
+            ("query_types__fuzzy", "query_types__query_and"),
+        )
+        mock_build_search_query.assert_called_with(
+            model_class,
+            query_shape=QueryShape.MULTIPLE_WORDS,
+            excluded=("query_types__fuzzy", "query_types__query_and"),
+        )
+
+        clause_counts["foo"] = 100
+        result = build_within_budget(model_class, QueryShape.MULTIPLE_WORDS, 2)
+        assert result == (built_queries[()], ())
+
+        # fuzzy is left out of queries for longer search query strings
+        clause_counts["bar"] = 100
+        result = build_within_budget(model_class, QueryShape.MULTIPLE_WORDS, 6)
+        assert result == (
+            built_queries[("query_types__fuzzy",)],
+            ("query_types__fuzzy",),
+        )
+
+        # everything that can be left out is, if it's still over budget
+        clause_counts.update({"foo": 3000, "bar": 2000, "baz": 2000})
+        patch_settings(
+            mocker,
+            {
+                "complexity__degradation_steps": [
+                    "query_types__fuzzy",
+                    "query_types__query_and",
+                ]
+            },
+        )
+        result = build_within_budget(model_class, QueryShape.MULTIPLE_WORDS, 2)
+        assert result[1] == ("query_types__fuzzy", "query_types__query_and")
+
+        # nothing more to leave out once the query is empty
+        patch_settings(mocker, {"complexity__max_clauses": 10})
+        del built_queries[("query_types__fuzzy", "query_types__query_and")]
+        result = build_within_budget(model_class, QueryShape.MULTIPLE_WORDS, 2)
+        assert result == (None, ("query_types__fuzzy", "query_types__query_and"))
+
     def test_swap_variables(self, mocker):
         query_str = "foo"
         query = Variable("search_query", SearchQueryType.PHRASE)
@@ -155,10 +474,392 @@ class TestCustomQueryBuilder:
         result = CustomQueryBuilder.swap_variables(query, query_str)
         assert repr(result) == repr(Not(Phrase("foo")))
 
+    def test_swap_variables_leaves_query_unchanged(self):
+        variable = Variable("search_query", SearchQueryType.QUERY_AND)
+        query = Filtered(
+            subquery=Or(
+                [
+                    OnlyFields(
+                        Boost(variable, 2.0), fields=["title"], only_model="model"
+                    ),
+                    Variable("search_query", SearchQueryType.PHRASE),
+                ]
+            ),
+            filters=[("content_type", "contains", "mock.model")],
+        )
+        query_repr = repr(query)
+
+        result = CustomQueryBuilder.swap_variables(query, "foo")
+        assert repr(result) == repr(
+            Filtered(
+                subquery=Phrase("foo"),
+                filters=[("content_type", "contains", "mock.model")],
+            )
+        )
+        result = CustomQueryBuilder.swap_variables(query, "foo bar")
+        assert repr(result) == repr(
+            Filtered(
+                subquery=Or(
+                    [
+                        OnlyFields(
+                            Boost(PlainText("foo bar", operator="and"), 2.0),
+                            fields=["title"],
+                            only_model="model",
+                        ),
+                        Phrase("foo bar"),
+                    ]
+                ),
+                filters=[("content_type", "contains", "mock.model")],
+            )
+        )
+        assert repr(query) == query_repr
+        assert query.subquery.subqueries[0].subquery.subquery is variable
+
+    def test_simplify_query(self):
+        def only_fields(query, field="title", model="model"):
+            return OnlyFields(query, fields=[field], only_model=model)
+
+        phrase = Boost(Variable("search_query", SearchQueryType.PHRASE), 10.0)
+        query_or = Boost(Variable("search_query", SearchQueryType.QUERY_OR), 2.0)
+        fuzzy = Boost(Variable("search_query", SearchQueryType.FUZZY), 4.0)
+        query = Filtered(
+            subquery=(
+                (only_fields(phrase) | only_fields(query_or))
+                | (only_fields(fuzzy, field="body") | only_fields(query_or))
+            )
+            | only_fields(phrase, model="other_model"),
+            filters=[("content_type", "contains", "mock.model")],
+        )
+        query_repr = repr(query)
+
+        result = CustomQueryBuilder.simplify_query(query)
+        assert repr(result) == repr(
+            Filtered(
+                subquery=Or(
+                    [
+                        only_fields(Or([phrase, query_or])),
+                        only_fields(fuzzy, field="body"),
+                        only_fields(phrase, model="other_model"),
+                    ]
+                ),
+                filters=[("content_type", "contains", "mock.model")],
+            )
+        )
+        assert repr(query) == query_repr
+
+        # And queries are flattened, and OnlyFields merged, the same way
+        result = CustomQueryBuilder.simplify_query(
+            And([And([only_fields(phrase), fuzzy]), only_fields(query_or)])
+        )
+        assert repr(result) == repr(
+            And([only_fields(And([phrase, query_or])), fuzzy])
+        )
+
+        # but not OnlyFields with more than one field, or across query types
+        multiple_fields = OnlyFields(
+            phrase, fields=["title", "body"], only_model="model"
+        )
+        query = Or([multiple_fields, And([multiple_fields, only_fields(fuzzy)])])
+        assert repr(CustomQueryBuilder.simplify_query(query)) == repr(query)
+
+        assert CustomQueryBuilder.simplify_query(Or([phrase, phrase])) is phrase
+        assert CustomQueryBuilder.simplify_query(fuzzy) is fuzzy
+
+    def test_simplify_query_merges_nested_queries(self):
+        def only_fields(query, field):
+            return OnlyFields(query, fields=[field], only_model="model")
+
+        phrase = Boost(Variable("search_query", SearchQueryType.PHRASE), 10.0)
+        query_or = Boost(Variable("search_query", SearchQueryType.QUERY_OR), 2.0)
+        query = Or(
+            [
+                Nested(only_fields(phrase, "author.name"), path="author"),
+                only_fields(phrase, "title"),
+                Nested(only_fields(query_or, "author.name"), path="author"),
+                Nested(only_fields(phrase, "author.bio"), path="author"),
+                Nested(only_fields(phrase, "topic.name"), path="topic"),
+                Nested(
+                    only_fields(phrase, "author.role"), path="author", score_mode="max"
+                ),
+            ]
+        )
+        result = CustomQueryBuilder.simplify_query(query)
+        assert repr(result) == repr(
+            Or(
+                [
+                    Nested(
+                        Or(
+                            [
+                                only_fields(Or([phrase, query_or]), "author.name"),
+                                only_fields(phrase, "author.bio"),
+                            ]
+                        ),
+                        path="author",
+                    ),
+                    only_fields(phrase, "title"),
+                    Nested(only_fields(phrase, "topic.name"), path="topic"),
+                    Nested(
+                        only_fields(phrase, "author.role"),
+                        path="author",
+                        score_mode="max",
+                    ),
+                ]
+            )
+        )
+
+        # different nested documents can match each side of an And
+        query = And(query.subqueries[:3])
+        assert repr(CustomQueryBuilder.simplify_query(query)) == repr(query)
+
+    def test_variable_is_immutable(self):
+        variable = Variable("search_query", SearchQueryType.PHRASE)
+        with pytest.raises(AttributeError):
+            variable.query_type = SearchQueryType.FUZZY
+        with pytest.raises(AttributeError):
+            del variable.name
+        assert pickle.loads(pickle.dumps(variable)).query_type == (
+            SearchQueryType.PHRASE
+        )
+
     def test_variable_output_use_and_if_single_word(self):
         variable = Variable("search_query", SearchQueryType.QUERY_AND)
         assert variable.output("searchquery") is None
         assert variable.output("search query") is not None
+        assert variable.output("searchquery", word_count=2) is not None
+        assert variable.output("search query", word_count=1) is None
+
+    def test_variable_output_uses_analyzer_tokens(self):
+        variable = Variable("search_query", SearchQueryType.QUERY_AND, "snowball")
+        assert variable.output("the cat") is None
+        assert variable.output("cat Cat") is None
+        # the query string isn't changed, just checked
+        result = variable.output("the Cat sat on the mat")
+        assert repr(result) == repr(PlainText("the Cat sat on the mat", operator="and"))
+        assert variable.output("The cat") is None
+        # the snowball analyzer doesn't fold accents
+        assert variable.output("Café cafe") is not None
+        # templates don't know the search query string, so aren't tokenized
+        assert variable.output(QUERY_SLOT, word_count=2) is not None
+
+        variable = Variable("search_query", SearchQueryType.PHRASE, "snowball")
+        assert variable.output("the") is None
+        assert variable.output("the cat").query_string == "the cat"
+
+        variable = Variable("search_query", SearchQueryType.PHRASE, "simple")
+        assert variable.output("the").query_string == "the"
+        assert variable.output("2024") is None
+
+        variable = Variable("search_query", SearchQueryType.QUERY_OR, "snowball")
+        assert variable.output("to be or not to be") is None
+        assert variable.output("cat cat Dog").query_string == "cat cat Dog"
+
+        variable = Variable("search_query", SearchQueryType.FUZZY, "snowball")
+        assert variable.output("a") is None
+        assert variable.output("Cat cat").query_string == "Cat cat"
+
+        variable = Variable(
+            "search_query",
+            SearchQueryType.FUZZY,
+            "snowball",
+            {"min_token_length": 4, "prefix_length": 1, "max_expansions": 10},
+        )
+        # numbers and short tokens aren't searched for fuzzily
+        assert variable.output("cat 2024") is None
+        result = variable.output("the cats 2024 sat")
+        assert repr(result) == repr(
+            BoundedFuzzy("cats", prefix_length=1, max_expansions=10)
+        )
+        assert variable.output(QUERY_SLOT, word_count=1).query_string == QUERY_SLOT
+
+        variable = Variable("search_query", SearchQueryType.PHRASE, "unknown")
+        assert variable.output("the").query_string == "the"
+
+        assert variable != Variable("search_query", SearchQueryType.PHRASE)
+        assert pickle.loads(pickle.dumps(variable)) == variable
+
+    def test_get_fuzzy_options(self, mocker):
+        field = MultiQueryIndexedField("foo", fuzzy=True)
+        assert CustomQueryBuilder._get_fuzzy_options(field) == {
+            "fuzziness": "AUTO",
+            "prefix_length": 1,
+            "max_expansions": 25,
+            "min_token_length": 3,
+        }
+
+        patch_settings(mocker, {"fuzzy__max_expansions": 5})
+        field = MultiQueryIndexedField(
+            "foo", fuzzy=True, fuzzy_options={"fuzziness": "AUTO:4,8"}
+        )
+        assert CustomQueryBuilder._get_fuzzy_options(field) == {
+            "fuzziness": "AUTO:4,8",
+            "prefix_length": 1,
+            "max_expansions": 5,
+            "min_token_length": 3,
+        }
+
+        query = CustomQueryBuilder._build_searchquery_for_query_field_querytype_analysistype(
+            mocker.Mock(),
+            "foo",
+            SearchQueryType.FUZZY,
+            AnalysisType.TOKENIZED,
+            field,
+        )
+        assert dict(query.subquery.subquery.fuzzy_options) == {
+            "fuzziness": "AUTO:4,8",
+            "prefix_length": 1,
+            "max_expansions": 5,
+            "min_token_length": 3,
+        }
+
+    @override_settings(SEARCH_ENABLE_QUERY_TEMPLATES=True)
+    def test_get_search_query_uses_templates(self, mocker):
+        model_class = mocker.Mock()
+        query_template = QueryTemplate(model_class, ["{", "}"])
+        mock_build_template = mocker.patch(
+            "wagtail_extended_search.query_builder.CustomQueryBuilder.build_query_template",
+            return_value=query_template,
+        )
+        mock_get_excluded_parts = mocker.patch(
+            "wagtail_extended_search.query_builder.CustomQueryBuilder.get_excluded_parts",
+            return_value=(),
+        )
+        mock_build_search_query = mocker.patch(
+            "wagtail_extended_search.query_builder.CustomQueryBuilder.build_search_query",
+        )
+        mock_swap_variables = mocker.patch(
+            "wagtail_extended_search.query_builder.CustomQueryBuilder.swap_variables",
+        )
+        result = CustomQueryBuilder.get_search_query(model_class, "foo")
+        mock_get_excluded_parts.assert_called_once_with(
+            model_class, QueryShape.SINGLE_WORD, 1
+        )
+        # the template's built from the cached query, not the query itself
+        mock_build_search_query.assert_not_called()
+        mock_build_template.assert_called_once_with(
+            model_class, QueryShape.SINGLE_WORD, excluded=()
+        )
+        mock_swap_variables.assert_not_called()
+        assert isinstance(result, QueryTemplate)
+        assert result.query_string == "foo"
+
+        mock_build_template.reset_mock()
+        mock_get_excluded_parts.return_value = ("query_types__fuzzy",)
+        CustomQueryBuilder.get_search_query(model_class, "foo bar")
+        mock_build_template.assert_called_once_with(
+            model_class, QueryShape.MULTIPLE_WORDS, excluded=("query_types__fuzzy",)
+        )
+
+        mock_build_template.reset_mock()
+        result = CustomQueryBuilder.get_search_query(model_class, '"foo bar"')
+        mock_build_template.assert_called_once_with(
+            model_class, QueryShape.QUOTED, excluded=("query_types__fuzzy",)
+        )
+        assert result.query_string == "foo bar"
+
+        mock_build_template.return_value = None
+        assert CustomQueryBuilder.get_search_query(model_class, "foo") is None
+
+    def test_get_excluded_parts(self, mocker):
+        model_class = mocker.Mock()
+        mock_build_within_budget = mocker.patch(
+            "wagtail_extended_search.query_builder.CustomQueryBuilder.build_search_query_within_budget",
+            return_value=(None, ("query_types__fuzzy",)),
+        )
+        get_excluded_parts = CustomQueryBuilder.get_excluded_parts
+        assert get_excluded_parts(model_class, QueryShape.MULTIPLE_WORDS, 3) == (
+            "query_types__fuzzy",
+        )
+        mock_build_within_budget.assert_called_once_with(
+            model_class, QueryShape.MULTIPLE_WORDS, 3
+        )
+
+        # worked out once for each model, shape and number of words
+        mock_build_within_budget.reset_mock()
+        get_excluded_parts(model_class, QueryShape.MULTIPLE_WORDS, 3)
+        mock_build_within_budget.assert_not_called()
+        get_excluded_parts(model_class, QueryShape.MULTIPLE_WORDS, 4)
+        get_excluded_parts(model_class, QueryShape.QUOTED, 3)
+        assert mock_build_within_budget.call_count == 2
+
+        # and again when the settings change
+        mock_build_within_budget.reset_mock()
+        patch_settings(mocker, {"complexity__max_clauses": 10})
+        get_excluded_parts(model_class, QueryShape.MULTIPLE_WORDS, 3)
+        mock_build_within_budget.assert_called_once_with(
+            model_class, QueryShape.MULTIPLE_WORDS, 3
+        )
+
+    def test_build_query_templates(self, mocker):
+        model_class = mocker.Mock()
+        patch_settings(mocker, {"complexity__max_tokens": 3})
+        mocker.patch(
+            "wagtail_extended_search.query_builder.CustomQueryBuilder.get_excluded_parts",
+            side_effect=lambda model_class, query_shape, word_count: (
+                ("query_types__fuzzy",) if word_count > 2 else ()
+            ),
+        )
+        mock_build_template = mocker.patch(
+            "wagtail_extended_search.query_builder.CustomQueryBuilder.build_query_template"
+        )
+        CustomQueryBuilder.build_query_templates(model_class, True)
+        # the templates get_search_query looks up for each number of words
+        mock_build_template.assert_has_calls(
+            [
+                call(model_class, QueryShape.SINGLE_WORD, True, ()),
+                call(model_class, QueryShape.MULTIPLE_WORDS, True, ()),
+                call(
+                    model_class,
+                    QueryShape.MULTIPLE_WORDS,
+                    True,
+                    ("query_types__fuzzy",),
+                ),
+            ]
+        )
+        assert mock_build_template.call_count == 2 * len(QueryShape) - 2
+
+    @override_settings(SEARCH_ENABLE_QUERY_CACHE=False)
+    def test_build_query_template(self, mocker):
+        model_class = mocker.Mock()
+        mocker.patch(
+            "wagtail_extended_search.query_builder.CustomQueryBuilder.build_search_query",
+            side_effect=lambda *args: Or(
+                [
+                    Variable("search_query", SearchQueryType.PHRASE),
+                    Variable("search_query", SearchQueryType.QUERY_AND),
+                ]
+            ),
+        )
+        mock_backend = mocker.patch(
+            "wagtail_extended_search.query_builder.get_search_backend"
+        )
+        mock_compiler_class = mock_backend.return_value.query_compiler_class
+        mock_compiler_class.return_value.get_inner_query.return_value = {
+            "match_phrase": {"foo": QUERY_SLOT}
+        }
+        mock_compiler_class.return_value.get_inner_count_query.return_value = {
+            "match_phrase": {"bar": QUERY_SLOT}
+        }
+
+        result = CustomQueryBuilder.build_query_template(
+            model_class, QueryShape.SINGLE_WORD
+        )
+        compiled_query = mock_compiler_class.call_args.args[1]
+        # single words don't get an AND query
+        assert repr(compiled_query) == repr(Phrase(QUERY_SLOT))
+        assert result.bind("foo").render() == {"match_phrase": {"foo": "foo"}}
+        assert result.bind("foo").render(for_count=True) == {
+            "match_phrase": {"bar": "foo"}
+        }
+
+        CustomQueryBuilder.build_query_template(model_class, QueryShape.NUMERIC)
+        compiled_query = mock_compiler_class.call_args.args[1]
+        assert repr(compiled_query) == repr(Phrase(QUERY_SLOT))
+
+        CustomQueryBuilder.build_query_template(model_class, QueryShape.MULTIPLE_WORDS)
+        compiled_query = mock_compiler_class.call_args.args[1]
+        assert repr(compiled_query) == repr(
+            Or([Phrase(QUERY_SLOT), PlainText(QUERY_SLOT, operator="and")])
+        )
 
     def test_get_inner_searchquery_for_querytype_handles_searchquerytypes(self):
         result = Variable("search_query", SearchQueryType.PHRASE).output("search query")
@@ -215,7 +916,14 @@ class TestCustomQueryBuilder:
             "wagtail_extended_search.query_builder.CustomQueryBuilder.build_query_for_model",
             return_value=PlainText("foo"),
         )
+        mock_shares_parent_query = mocker.patch(
+            "wagtail_extended_search.query_builder.CustomQueryBuilder.shares_parent_query",
+            return_value=False,
+        )
         result = CustomQueryBuilder.build_search_query(model_class)
+        mock_shares_parent_query.assert_called_once_with(
+            model_class, extended_model_class
+        )
         mock_get_extended_models.assert_called_once_with(model_class)
         mock_get_query.assert_has_calls(
             [
@@ -242,6 +950,214 @@ class TestCustomQueryBuilder:
             )
         )
 
+        # an extended model that shares the root query only adds its own fields
+        model_class.get_indexed_fields = lambda: ["--root-field--"]
+        mock_shares_parent_query.return_value = True
+        mock_get_query.reset_mock()
+        result = CustomQueryBuilder.build_search_query(model_class)
+        mock_get_query.assert_has_calls(
+            [
+                call(extended_model_class, exclude_fields={"--root-field--"}),
+                call(model_class),
+            ]
+        )
+        assert repr(result) == repr(
+            Or(
+                [
+                    Filtered(
+                        subquery=PlainText("foo"),
+                        filters=[("content_type", "excludes", [])],
+                    ),
+                    Filtered(
+                        subquery=PlainText("foo"),
+                        filters=[
+                            ("content_type", "contains", "mock.extended_model"),
+                        ],
+                    ),
+                ]
+            )
+        )
+
+        # and is left to the root query if it doesn't add any
+        mock_get_query.side_effect = lambda model, **kwargs: (
+            None if kwargs else PlainText("foo")
+        )
+        result = CustomQueryBuilder.build_search_query(model_class)
+        assert repr(result) == repr(
+            Filtered(
+                subquery=PlainText("foo"),
+                filters=[("content_type", "excludes", [])],
+            )
+        )
+
+    @override_settings(SEARCH_ENABLE_QUERY_CACHE=False)
+    def test_build_search_query_with_additive_boost_mode(self, mocker):
+        class ModelClass:
+            class Meta:
+                app_label = "mock"
+                model_name = "base_model"
+
+            _meta = Meta()
+            indexed_fields = [BaseField("title")]
+            score_functions = ["--score-function--"]
+
+            @classmethod
+            def get_indexed_fields(cls):
+                return cls.indexed_fields
+
+            @classmethod
+            def get_score_functions(cls):
+                return cls.score_functions
+
+        class ExtendedModelClass(ModelClass): ...
+
+        mocker.patch(
+            "wagtail_extended_search.query_builder.CustomQueryBuilder.get_extended_models_with_unique_indexed_fields",
+            return_value=[ExtendedModelClass],
+        )
+        mock_get_query = mocker.patch(
+            "wagtail_extended_search.query_builder.CustomQueryBuilder.build_query_for_model",
+            return_value=PlainText("foo"),
+        )
+
+        patch_settings(mocker, {"function_score__boost_mode": "multiply"})
+        CustomQueryBuilder.build_search_query(ModelClass)
+        mock_get_query.assert_has_calls(
+            [
+                call(
+                    ExtendedModelClass, exclude_fields=set(ModelClass.indexed_fields)
+                ),
+                call(ModelClass),
+            ]
+        )
+
+        mock_get_query.reset_mock()
+        patch_settings(mocker, {"function_score__boost_mode": "sum"})
+        result = CustomQueryBuilder.build_search_query(ModelClass)
+        mock_get_query.assert_has_calls([call(ExtendedModelClass), call(ModelClass)])
+        # the root query leaves the extended model's docs to its own query
+        assert result.subqueries[0].filters == [
+            ("content_type", "excludes", ["mock.ExtendedModelClass"])
+        ]
+
+    def test_build_search_query_with_extended_model_field_boost(self, mocker):
+        class ModelClass:
+            class Meta:
+                app_label = "mock"
+                model_name = "base_model"
+
+            _meta = Meta()
+            indexed_fields = [BaseField("title")]
+
+            @classmethod
+            def get_indexed_fields(cls):
+                return cls.indexed_fields
+
+            @classmethod
+            def get_score_functions(cls):
+                return []
+
+        class ExtendedModelClass(ModelClass):
+            class Meta:
+                app_label = "mock"
+                model_name = "extended_model"
+
+            _meta = Meta()
+
+        mocker.patch(
+            "wagtail_extended_search.query_builder.CustomQueryBuilder.get_extended_models_with_unique_indexed_fields",
+            return_value=[ExtendedModelClass],
+        )
+        mock_get_query = mocker.patch(
+            "wagtail_extended_search.query_builder.CustomQueryBuilder.build_query_for_model",
+            return_value=PlainText("foo"),
+        )
+
+        # the extended model's search fields are boosted by its own setting
+        patch_settings(
+            mocker, {"boost_parts__fields__mock.extended_model.title": 2.0}
+        )
+        result = CustomQueryBuilder.build_search_query(ModelClass)
+        mock_get_query.assert_has_calls([call(ExtendedModelClass), call(ModelClass)])
+        assert result.subqueries[0].filters == [
+            ("content_type", "excludes", ["mock.ExtendedModelClass"])
+        ]
+
+    def test_shares_parent_query(self, mocker):
+        field = BaseField("title")
+        score_function = mocker.Mock()
+        model_class = mocker.Mock()
+        model_class.get_score_functions.return_value = [score_function]
+        model_class.get_indexed_fields.return_value = [
+            field,
+            score_function,
+            mocker.Mock(),
+        ]
+        sub_model_class = mocker.Mock()
+        sub_model_class.get_score_functions.return_value = [score_function]
+        mocker.patch(
+            "wagtail_extended_search.query_builder.search_settings.get_settings_field_key",
+            side_effect=lambda model, f: f"{model.label}.{f.field_name}",
+        )
+        model_class.label = "app.model"
+        sub_model_class.label = "app.submodel"
+
+        patch_settings(mocker, {})
+        assert CustomQueryBuilder.shares_parent_query(model_class, sub_model_class)
+
+        patch_settings(
+            mocker,
+            {
+                "boost_parts__fields__app.model.title": 2.0,
+                "boost_parts__fields__app.submodel.title": 2.0,
+            },
+        )
+        assert CustomQueryBuilder.shares_parent_query(model_class, sub_model_class)
+
+        # a setting for just one of the models changes its docs' scores
+        patch_settings(mocker, {"boost_parts__fields__app.submodel.title": 2.0})
+        assert not CustomQueryBuilder.shares_parent_query(
+            model_class, sub_model_class
+        )
+        patch_settings(mocker, {"boost_parts__fields__app.model.title": 2.0})
+        assert not CustomQueryBuilder.shares_parent_query(
+            model_class, sub_model_class
+        )
+
+        # adding the score functions' scores would count them twice
+        for boost_mode in ["sum", "avg", "max", "min", "replace"]:
+            patch_settings(mocker, {"function_score__boost_mode": boost_mode})
+            assert not CustomQueryBuilder.shares_parent_query(
+                model_class, sub_model_class
+            )
+        patch_settings(mocker, {"function_score__boost_mode": None})
+        assert CustomQueryBuilder.shares_parent_query(model_class, sub_model_class)
+        # which doesn't matter without any score functions
+        model_class.get_score_functions.return_value = []
+        sub_model_class.get_score_functions.return_value = []
+        patch_settings(mocker, {"function_score__boost_mode": "sum"})
+        assert CustomQueryBuilder.shares_parent_query(model_class, sub_model_class)
+        model_class.get_score_functions.return_value = [score_function]
+        sub_model_class.get_score_functions.return_value = [score_function]
+        patch_settings(mocker, {})
+
+        # models without a setting use the field's boost
+        field.boost = 2.0
+        assert CustomQueryBuilder.shares_parent_query(model_class, sub_model_class)
+        patch_settings(mocker, {"boost_parts__fields__app.model.title": 3.0})
+        assert not CustomQueryBuilder.shares_parent_query(
+            model_class, sub_model_class
+        )
+
+        patch_settings(mocker, {})
+        sub_model_class.get_score_functions.return_value = [
+            score_function,
+            mocker.Mock(),
+        ]
+        assert not CustomQueryBuilder.shares_parent_query(
+            model_class, sub_model_class
+        )
+
 
 class TestQueryBuilder:
     query_builder_class = QueryBuilder
@@ -261,31 +1177,11 @@ class TestQueryBuilder:
         mock_boost_qt.assert_called_once_with(SearchQueryType.FUZZY)
         mock_boost_at.assert_called_once_with(AnalysisType.EXPLICIT)
 
-    def test_get_boost_for_field(self, mocker):
-        mock_get_key = mocker.patch(
-            "wagtail_extended_search.query_builder.search_settings.get_settings_field_key",
-            return_value="--settings-key--",
-        )
-        field = mocker.Mock()
-        model = mocker.Mock()
-        assert self.query_builder_class._get_boost_for_field(model, field) == 1.0
-        field.get_definition_model.assert_called_once_with(model)
-        mock_get_key.assert_called_once_with(
-            field.get_definition_model.return_value, field
-        )
-
-        settings.wagtail_extended_search_settings["boost_parts"]["fields"][
-            "--settings-key--"
-        ] = 333.33
-        assert self.query_builder_class._get_boost_for_field(model, field) == 333.33
-
-    def test_get_boost_for_analysistype(self):
+    def test_get_boost_for_analysistype(self, mocker):
         with pytest.raises(ValueError):
             self.query_builder_class._get_boost_for_analysistype("foo")
 
-        settings.wagtail_extended_search_settings["boost_parts"]["analyzers"][
-            "explicit"
-        ] = 888.88
+        patch_settings(mocker, {"boost_parts__analyzers__explicit": 888.88})
         assert (
             self.query_builder_class._get_boost_for_analysistype(AnalysisType.EXPLICIT)
             == 888.88
@@ -302,21 +1198,17 @@ class TestQueryBuilder:
                 "explicit"
             ]
         )
-        settings.wagtail_extended_search_settings["boost_parts"]["analyzers"][
-            "explicit"
-        ] = None
+        patch_settings(mocker, {"boost_parts__analyzers__explicit": None})
         assert (
             self.query_builder_class._get_boost_for_analysistype(AnalysisType.EXPLICIT)
             == 1.0
         )
 
-    def test_get_boost_for_querytype(self):
+    def test_get_boost_for_querytype(self, mocker):
         with pytest.raises(ValueError):
             self.query_builder_class._get_boost_for_querytype("foo")
 
-        settings.wagtail_extended_search_settings["boost_parts"]["query_types"][
-            "phrase"
-        ] = 888.88
+        patch_settings(mocker, {"boost_parts__query_types__phrase": 888.88})
         assert (
             self.query_builder_class._get_boost_for_querytype(SearchQueryType.PHRASE)
             == 888.88
@@ -339,9 +1231,7 @@ class TestQueryBuilder:
                 "fuzzy"
             ]
         )
-        settings.wagtail_extended_search_settings["boost_parts"]["query_types"][
-            "phrase"
-        ] = None
+        patch_settings(mocker, {"boost_parts__query_types__phrase": None})
         assert (
             self.query_builder_class._get_boost_for_querytype(SearchQueryType.PHRASE)
             == 1.0
@@ -611,6 +1501,8 @@ class TestQueryBuilder:
         assert isinstance(subquery, Boost)
         assert subquery.boost == 333.33
         subquery = subquery.subquery
+        assert subquery == Variable("search_query", SearchQueryType.PHRASE, "simple")
+        assert subquery.fuzzy_options == ()
         mock_boost.assert_called_with(SearchQueryType.PHRASE, AnalysisType.EXPLICIT)
         field = mocker.Mock(spec=SearchField)
         field.get_full_model_field_name.return_value = "-model-field-name-"
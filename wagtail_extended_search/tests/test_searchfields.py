@@ -88,15 +88,25 @@ class TestBaseField:
         parent_method.assert_called_once()
         parent_method.assert_called_with(mock_model)
         assert result == parent_method.return_value
+        # the result is remembered
+        assert field.get_definition_model(mock_model) == parent_method.return_value
+        parent_method.assert_called_once()
 
         parent_method.return_value = None
         mocker.patch("inspect.getmro", return_value=[CustomObject])
+        field = BaseField("foo")
         assert field.get_definition_model(mock_model) is None
 
         field = BaseField("foo", model_field_name="bar")
         result = field.get_definition_model(mock_model)
         assert result == CustomObject
 
+        # it's found again once the field becomes a relation of another
+        field = BaseField("foo")
+        assert field.get_definition_model(mock_model) is None
+        field.is_relation_of(BaseField("bar"))
+        assert field.get_definition_model(mock_model) == CustomObject
+
     def test_get_value_uses_parent_and_model_field_name(self, mocker):
         parent_method = mocker.patch(
             "wagtail.search.index.BaseField.get_value",
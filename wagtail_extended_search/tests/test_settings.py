@@ -3,6 +3,7 @@ from collections import ChainMap
 from types import NoneType
 
 import pytest
+from django.core.cache import cache
 from wagtail.search import index
 
 from wagtail_extended_search.index import BaseField, SearchField
@@ -10,10 +11,16 @@ from wagtail_extended_search.models import Setting
 from wagtail_extended_search.settings import (
     DEFAULT_SETTINGS,
     NESTING_SEPARATOR,
+    SETTINGS_GENERATION_CACHE_KEY,
     SETTINGS_KEY,
     NestedChainMap,
     SearchSettings,
+    SettingsGeneration,
+    SettingsSnapshot,
+    get_setting,
+    get_settings_dependencies_version,
     get_settings_field_key,
+    record_settings_dependencies,
     settings_singleton,
     wagtail_extended_search_settings,
 )
@@ -51,6 +58,10 @@ class TestDefaults:
         assert "query_and" in DEFAULT_SETTINGS["analyzers"]["explicit"]["query_types"]
         assert "query_or" in DEFAULT_SETTINGS["analyzers"]["explicit"]["query_types"]
         assert "phrase" in DEFAULT_SETTINGS["analyzers"]["keyword"]["query_types"]
+        assert "max_tokens" in DEFAULT_SETTINGS["complexity"]
+        assert "max_fuzzy_tokens" in DEFAULT_SETTINGS["complexity"]
+        assert "max_clauses" in DEFAULT_SETTINGS["complexity"]
+        assert "degradation_steps" in DEFAULT_SETTINGS["complexity"]
         assert isinstance(
             DEFAULT_SETTINGS["boost_parts"]["query_types"]["phrase"], float
         )
@@ -415,7 +426,7 @@ class TestSearchSettings:
         instance = SearchSettings()
         assert not isinstance(instance, dict)
         assert isinstance(instance.to_dict(), dict)
-        assert isinstance(wagtail_extended_search_settings, dict)
+        assert isinstance(wagtail_extended_search_settings, SettingsSnapshot)
 
         def test_values(input):
             output = []
@@ -447,8 +458,8 @@ class TestSearchSettings:
         assert original_settings == wagtail_extended_search_settings  # 2
 
         # update the export
-        assert original_settings != settings.settings_singleton.to_dict()
-        settings.wagtail_extended_search_settings = settings_singleton.to_dict()
+        assert original_settings != settings.settings_singleton.to_snapshot()
+        settings.export_settings()
 
         # exported module dict changed
         assert (
@@ -466,7 +477,210 @@ class TestSearchSettings:
             wagtail_extended_search_settings
             == settings.wagtail_extended_search_settings
         )
-        assert settings_singleton.to_dict() == settings.wagtail_extended_search_settings
+        assert (
+            settings_singleton.to_snapshot()
+            == settings.wagtail_extended_search_settings
+        )
+
+
+class TestSettingsGeneration:
+    def test_bump(self):
+        cache.delete(SETTINGS_GENERATION_CACHE_KEY)
+        instance = SettingsGeneration()
+        instance.bump()
+        assert cache.get(SETTINGS_GENERATION_CACHE_KEY) == 1
+        assert instance.generation == 1
+        instance.bump()
+        assert cache.get(SETTINGS_GENERATION_CACHE_KEY) == 2
+        assert instance.generation == 2
+
+    def test_check(self, mocker, settings):
+        settings.SEARCH_SETTINGS_CHECK_INTERVAL = 0
+        mock_init_db = mocker.patch(
+            "wagtail_extended_search.settings.settings_singleton.initialise_db_dict"
+        )
+        mock_export = mocker.patch("wagtail_extended_search.settings.export_settings")
+        cache.set(SETTINGS_GENERATION_CACHE_KEY, 3)
+        instance = SettingsGeneration()
+        instance.sync()
+        assert instance.generation == 3
+        assert not instance.check()
+
+        # another process changed the settings
+        cache.set(SETTINGS_GENERATION_CACHE_KEY, 4)
+        assert instance.check()
+        assert instance.generation == 4
+        mock_init_db.assert_called_once_with()
+        mock_export.assert_called_once_with()
+        assert not instance.check()
+
+        # the counter was evicted
+        cache.delete(SETTINGS_GENERATION_CACHE_KEY)
+        assert instance.check()
+        assert instance.generation == 0
+
+    def test_check_is_throttled(self, mocker, settings):
+        settings.SEARCH_SETTINGS_CHECK_INTERVAL = 60
+        mocker.patch(
+            "wagtail_extended_search.settings.settings_singleton.initialise_db_dict"
+        )
+        mocker.patch("wagtail_extended_search.settings.export_settings")
+        cache.set(SETTINGS_GENERATION_CACHE_KEY, 3)
+        instance = SettingsGeneration()
+        instance.sync()
+        cache.set(SETTINGS_GENERATION_CACHE_KEY, 4)
+        assert not instance.check()
+        assert instance.generation == 3
+
+    def test_check_before_sync(self, mocker):
+        mock_init_db = mocker.patch(
+            "wagtail_extended_search.settings.settings_singleton.initialise_db_dict"
+        )
+        cache.set(SETTINGS_GENERATION_CACHE_KEY, 3)
+        instance = SettingsGeneration()
+        assert not instance.check()
+        assert instance.generation == 3
+        mock_init_db.assert_not_called()
+
+
+class TestSettingsSnapshot:
+    def test_lookups(self):
+        snapshot = SettingsSnapshot(
+            {
+                "boost_parts": {"fields": {"app.model.field": 2.0}},
+                "analyzers": {"tokenized": {"query_types": ["phrase"]}},
+            }
+        )
+        assert snapshot["boost_parts"]["fields"]["app.model.field"] == 2.0
+        assert snapshot["boost_parts__fields__app.model.field"] == 2.0
+        assert snapshot["boost_parts__fields"] == {"app.model.field": 2.0}
+        assert "boost_parts__fields__app.model.field" in snapshot
+        assert "boost_parts__fields__app.model.other_field" not in snapshot
+        with pytest.raises(KeyError):
+            snapshot["boost_parts__fields__app.model.other_field"]
+        assert list(snapshot) == ["boost_parts", "analyzers"]
+        assert snapshot.all_keys() == [
+            "boost_parts__fields__app.model.field",
+            "analyzers__tokenized__query_types",
+        ]
+
+    def test_is_immutable(self):
+        snapshot = SettingsSnapshot(
+            {"analyzers": {"tokenized": {"query_types": ["phrase"]}}}
+        )
+        with pytest.raises(TypeError):
+            snapshot["analyzers"] = {}
+        with pytest.raises(TypeError):
+            snapshot["analyzers"]["tokenized"]["query_types"] = []
+        with pytest.raises(AttributeError):
+            snapshot["analyzers__tokenized__query_types"].append("query_or")
+        assert copy.deepcopy(snapshot) is snapshot
+
+    def test_values_are_typed(self):
+        snapshot = SettingsSnapshot(
+            {
+                "boost_parts": {
+                    "query_types": {"phrase": "2.5", "fuzzy": None},
+                    "fields": {"app.model.field": "3", "app.model.bad": "x"},
+                },
+                "analyzers": {
+                    "tokenized": {"query_types": "phrase, query_and"},
+                    "explicit": {"query_types": ["phrase"]},
+                },
+            },
+            types=DEFAULT_SETTINGS,
+        )
+        assert snapshot["boost_parts__query_types__phrase"] == 2.5
+        assert snapshot["boost_parts__query_types__fuzzy"] is None
+        # no defaults for field boosts unless passed in
+        assert snapshot["boost_parts__fields__app.model.field"] == "3"
+        assert snapshot["analyzers__tokenized__query_types"] == ("phrase", "query_and")
+        assert snapshot["analyzers__explicit__query_types"] == ("phrase",)
+
+        snapshot = SettingsSnapshot(
+            {"boost_parts": {"fields": {"app.model.field": "3", "app.model.bad": "x"}}},
+            types={
+                "boost_parts": {"fields": {"app.model.field": 1, "app.model.bad": 1}}
+            },
+        )
+        assert snapshot["boost_parts__fields__app.model.field"] == 3.0
+        assert snapshot["boost_parts__fields__app.model.bad"] == "x"
+
+        snapshot = SettingsSnapshot(
+            {"complexity": {"max_tokens": "12", "max_clauses": 500.0}},
+            types=DEFAULT_SETTINGS,
+        )
+        assert snapshot["complexity__max_tokens"] == 12
+        assert isinstance(snapshot["complexity__max_tokens"], int)
+        assert isinstance(snapshot["complexity__max_clauses"], int)
+
+    def test_version(self):
+        settings_dict = {"boost_parts": {"fields": {"app.model.field": 2.0}}}
+        version = SettingsSnapshot(settings_dict).version
+        assert SettingsSnapshot(settings_dict).version == version
+        settings_dict["boost_parts"]["fields"]["app.model.field"] = 3.0
+        assert SettingsSnapshot(settings_dict).version != version
+
+    def test_to_snapshot(self):
+        instance = SearchSettings()
+        instance.fields["boost_parts"]["fields"]["app.model.field"] = 2
+        instance.db_vars.update({"boost_parts": {"fields": {"app.model.field": "4"}}})
+        snapshot = instance.to_snapshot()
+        assert isinstance(snapshot, SettingsSnapshot)
+        assert snapshot["boost_parts__fields__app.model.field"] == 4.0
+        assert snapshot["boost_parts__query_types__phrase"] == 10.0
+
+
+class TestSettingsDependencies:
+    @pytest.fixture(autouse=True)
+    def settings_dict(self, mocker):
+        settings_dict = {
+            "boost_parts": {"fields": {"app.model.field": 2.0}},
+            "analyzers": {"tokenized": {"query_types": ["phrase"]}},
+        }
+        self.set_settings(mocker, settings_dict)
+        return settings_dict
+
+    def set_settings(self, mocker, settings_dict):
+        mocker.patch(
+            "wagtail_extended_search.settings.wagtail_extended_search_settings",
+            SettingsSnapshot(settings_dict),
+        )
+
+    def test_get_setting(self):
+        assert get_setting("boost_parts__fields__app.model.field") == 2.0
+        assert get_setting("analyzers") == {"tokenized": {"query_types": ("phrase",)}}
+        with pytest.raises(KeyError):
+            get_setting("boost_parts__fields__app.model.other_field")
+
+    def test_record_settings_dependencies(self):
+        get_setting("analyzers")
+        with record_settings_dependencies() as outer_dependencies:
+            get_setting("analyzers__tokenized__query_types")
+            with record_settings_dependencies() as inner_dependencies:
+                get_setting("boost_parts__fields__app.model.field")
+                with pytest.raises(KeyError):
+                    get_setting("boost_parts__fields__app.model.other_field")
+        assert inner_dependencies == {
+            "boost_parts__fields__app.model.field",
+            "boost_parts__fields__app.model.other_field",
+        }
+        assert outer_dependencies == inner_dependencies | {
+            "analyzers__tokenized__query_types"
+        }
+
+    def test_get_settings_dependencies_version(self, mocker, settings_dict):
+        keys = ["boost_parts__fields__app.model.field", "boost_parts__fields__missing"]
+        version = get_settings_dependencies_version(keys)
+        assert version == get_settings_dependencies_version(reversed(keys))
+
+        settings_dict["analyzers"]["tokenized"]["query_types"] = []
+        self.set_settings(mocker, settings_dict)
+        assert version == get_settings_dependencies_version(keys)
+
+        settings_dict["boost_parts"]["fields"]["missing"] = None
+        self.set_settings(mocker, settings_dict)
+        assert version != get_settings_dependencies_version(keys)
 
 
 class TestGetSettingsFieldKey:
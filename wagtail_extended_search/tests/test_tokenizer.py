@@ -0,0 +1,28 @@
+from wagtail_extended_search.tokenizer import tokenize
+
+
+class TestTokenize:
+    def test_snowball(self):
+        assert tokenize("the Cat sat on the mat", "snowball") == ("cat", "sat", "mat")
+        assert tokenize("the a to", "snowball") == ()
+        # the lowercase filter runs before the stop filter
+        assert tokenize("The cat", "snowball") == ("cat",)
+        # and accents aren't folded
+        assert tokenize("Café cafe CAFE", "snowball") == ("café", "cafe")
+        assert tokenize("don't stop", "snowball") == ("don't", "stop")
+        assert tokenize("2024 report", "snowball") == ("2024", "report")
+
+    def test_simple(self):
+        assert tokenize("The Cat, the cat", "simple") == ("the", "cat")
+        assert tokenize("2024", "simple") == ()
+        assert tokenize("R2D2", "simple") == ("r", "d")
+
+    def test_no_spaces(self):
+        assert tokenize("(020) 7946 0000", "no_spaces") == ("02079460000",)
+        assert tokenize("DBT", "no_spaces") == ("DBT",)
+        assert tokenize(" ( ) ", "no_spaces") == ()
+
+    def test_unknown_analyzer_splits_on_whitespace(self):
+        assert tokenize("The the cat", "unknown") == ("The", "the", "cat")
+        assert tokenize("The the cat", None) == ("The", "the", "cat")
+        assert tokenize("   ", None) == ()
@@ -0,0 +1,91 @@
+import re
+from functools import lru_cache
+from typing import Callable, Optional
+
+# Lucene's default English stop words, as removed by Elasticsearch's `stop`
+# token filter and the `snowball` analyzer
+ENGLISH_STOP_WORDS = frozenset(
+    [
+        "a",
+        "an",
+        "and",
+        "are",
+        "as",
+        "at",
+        "be",
+        "but",
+        "by",
+        "for",
+        "if",
+        "in",
+        "into",
+        "is",
+        "it",
+        "no",
+        "not",
+        "of",
+        "on",
+        "or",
+        "such",
+        "that",
+        "the",
+        "their",
+        "then",
+        "there",
+        "these",
+        "they",
+        "this",
+        "to",
+        "was",
+        "will",
+        "with",
+    ]
+)
+
+# roughly the standard tokenizer: runs of word characters, keeping words
+# like "don't" and "U.S.A" together
+STANDARD_TOKEN_RE = re.compile(r"\w+(?:['’.]\w+)*")
+# the lowercase tokenizer used by the simple analyzer splits on anything that
+# isn't a letter
+LETTER_TOKEN_RE = re.compile(r"[^\W\d_]+")
+# see the remove_spaces filter of the no_spaces analyzer
+REMOVED_KEYWORD_CHARACTERS_RE = re.compile(r"[ ()+]")
+
+
+def _tokenize_snowball(query_str: str) -> list[str]:
+    # the snowball analyzer lowercases tokens before removing stop words, and
+    # doesn't fold accents. Tokens aren't stemmed, so words sharing a stem
+    # still count separately
+    tokens = (t.lower() for t in STANDARD_TOKEN_RE.findall(query_str))
+    return [t for t in tokens if t not in ENGLISH_STOP_WORDS]
+
+
+def _tokenize_simple(query_str: str) -> list[str]:
+    return [t.lower() for t in LETTER_TOKEN_RE.findall(query_str)]
+
+
+def _tokenize_no_spaces(query_str: str) -> list[str]:
+    token = REMOVED_KEYWORD_CHARACTERS_RE.sub("", query_str)
+    return [token] if token else []
+
+
+ANALYZER_TOKENIZERS: dict[str, Callable[[str], list[str]]] = {
+    "snowball": _tokenize_snowball,
+    "simple": _tokenize_simple,
+    "no_spaces": _tokenize_no_spaces,
+}
+
+
+@lru_cache(maxsize=1024)
+def tokenize(query_str: str, es_analyzer: Optional[str]) -> tuple[str, ...]:
+    """
+    Works out the distinct tokens the search backend would search for when
+    a search query string is analyzed by the given analyzer, in the order
+    they first appear.
+
+    This is only an approximation for deciding which queries are worth
+    running, so it errs towards keeping tokens; analyzers it doesn't know
+    about just split on whitespace.
+    """
+    tokenizer = ANALYZER_TOKENIZERS.get(es_analyzer, str.split)
+    return tuple(dict.fromkeys(tokenizer(query_str)))
@@ -14,3 +14,11 @@ class AnalysisType(Enum):
     EXPLICIT = "explicit"
     KEYWORD = "keyword"
     NGRAM = "ngram"
+
+
+class QueryShape(Enum):
+    SINGLE_WORD = "single_word"
+    MULTIPLE_WORDS = "multiple_words"
+    QUOTED = "quoted"
+    NUMERIC = "numeric"
+    LONG = "long"